@@ -1,28 +1,41 @@
-
 import streamlit as st
-import openai
-import os
 from dotenv import load_dotenv
 import time
-import json
-import re
 from datetime import datetime
-import random
 import uuid
-import base64
-from io import BytesIO
+from contextlib import closing
+
+from projectcraft.backends import BackendConfig
+from projectcraft.cache import ResponseCache
+from projectcraft.chat_history import deep_sizeof
+from projectcraft.client import DEFAULT_MODEL, get_pool_stats
+from projectcraft.core import CACHED, SIMILAR, ProjectSession
+from projectcraft.jobs import CANCELLED, get_job_manager
+from projectcraft.metrics import get_metrics, set_session
+from projectcraft.prefetch import QUICK_SUGGESTIONS
+from projectcraft.rendering import ThrottledRenderer
+from projectcraft.revisions import side_by_side_diff
+from projectcraft.routing import get_router
+from projectcraft.scheduler import get_scheduler
+from projectcraft.sections import SECTION_NAMES
+from projectcraft.similarity import SimilarityIndex
+from projectcraft.store import ProjectStore
 
 # Load environment variables
 load_dotenv()
 
 # Get API key from .streamlit/secrets.toml
-try:
-    # First attempt to load from Streamlit secrets
-    OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"]
-except Exception as e:
-    st.error("Error: OpenAI API key not found in .streamlit/secrets.toml")
-    st.info("Please create a .streamlit/secrets.toml file with your API key: \n\nOPENAI_API_KEY='your_api_key_here'")
-    OPENAI_API_KEY = None
+if BackendConfig.from_env().backend == "fake":
+    # Offline mode: responses come from the local fake backend
+    OPENAI_API_KEY = "offline"
+else:
+    try:
+        # First attempt to load from Streamlit secrets
+        OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"]
+    except Exception:
+        st.error("Error: OpenAI API key not found in .streamlit/secrets.toml")
+        st.info("Please create a .streamlit/secrets.toml file with your API key: \n\nOPENAI_API_KEY='your_api_key_here'")
+        OPENAI_API_KEY = None
     
 # Check if key was successfully loaded
 if not OPENAI_API_KEY:
@@ -292,274 +305,520 @@ st.markdown("""
         border-radius: 5px;
         transition: width 0.3s ease;
     }
+    
+    /* Side-by-side revision diffs */
+    .revision-diff table.diff {
+        width: 100%;
+        font-family: monospace;
+        font-size: 0.8rem;
+        border-collapse: collapse;
+    }
+    .revision-diff .diff_header {
+        color: #6c757d;
+        background-color: #f8f9fa;
+    }
+    .revision-diff td.diff_next {
+        display: none;
+    }
+    .revision-diff .diff_add {
+        background-color: #d4edda;
+    }
+    .revision-diff .diff_chg {
+        background-color: #fff3cd;
+    }
+    .revision-diff .diff_sub {
+        background-color: #f8d7da;
+    }
 </style>
 """, unsafe_allow_html=True)
 
 # Initialize session state variables
-if 'session_id' not in st.session_state:
-    st.session_state.session_id = str(uuid.uuid4())
-if 'project_data' not in st.session_state:
-    st.session_state.project_data = None
-if 'messages' not in st.session_state:
-    st.session_state.messages = []
-if 'chat_started' not in st.session_state:
-    st.session_state.chat_started = False
 if 'generation_in_progress' not in st.session_state:
     st.session_state.generation_in_progress = False
 if 'selected_model' not in st.session_state:
-    st.session_state.selected_model = "gpt-5.1-2025-11-13" # Use gpt-5.1-2025-11-13 when available
-
-# Project generator system prompt
-PROJECT_GENERATOR_PROMPT = """
-You are ProjectCraft, a specialized assistant designed to help educators create comprehensive mini-project assignments for their students. Your goal is to guide teachers through the process of designing structured, engaging projects with clear objectives, requirements, and evaluation criteria.
-
-## Core Purpose
-Help educators create detailed, well-structured mini-project assignments that are appropriate for their subject area, student level, and available resources. The projects should be engaging, educational, and achievable within the specified timeframe.
+    st.session_state.selected_model = DEFAULT_MODEL
+if 'stream_generation' not in st.session_state:
+    st.session_state.stream_generation = True
+if 'structured_generation' not in st.session_state:
+    st.session_state.structured_generation = False
+if 'prefetch_suggestions' not in st.session_state:
+    st.session_state.prefetch_suggestions = False
+if 'generation_candidates' not in st.session_state:
+    st.session_state.generation_candidates = 1
+if 'metrics_session_id' not in st.session_state:
+    # Unlike the project id, this does not change with the project
+    st.session_state.metrics_session_id = str(uuid.uuid4())
 
-## Standard Mini-Project Template
-Use this consistent template structure for all project assignments:
+# Attribute this run's API requests, and the jobs it starts, to the browser session
+set_session(st.session_state.metrics_session_id)
 
-### Overview
-A brief introduction (2-3 sentences) explaining the project's overall purpose and relevance.
+# Seconds between progress updates while a project is generated in the background
+GENERATION_POLL_SECONDS = 0.5
 
-### Learning Objectives
-A bulleted list of 4-6 specific skills or knowledge areas students will develop through the project.
+# A generation nobody has polled for this long (e.g. the tab was closed) is cancelled
+GENERATION_HEARTBEAT_SECONDS = 60
 
-### Project Description
-A paragraph (5-8 sentences) providing context and explaining the core task or problem students will address.
+# Options of the project form, also used to filter past projects
+ACADEMIC_LEVELS = ["High School", "Undergraduate (Year 1-2)", "Undergraduate (Year 3-4)", "Graduate", "Professional Development"]
+DURATIONS = ["1 week", "2 weeks", "3-4 weeks", "5-6 weeks", "Full semester"]
 
-### Technical Requirements
-Break this section into logical subsections based on the project type, such as:
-- Data/Resource Collection
-- Analysis/Development Process
-- Implementation Requirements
-- Testing/Evaluation Methods
+# On-disk cache of generated projects, shared by all sessions
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache.from_env()
 
-Each subsection should include specific, measurable requirements with appropriate detail.
+# Persistent store of projects and their chats, shared by all sessions
+@st.cache_resource
+def get_project_store():
+    return ProjectStore.from_env()
 
-### Deliverables
-A numbered list of concrete outputs students must submit, including:
-- Format specifications
-- Length/scope guidelines
-- Presentation requirements
-- Documentation needs
+# Index of stored forms for finding near-duplicate requests, built once per process
+@st.cache_resource
+def get_similarity_index():
+    index = SimilarityIndex()
+    for project_id, form_data in get_project_store().iter_forms():
+        index.add(project_id, form_data)
+    return index
 
-### Evaluation Criteria
-A breakdown of how the project will be assessed, with percentage weights for different components.
+# The project this browser session works on, with its chat and revisions; all
+# of its logic lives in projectcraft.core, this script only draws it
+if 'project_session' not in st.session_state:
+    st.session_state.project_session = ProjectSession(
+        OPENAI_API_KEY,
+        st.session_state.selected_model,
+        get_project_store(),
+        response_cache=get_response_cache(),
+        similarity_index=get_similarity_index(),
+    )
+project_session = st.session_state.project_session
+project_session.model = st.session_state.selected_model
+if 'chat_visible' not in st.session_state:
+    st.session_state.chat_visible = project_session.chat.config.history_page_size
+if 'generation_job_id' not in st.session_state:
+    st.session_state.generation_job_id = None
+    # Reattach to a generation started before the browser was refreshed
+    reattached_job = get_job_manager().get(st.query_params.get("job"))
+    if reattached_job is not None:
+        st.session_state.generation_job_id = reattached_job.id
+        project_session.form_data = reattached_job.metadata["form_data"]
+        st.session_state.generation_in_progress = True
 
-### Additional Resources
-A list of helpful resources, including:
-- Relevant websites, APIs, or data sources (with URLs)
-- Reference materials
-- Tools or platforms
-- Starter templates or examples (if applicable)
+# Function to put the current project in the URL, so a browser refresh reopens it
+def show_project_in_url():
+    st.query_params["project"] = project_session.project_id
 
-### Submission Guidelines
-Clear instructions for how and when deliverables should be submitted.
-
-## What to Avoid
-1. Creating projects that are too vague or too prescriptive
-2. Recommending resources that aren't freely accessible
-3. Designing projects that require excessive time or resources beyond what's reasonable
-4. Using overly technical language inappropriate for the specified academic level
-5. Creating projects without clear, measurable learning outcomes
-6. Suggesting projects that don't have real-world relevance or application
-
-Based on the information provided by the user, generate a complete mini-project assignment following this template. Make it specific, practical, engaging, and appropriate for the subject area and academic level.
-"""
+# Function to open a stored project in this session
+def open_stored_project(project_id):
+    """
+    Load a stored project with its chat; later changes update the same entry.
+    Returns False if the project is not stored.
+    """
+    if not project_session.open(project_id):
+        return False
+    st.session_state.chat_visible = project_session.chat.config.history_page_size
+    show_project_in_url()
+    return True
 
 # Function to convert project to markdown format
 def get_project_markdown():
     """
     Convert the generated project to a markdown string format
     """
-    if not st.session_state.project_data:
+    if not project_session.project_data:
         return "No project has been generated yet."
-        
-    markdown_text = f"# {st.session_state.project_data.get('title', 'Student Mini-Project')}\n\n"
-    markdown_text += f"**Subject:** {st.session_state.form_data.get('subject', 'N/A')}\n"
-    markdown_text += f"**Academic Level:** {st.session_state.form_data.get('academic_level', 'N/A')}\n"
-    markdown_text += f"**Duration:** {st.session_state.form_data.get('duration', 'N/A')}\n\n"
     
-    # Add each section of the project
-    for section, content in st.session_state.project_data.items():
-        if section != 'title' and content:
-            markdown_text += f"## {section}\n\n"
-            markdown_text += f"{content}\n\n"
-    
-    markdown_text += f"---\n\n"
-    markdown_text += f"Generated by ProjectCraft on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-    markdown_text += f"Session ID: {st.session_state.session_id}\n"
-    
-    return markdown_text
+    return project_session.export()["markdown"]
 
-# Function to call OpenAI API
-# Function to call OpenAI API
-def call_openai_api(messages, stream=True):
-    client = openai.Client(api_key=OPENAI_API_KEY)
-    
+# Function to show a download button for the markdown or Word export
+def project_download_button(label, key, file_format="markdown"):
+    # Served from Streamlit's media endpoint instead of being inlined in the
+    # page as a base64 data URI; clicking does not rerun the script
+    if file_format == "docx":
+        # The document is only built when the button is clicked
+        data, file_name = project_session.docx_builder(), project_session.export()["docx_file_name"]
+        mime = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    else:
+        project_export = project_session.export()
+        data, file_name = project_export["markdown_bytes"], project_export["markdown_file_name"]
+        mime = "text/markdown"
+    st.download_button(
+        label,
+        data=data,
+        file_name=file_name,
+        mime=mime,
+        key=key,
+        on_click="ignore",
+        use_container_width=True,
+    )
+
+# Function to stream the answer to a chat question into the page
+def stream_chat_answer(question):
     try:
-        if stream:
-            # Set up placeholder for streaming
-            placeholder = st.empty()
-            collected_content = ""
-            
-            # Start streaming
-            for chunk in client.chat.completions.create(
-                model=st.session_state.selected_model,
-                messages=messages,
-                stream=True,
-                max_completion_tokens=4000,
-                # temperature=0.9  # Set a higher temperature to stimulate creativity
-            ):
-                if chunk.choices[0].delta.content is not None:
-                    content = chunk.choices[0].delta.content
-                    collected_content += content
-                    placeholder.markdown(collected_content)
-            
-            return collected_content
-        else:
-            response = client.chat.completions.create(
-                model=st.session_state.selected_model,
-                messages=messages,
-                stream=False,
-                max_completion_tokens=4000,
-                # temperature=0.9  # Set a higher temperature to stimulate creativity
-            )
-            return response.choices[0].message.content
+        # Clicking Stop reruns the script, which interrupts the loop below
+        st.button("⏹ Stop answering", key="stop_chat")
+        
+        # Set up placeholder for streaming; updates are coalesced so the
+        # growing text is not re-sent to the browser on every chunk
+        placeholder = st.empty()
+        renderer = ThrottledRenderer.from_config(placeholder.markdown)
+        collected_content = ""
+        
+        # Closing the answer when interrupted ends the request and frees its
+        # scheduler slot right away
+        with closing(project_session.stream_answer(question)) as answer:
+            for content in answer:
+                collected_content += content
+                renderer.update(collected_content)
+        renderer.flush()
+        st.session_state.last_render_stats = renderer.stats()
             
     except Exception as e:
         st.error(f"Error calling OpenAI API: {str(e)}")
-        return "I'm sorry, there was an error processing your request. Please try again."
+        st.session_state.last_api_error = str(e)
 
-# Function to generate project
-def generate_project(form_data):
-    st.session_state.generation_in_progress = True
-    
-    # Store form data in session state
-    st.session_state.form_data = form_data
+# Function to format a latency in seconds for the metrics panel
+def format_seconds(value):
+    return "–" if value is None else f"{value:.2f}s"
+
+# Function to show rolling request statistics per kind, for this session or the process
+def show_request_metrics():
+    scope = st.radio("Scope", ["This session", "All sessions"], key="metrics_scope", horizontal=True,
+                     label_visibility="collapsed")
+    session = st.session_state.metrics_session_id if scope == "This session" else None
+    summary = get_metrics().summary(session)
+    if not summary:
+        st.caption("No requests yet.")
+        return
+    rows = ["| Kind | n | TTFT p50 / p95 | Total p50 / p95 / p99 | Tokens in / out | Cost / request | Retries | Fallbacks | Cache hits |",
+            "|---|---|---|---|---|---|---|---|---|"]
+    for kind, stats in summary.items():
+        ttft, duration = stats["ttft"], stats["duration"]
+        rows.append(
+            f"| {kind} | {stats['count']} "
+            f"| {format_seconds(ttft['p50'])} / {format_seconds(ttft['p95'])} "
+            f"| {format_seconds(duration['p50'])} / {format_seconds(duration['p95'])} / {format_seconds(duration['p99'])} "
+            f"| {stats['prompt_tokens']:.0f} / {stats['completion_tokens']:.0f} "
+            f"| ${stats['cost']:.4f} "
+            f"| {stats['retries']} | {stats['fallbacks']} | {stats['cache_hits']} |"
+        )
+    st.markdown("\n".join(rows))
+    st.caption(f"Total cost: ${sum(stats['total_cost'] for stats in summary.values()):.4f} (estimated from token counts)")
+    errors = sum(stats["errors"] for stats in summary.values())
+    if errors:
+        st.caption(f"{errors} failed or cancelled requests are excluded from the latencies.")
+
+# Function to browse the candidates of a best-of-N generation
+def show_candidate_picker():
+    candidates = project_session.candidates
+    st.markdown(f"**{len(candidates)} candidates were generated.** The highest-scoring one is shown first; switching replaces the current project, including regenerated sections.")
+    columns = st.columns(len(candidates))
+    for index, (column, candidate) in enumerate(zip(columns, candidates)):
+        with column:
+            selected = candidate["project_data"] is project_session.project_data
+            st.markdown(f"**#{index + 1}** · {candidate['score']:.0f}/100")
+            st.caption(" · ".join(detail for _, detail in candidate["checks"].values()))
+            if st.button("Showing" if selected else "Show", key=f"show_candidate_{index}", disabled=selected, use_container_width=True):
+                project_session.show_candidate(index)
+                show_project_in_url()
+                st.rerun()
+
+# Function to show which model and completion budget each kind of request uses
+def show_model_routing():
+    policy = get_router().policy(st.session_state.selected_model, project_session.form_data)
+    rows = ["| Kind | Model | Fallback | Max tokens |", "|---|---|---|---|"]
+    for kind, route in policy.items():
+        model = f"{route.model} (primary is slow or rate-limited)" if route.degraded else route.model
+        rows.append(f"| {kind} | {model} | {route.fallback_model or '–'} | {route.max_completion_tokens} |")
+    st.markdown("\n".join(rows))
+    st.caption("Budgets of projects and sections follow the current project's academic level and duration.")
+
+# Function to compare two revisions of the project side by side and restore an earlier one
+def show_revision_history():
+    revision_log = project_session.revisions
+    if len(revision_log) < 2:
+        st.info("Earlier versions of the project appear here once it is regenerated, sections are regenerated or another candidate is shown.")
+        return
     
-    # Build the prompt
-    project_prompt = f"""
-    Please generate a mini-project assignment based on the following specifications:
+    labels = {
+        entry["number"]: f"#{entry['number']} · {entry['label']} · {time.strftime('%H:%M', time.localtime(entry['created_at']))}"
+        for entry in revision_log.revisions
+    }
+    numbers = sorted(labels, reverse=True)
+    col1, col2 = st.columns(2)
+    with col1:
+        old_number = st.selectbox("Revision", numbers, index=1, format_func=labels.get, key="revision_old")
+    with col2:
+        new_number = st.selectbox("Compared with", numbers, index=0, format_func=labels.get, key="revision_new")
     
-    Subject/Course: {form_data['subject']}
-    Academic Level: {form_data['academic_level']}
-    Project Duration: {form_data['duration']}
-    Key Learning Objectives: {form_data['objectives']}
-    Available Resources: {form_data['resources']}
-    Project Theme/Focus: {form_data['theme'] if form_data['theme'] else 'Any appropriate theme for the subject'}
+    # Revisions never change, so their diffs are computed once
+    diff_key = (revision_log.project_id, old_number, new_number)
+    if st.session_state.get("revision_diff", (None,))[0] != diff_key:
+        changes = [
+            (field, side_by_side_diff(old_text, new_text, f"#{old_number}", f"#{new_number}"))
+            for field, old_text, new_text in revision_log.diff(old_number, new_number)
+        ]
+        st.session_state.revision_diff = (diff_key, changes)
+    changes = st.session_state.revision_diff[1]
     
-    The project should be challenging but achievable within the given timeframe and with the specified resources.
-    Please format your response using markdown and structure it according to the standard template.
+    if not changes:
+        st.caption("The two revisions are identical.")
+    for field, table in changes:
+        st.markdown(f"**{field}**")
+        st.markdown(table, unsafe_allow_html=True)
     
-    Additionally, provide a short, catchy title for the project at the beginning.
+    if old_number != revision_log.latest and st.button(f"↩ Restore revision #{old_number}", key="restore_revision"):
+        project_session.restore(old_number)
+        show_project_in_url()
+        st.rerun()
+
+# Function to show how much memory this browser session holds, largest items first
+def show_session_memory():
+    sizes = {key: deep_sizeof(value) for key, value in st.session_state.to_dict().items() if key != "project_session"}
+    sizes.update({f"project_session.{part}": size for part, size in project_session.memory_usage().items()})
+    total = sum(sizes.values())
+    chat_history = project_session.chat
+    budget = chat_history.config.session_memory_budget
+    st.progress(min(1.0, total / budget), text=f"{total / 1024:.0f} KB of {budget / 1024 ** 2:.0f} MB")
+    largest = sorted(sizes.items(), key=lambda item: item[1], reverse=True)[:5]
+    st.markdown("\n".join(f"- `{key}`: {size / 1024:.1f} KB" for key, size in largest))
+    st.caption(f"Chat: {len(chat_history)} messages, the latest {len(chat_history.recent)} in memory and the rest in the project store.")
+
+# Function to render one section of the project as a card
+def render_section_card(section_name, content):
+    st.markdown(f"""
+    <div class="card">
+        <div class="card-title">{section_name}</div>
+        <div class="project-section">
+    """, unsafe_allow_html=True)
+    st.markdown(content)
+    st.markdown("</div></div>", unsafe_allow_html=True)
+
+# Function to generate project
+def generate_project(form_data, stream=None, use_cache=True, check_similar=True):
     """
+    Start generating a project for form_data. Identical (normalized) inputs are
+    served from the response cache unless use_cache is False, e.g. on Regenerate.
+    If stored projects were made from nearly the same form, they are offered
+    in st.session_state.similar_projects instead, unless check_similar is False.
+    Otherwise the generation runs as a background job whose id is kept in the
+    session state (and the URL), so reruns poll it instead of blocking.
+    """
+    if stream is None:
+        stream = st.session_state.stream_generation
     
-    # Set up the messages
-    messages = [
-        {"role": "system", "content": PROJECT_GENERATOR_PROMPT},
-        {"role": "user", "content": project_prompt}
-    ]
-    
-    # Call the API
-    with st.spinner("Crafting your project... this may take a moment..."):
-        response = call_openai_api(messages, stream=False)
-    
-    # Parse the response
-    # Extract the title (assuming it's in the first line with a # or ## prefix)
-    title_match = re.search(r'^#+ (.+)$', response, re.MULTILINE)
-    title = title_match.group(1) if title_match else "Student Mini-Project"
-    
-    # Create a structured project data object
-    project_data = {
-        "title": title,
-        "Overview": extract_section(response, "Overview", "Learning Objectives"),
-        "Learning Objectives": extract_section(response, "Learning Objectives", "Project Description"),
-        "Project Description": extract_section(response, "Project Description", "Technical Requirements"),
-        "Technical Requirements": extract_section(response, "Technical Requirements", "Deliverables"),
-        "Deliverables": extract_section(response, "Deliverables", "Evaluation Criteria"),
-        "Evaluation Criteria": extract_section(response, "Evaluation Criteria", "Additional Resources"),
-        "Additional Resources": extract_section(response, "Additional Resources", "Submission Guidelines"),
-        "Submission Guidelines": extract_section(response, "Submission Guidelines", None)
-    }
-    
-    # Store the project data
-    st.session_state.project_data = project_data
-    st.session_state.generation_in_progress = False
-    st.session_state.raw_response = response
+    outcome, value = project_session.prepare_generation(form_data, use_cache, check_similar)
+    if outcome == CACHED:
+        show_project_in_url()
+        return value
+    if outcome == SIMILAR:
+        # Offer near-duplicates before paying for a new generation
+        st.session_state.similar_projects = value
+        return None
+    st.session_state.similar_projects = None
     
-    return project_data
+    # A rerun that submits the same request again gets the job already in flight
+    job = project_session.start_generation(
+        value,
+        stream=stream,
+        structured=st.session_state.structured_generation,
+        candidates=st.session_state.generation_candidates,
+        heartbeat_timeout=GENERATION_HEARTBEAT_SECONDS,
+    )
+    track_generation_job(job)
+    return None
 
-# Helper function to extract sections from the response
-def extract_section(text, section_name, next_section_name):
-    start_pattern = f"### {section_name}"
-    start_index = text.find(start_pattern)
-    
-    if start_index == -1:
-        # Try with ## prefix
-        start_pattern = f"## {section_name}"
-        start_index = text.find(start_pattern)
-        
-        if start_index == -1:
-            return ""
-    
-    # Add the length of the section heading to get to the content
-    start_index += len(start_pattern)
+# Function to make the session wait for a background job
+def track_generation_job(job):
+    st.session_state.generation_job_id = job.id
+    st.session_state.generation_in_progress = True
+    st.query_params["job"] = job.id
+
+# Function to regenerate only some sections of the current project
+def regenerate_project_sections(section_names):
+    """
+    Rewrite section_names in a background job, one concurrent request per
+    section with the rest of the project as context. The other sections are
+    kept as they are.
+    """
+    job = project_session.start_section_regeneration(section_names, heartbeat_timeout=GENERATION_HEARTBEAT_SECONDS)
+    track_generation_job(job)
+
+# Function to move the result of the background generation job into the session
+def collect_generation_job():
+    """
+    Returns True once the job has finished (or is gone) and the session no
+    longer waits for it
+    """
+    job = get_job_manager().get(st.session_state.generation_job_id)
+    if job is not None and not job.done:
+        job.touch()
+        return False
     
-    # Find the end of the section
-    if next_section_name:
-        end_pattern = f"### {next_section_name}"
-        end_index = text.find(end_pattern, start_index)
-        
-        if end_index == -1:
-            # Try with ## prefix
-            end_pattern = f"## {next_section_name}"
-            end_index = text.find(end_pattern, start_index)
-            
-            if end_index == -1:
-                end_index = len(text)
+    if job is None:
+        st.session_state.generation_error = "the generation job was lost, e.g. because the server restarted"
+    elif job.status == CANCELLED:
+        st.session_state.generation_notice = f"Generation cancelled ({job.cancel_reason}); the partial result was discarded."
+    elif job.error:
+        # Keep the current project instead of parsing the error into empty sections
+        st.session_state.generation_error = job.error
     else:
-        end_index = len(text)
+        failed_sections = project_session.apply_job(job)
+        if failed_sections:
+            st.session_state.generation_error = "could not regenerate " + ", ".join(
+                f"{section_name} ({error})" for section_name, error in failed_sections.items()
+            )
+        show_project_in_url()
     
-    section_content = text[start_index:end_index].strip()
-    return section_content
+    st.session_state.generation_job_id = None
+    st.session_state.generation_in_progress = False
+    if "job" in st.query_params:
+        del st.query_params["job"]
+    return True
 
-# Function to handle chat interaction for project improvements
-def chat_with_project(question):
-    # Add user question to the chat
-    st.session_state.messages.append({"role": "user", "content": question})
-    
-    # Build the context
-    context = f"""
-    The user has generated a mini-project with the following details:
+# Function to stop the background generation and go back to what was there before
+def cancel_generation_job():
+    """
+    Cancels the job (its stream is closed and its scheduler slot freed at the
+    next chunk) and stops waiting for it; the partial result is discarded
+    """
+    job = get_job_manager().get(st.session_state.generation_job_id)
+    if job is not None:
+        job.cancel("stopped by the user")
+    st.session_state.generation_job_id = None
+    st.session_state.generation_in_progress = False
+    st.session_state.generation_notice = "Generation cancelled; the partial result was discarded."
+    if "job" in st.query_params:
+        del st.query_params["job"]
+
+# Function to show the progress of the generation job, polled without blocking the script
+@st.fragment(run_every=GENERATION_POLL_SECONDS)
+def show_generation_progress():
+    if collect_generation_job():
+        st.rerun()
     
-    Subject/Course: {st.session_state.form_data['subject']}
-    Academic Level: {st.session_state.form_data['academic_level']}
-    Project Duration: {st.session_state.form_data['duration']}
+    job = get_job_manager().get(st.session_state.generation_job_id)
+    state = job.snapshot()
+    progress = state["progress"]
+    sections = progress.get("sections", {})
+    sections_total = progress.get("sections_total", len(SECTION_NAMES))
+    elapsed = time.time() - state["created_at"]
     
-    Here is the current project:
+    if progress.get("candidates"):
+        status_suffix = f" · best of {progress['candidates']}"
+    else:
+        status_suffix = ""
+    if state["status"] == "queued":
+        status_text = "Waiting for a free worker..."
+    elif progress.get("tokens_received"):
+        status_text = f"{progress['tokens_received']} tokens received, {len(sections)} of {sections_total} sections complete ({elapsed:.0f}s)"
+    elif "sections_total" in progress:
+        status_text = f"Regenerating sections: {len(sections)} of {sections_total} complete ({elapsed:.0f}s)"
+    else:
+        status_text = f"Please wait while we craft your custom project... ({elapsed:.0f}s)"
     
-    {st.session_state.raw_response}
+    st.markdown(f"""
+    <div class="card">
+        <div class="card-title">Generating Your Project</div>
+        <p>{status_text}{status_suffix}</p>
+        <div class="custom-progress">
+            <div class="progress-bar" style="width: {100 * len(sections) // max(1, sections_total)}%;"></div>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
     
-    The user is asking: {question}
+    if st.button("⏹ Cancel generation", key="cancel_generation"):
+        cancel_generation_job()
+        st.rerun()
     
-    Provide helpful suggestions, modifications, or insights about the project. If they're asking for specific changes, explain how those changes could be implemented.
-    """
+    # Sections appear as soon as the streamed response completes them
+    if progress.get("title"):
+        st.markdown(f"<h1>{progress['title']}</h1>", unsafe_allow_html=True)
+    for section_name in SECTION_NAMES:
+        if section_name in sections:
+            render_section_card(section_name, sections[section_name])
+
+# Function to handle chat interaction for project improvements
+def chat_with_project(question, suggestion_key=None):
+    # Show the latest page of the chat again
+    st.session_state.chat_visible = project_session.chat.config.history_page_size
     
-    # Set up the messages
-    messages = [
-        {"role": "system", "content": PROJECT_GENERATOR_PROMPT},
-        {"role": "user", "content": context}
-    ]
+    # A Quick Suggestion may already have been answered in the background
+    if suggestion_key and not project_session.has_history():
+        with st.spinner("Thinking..."):
+            response = project_session.prefetched_answer(suggestion_key)
+        if response is not None:
+            project_session.add_answer(question, response)
+            st.session_state.last_render_stats = None
+            return
     
-    # Call the API
+    # Cleared once answered; if set on the next run, the answer was stopped
+    st.session_state.pending_chat_question = question
     with st.spinner("Thinking..."):
-        response = call_openai_api(messages, stream=True)
-    
-    # Add the response to the chat
-    st.session_state.messages.append({"role": "assistant", "content": response})
-    st.session_state.chat_started = True
+        stream_chat_answer(question)
+    st.session_state.pending_chat_question = None
+
+# Function to drop the question of a chat answer that was stopped before it finished
+def discard_interrupted_chat():
+    question = st.session_state.get("pending_chat_question")
+    if question is None:
+        return
+    st.session_state.pending_chat_question = None
+    project_session.discard_unanswered(question)
+    st.session_state.chat_notice = "The answer was stopped and the partial text discarded."
+
+# Function to offer stored projects similar to the submitted form
+def show_similar_projects():
+    st.markdown("""
+    <div class="card">
+        <div class="card-title">Similar Projects Already Exist</div>
+        <p>These projects were generated from nearly the same details. Open one to reuse it, or generate a new project.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    for similar in st.session_state.similar_projects:
+        similar_col1, similar_col2 = st.columns([4, 1])
+        with similar_col1:
+            st.markdown(f"**{similar['title']}**  \n{similar['form_data'].get('subject', '')} · {similar['similarity']:.0%} similar")
+        with similar_col2:
+            if st.button("Open", key=f"open_similar_{similar['id']}", use_container_width=True):
+                st.session_state.similar_projects = None
+                open_stored_project(similar["id"])
+                st.rerun()
+    if st.button("Generate a new project anyway", key="generate_anyway", use_container_width=True):
+        generate_project(project_session.form_data, check_similar=False)
+        st.rerun()
+
+# Function to show the search for past projects
+def show_project_search():
+    with st.expander("🔎 Find a past project"):
+        search_text = st.text_input("Search titles, subjects and project text", key="project_search")
+        filter_col1, filter_col2 = st.columns(2)
+        with filter_col1:
+            level_filter = st.selectbox("Academic Level", ["Any"] + ACADEMIC_LEVELS, key="project_search_level")
+        with filter_col2:
+            duration_filter = st.selectbox("Project Duration", ["Any"] + DURATIONS, key="project_search_duration")
+        
+        results = get_project_store().search(
+            search_text,
+            academic_level=None if level_filter == "Any" else level_filter,
+            duration=None if duration_filter == "Any" else duration_filter,
+        )
+        if not results:
+            st.caption("No stored projects match.")
+        for result in results:
+            result_col1, result_col2 = st.columns([4, 1])
+            with result_col1:
+                updated = datetime.fromtimestamp(result["updated_at"]).strftime("%Y-%m-%d %H:%M")
+                st.markdown(f"**{result['title']}**  \n{result['subject']} · {result['academic_level']} · {result['duration']} · {updated}")
+            with result_col2:
+                if st.button("Open", key=f"open_project_{result['id']}", use_container_width=True):
+                    open_stored_project(result["id"])
+                    st.rerun()
+
+# Reopen the project in the URL after a browser refresh
+if 'project_restored' not in st.session_state:
+    st.session_state.project_restored = True
+    if st.query_params.get("project") and not project_session.project_data and not st.session_state.generation_in_progress:
+        open_stored_project(st.query_params["project"])
 
 # Sidebar
 with st.sidebar:
@@ -592,22 +851,57 @@ with st.sidebar:
     st.markdown("<h3>Session Controls</h3>", unsafe_allow_html=True)
     
     if st.button("🔄 Start New Project", key="new_project", use_container_width=True):
-        st.session_state.project_data = None
-        st.session_state.messages = []
-        st.session_state.chat_started = False
-        st.session_state.form_data = None
-        st.session_state.session_id = str(uuid.uuid4())
+        if st.session_state.generation_in_progress:
+            cancel_generation_job()
+        project_session.cancel_prefetch()
+        project_session.reset()
+        st.session_state.generation_job_id = None
+        st.session_state.generation_in_progress = False
+        st.session_state.similar_projects = None
+        for param in ("job", "project"):
+            if param in st.query_params:
+                del st.query_params[param]
         st.rerun()
     
-    if st.session_state.project_data:
-        if st.button("📝 Export Project", key="export_project", use_container_width=True):
-            # Generate markdown format
-            markdown_text = get_project_markdown()
-            # Encode to download
-            b64 = base64.b64encode(markdown_text.encode()).decode()
-            file_name = f"student_project_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
-            href = f'<a href="data:text/markdown;base64,{b64}" download="{file_name}">Click to download project (Markdown)</a>'
-            st.markdown(href, unsafe_allow_html=True)
+    st.checkbox("Stream generation", key="stream_generation", help="Show each section as soon as it is written instead of waiting for the whole project.")
+    st.checkbox("Structured output", key="structured_generation", help="Ask the model for JSON with one field per section instead of parsing markdown headings, so renamed headings cannot leave sections empty.")
+    st.select_slider("Candidates per generation", options=[1, 2, 3, 4, 5], key="generation_candidates", help="Generate several projects at once and show the one that passes the most quality checks (all sections present, evaluation weights summing to 100%, links in the resources, a suitable length). The others can be browsed. Takes about as long as one generation but costs one request per candidate.")
+    st.checkbox("Prefetch Quick Suggestions", key="prefetch_suggestions", help="Answer the four Quick Suggestions in the background once a project is ready, so clicking one responds instantly. Uses extra API tokens, capped by PROJECTCRAFT_PREFETCH_TOKEN_BUDGET.")
+    if not st.session_state.prefetch_suggestions:
+        # Turning prefetching off stops the answers still being prefetched
+        project_session.cancel_prefetch("prefetch turned off")
+    
+    if project_session.project_data:
+        project_download_button("📝 Export Project", key="export_project")
+        project_download_button("📄 Export Word Document", key="export_project_docx", file_format="docx")
+    
+    with st.expander("Connection Pool"):
+        pool_stats = get_pool_stats()
+        st.markdown(f"""
+        - Open connections: {pool_stats['open_connections']} ({pool_stats['idle_connections']} idle)
+        - Limit: {pool_stats.get('max_connections', 'N/A')} connections, {pool_stats.get('max_keepalive_connections', 'N/A')} keep-alive
+        - Requests sent: {pool_stats['requests_sent']} ({pool_stats['in_flight']} in flight)
+        - Clients created: {pool_stats['clients_created']}
+        """)
+    
+    with st.expander("Request Scheduler"):
+        scheduler_stats = get_scheduler().stats()
+        st.markdown(f"""
+        - Waiting: {scheduler_stats['queued']}, running: {scheduler_stats['active']}
+        - Completed: {scheduler_stats['completed']}, failed: {scheduler_stats['failed']}
+        - Retries: {scheduler_stats['retries']}, deadlines missed: {scheduler_stats['deadline_exceeded']}
+        - Cancelled: {scheduler_stats['cancelled']}
+        - Rate-limit pause: {scheduler_stats['paused_seconds']:.1f}s
+        """)
+    
+    with st.expander("Request Metrics"):
+        show_request_metrics()
+    
+    with st.expander("Model Routing"):
+        show_model_routing()
+    
+    with st.expander("Session Memory"):
+        show_session_memory()
     
     st.markdown("</div>", unsafe_allow_html=True)
 
@@ -623,8 +917,23 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Pick up a finished background generation before deciding what to show
+if st.session_state.generation_in_progress:
+    collect_generation_job()
+
+# Errors of a failed generation survive the rerun that follows it
+if st.session_state.get("generation_error"):
+    st.error(f"Project generation failed: {st.session_state.generation_error}. Please try again.")
+    st.session_state.generation_error = None
+if st.session_state.get("generation_notice"):
+    st.info(st.session_state.generation_notice)
+    st.session_state.generation_notice = None
+
+# A chat answer interrupted by Stop (or any other click) leaves its question behind
+discard_interrupted_chat()
+
 # Project Generation Form if no project has been generated yet
-if not st.session_state.project_data and not st.session_state.generation_in_progress:
+if not project_session.project_data and not st.session_state.generation_in_progress:
     st.markdown("""
     <div class="card">
         <div class="card-title">Create Your Project</div>
@@ -632,34 +941,44 @@ if not st.session_state.project_data and not st.session_state.generation_in_prog
     </div>
     """, unsafe_allow_html=True)
     
+    # Reopening a stored project costs nothing, unlike generating a new one
+    if st.session_state.get("similar_projects"):
+        show_similar_projects()
+    show_project_search()
+    
+    submitted_form_data = None
+    # A cancelled or failed generation keeps its answers so they can be corrected
+    previous_form = project_session.form_data or {}
     with st.form("project_form"):
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown('<p class="form-description">What subject is this project for?</p>', unsafe_allow_html=True)
-            subject = st.text_input("Subject/Course", placeholder="e.g., Introduction to Data Science")
+            subject = st.text_input("Subject/Course", value=previous_form.get("subject", ""), placeholder="e.g., Introduction to Data Science")
             
             st.markdown('<p class="form-description">Who are your students?</p>', unsafe_allow_html=True)
             academic_level = st.selectbox(
                 "Academic Level",
-                options=["High School", "Undergraduate (Year 1-2)", "Undergraduate (Year 3-4)", "Graduate", "Professional Development"]
+                options=ACADEMIC_LEVELS,
+                index=ACADEMIC_LEVELS.index(previous_form["academic_level"]) if previous_form.get("academic_level") in ACADEMIC_LEVELS else 0
             )
             
             st.markdown('<p class="form-description">How long will students work on this project?</p>', unsafe_allow_html=True)
             duration = st.selectbox(
                 "Project Duration",
-                options=["1 week", "2 weeks", "3-4 weeks", "5-6 weeks", "Full semester"]
+                options=DURATIONS,
+                index=DURATIONS.index(previous_form["duration"]) if previous_form.get("duration") in DURATIONS else 0
             )
         
         with col2:
             st.markdown('<p class="form-description">What should students learn from this project?</p>', unsafe_allow_html=True)
-            objectives = st.text_area("Key Learning Objectives", placeholder="e.g., data visualization, critical analysis, teamwork", height=100)
+            objectives = st.text_area("Key Learning Objectives", value=previous_form.get("objectives", ""), placeholder="e.g., data visualization, critical analysis, teamwork", height=100)
             
             st.markdown('<p class="form-description">What resources are available to students?</p>', unsafe_allow_html=True)
-            resources = st.text_area("Available Resources", placeholder="e.g., Python, lab equipment, specific datasets", height=70)
+            resources = st.text_area("Available Resources", value=previous_form.get("resources", ""), placeholder="e.g., Python, lab equipment, specific datasets", height=70)
             
             st.markdown('<p class="form-description">Optional: Any specific theme or focus?</p>', unsafe_allow_html=True)
-            theme = st.text_input("Project Theme/Focus (optional)", placeholder="e.g., sustainability, public health")
+            theme = st.text_input("Project Theme/Focus (optional)", value=previous_form.get("theme", ""), placeholder="e.g., sustainability, public health")
         
         submit_button = st.form_submit_button("Generate Project")
         
@@ -667,7 +986,7 @@ if not st.session_state.project_data and not st.session_state.generation_in_prog
             if not subject or not objectives or not resources:
                 st.error("Please fill in all required fields (Subject, Learning Objectives, and Available Resources).")
             else:
-                form_data = {
+                submitted_form_data = {
                     "subject": subject,
                     "academic_level": academic_level,
                     "duration": duration,
@@ -675,12 +994,16 @@ if not st.session_state.project_data and not st.session_state.generation_in_prog
                     "resources": resources,
                     "theme": theme
                 }
-                generate_project(form_data)
-                st.rerun()
+    
+    # Generate outside the form so streamed sections render below it
+    if submitted_form_data:
+        generate_project(submitted_form_data)
+        st.rerun()
 
 # Display the generated project if available
-elif st.session_state.project_data:
-    project_data = st.session_state.project_data
+elif project_session.project_data and not st.session_state.generation_in_progress:
+    project_data = project_session.project_data
+    form_data = project_session.form_data
     
     # Project title and basic info
     st.markdown(f"<h1>{project_data['title']}</h1>", unsafe_allow_html=True)
@@ -688,101 +1011,49 @@ elif st.session_state.project_data:
     # Info pills for project metadata
     st.markdown(f"""
     <div style="margin-bottom: 20px;">
-        <span class="pill-badge blue">Subject: {st.session_state.form_data['subject']}</span>
-        <span class="pill-badge green">Level: {st.session_state.form_data['academic_level']}</span>
-        <span class="pill-badge purple">Duration: {st.session_state.form_data['duration']}</span>
+        <span class="pill-badge blue">Subject: {form_data['subject']}</span>
+        <span class="pill-badge green">Level: {form_data['academic_level']}</span>
+        <span class="pill-badge purple">Duration: {form_data['duration']}</span>
     </div>
     """, unsafe_allow_html=True)
+    if project_session.served_from_cache:
+        st.caption("⚡ Loaded from cache for identical inputs. Use \"Regenerate Project\" for a fresh version.")
+    if project_session.structured_fallback:
+        st.caption(f"Structured output was not usable ({project_session.structured_fallback}); the project was generated as markdown instead.")
     
     # Create tabs for the project sections
-    tab1, tab2, tab3 = st.tabs(["📋 Project Details", "💬 Refine Project", "📊 Preview"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📋 Project Details", "💬 Refine Project", "📊 Preview", "🕘 History"])
     
     with tab1:
-        # Overview
-        st.markdown("""
-        <div class="card">
-            <div class="card-title">Overview</div>
-            <div class="project-section">
-        """, unsafe_allow_html=True)
-        st.markdown(project_data["Overview"])
-        st.markdown("</div></div>", unsafe_allow_html=True)
+        if project_session.candidates and len(project_session.candidates) > 1:
+            show_candidate_picker()
         
-        # Learning Objectives
-        st.markdown("""
-        <div class="card">
-            <div class="card-title">Learning Objectives</div>
-            <div class="project-section">
-        """, unsafe_allow_html=True)
-        st.markdown(project_data["Learning Objectives"])
-        st.markdown("</div></div>", unsafe_allow_html=True)
-        
-        # Project Description
-        st.markdown("""
-        <div class="card">
-            <div class="card-title">Project Description</div>
-            <div class="project-section">
-        """, unsafe_allow_html=True)
-        st.markdown(project_data["Project Description"])
-        st.markdown("</div></div>", unsafe_allow_html=True)
+        regenerate_sections = []
+        for section_name in SECTION_NAMES:
+            render_section_card(section_name, project_data[section_name])
+            if st.button(f"🔄 Regenerate {section_name}", key=f"regenerate_{section_name}"):
+                regenerate_sections = [section_name]
         
-        # Technical Requirements
-        st.markdown("""
-        <div class="card">
-            <div class="card-title">Technical Requirements</div>
-            <div class="project-section">
-        """, unsafe_allow_html=True)
-        st.markdown(project_data["Technical Requirements"])
-        st.markdown("</div></div>", unsafe_allow_html=True)
-        
-        # Deliverables
-        st.markdown("""
-        <div class="card">
-            <div class="card-title">Deliverables</div>
-            <div class="project-section">
-        """, unsafe_allow_html=True)
-        st.markdown(project_data["Deliverables"])
-        st.markdown("</div></div>", unsafe_allow_html=True)
-        
-        # Evaluation Criteria
-        st.markdown("""
-        <div class="card">
-            <div class="card-title">Evaluation Criteria</div>
-            <div class="project-section">
-        """, unsafe_allow_html=True)
-        st.markdown(project_data["Evaluation Criteria"])
-        st.markdown("</div></div>", unsafe_allow_html=True)
-        
-        # Additional Resources
-        st.markdown("""
-        <div class="card">
-            <div class="card-title">Additional Resources</div>
-            <div class="project-section">
-        """, unsafe_allow_html=True)
-        st.markdown(project_data["Additional Resources"])
-        st.markdown("</div></div>", unsafe_allow_html=True)
-        
-        # Submission Guidelines
-        st.markdown("""
-        <div class="card">
-            <div class="card-title">Submission Guidelines</div>
-            <div class="project-section">
-        """, unsafe_allow_html=True)
-        st.markdown(project_data["Submission Guidelines"])
-        st.markdown("</div></div>", unsafe_allow_html=True)
+        # Regenerate several sections in one go, each as its own request
+        selected_sections = st.multiselect("Regenerate several sections at once", SECTION_NAMES, key="regenerate_sections")
+        if st.button("🔄 Regenerate selected sections", key="regenerate_selected", disabled=not selected_sections):
+            regenerate_sections = selected_sections
         
         # Action buttons
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
         with col1:
-            if st.button("🔄 Regenerate Project", key="regenerate", use_container_width=True):
-                generate_project(st.session_state.form_data)
-                st.rerun()
+            regenerate = st.button("🔄 Regenerate Project", key="regenerate", use_container_width=True)
         with col2:
-            # Encode markdown for download
-            markdown_text = get_project_markdown()
-            b64 = base64.b64encode(markdown_text.encode()).decode()
-            file_name = f"student_project_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
-            download_button = f'<a href="data:text/markdown;base64,{b64}" download="{file_name}" style="text-decoration:none;"><button style="background-color:#4CAF50;color:white;border:none;padding:12px 20px;border-radius:8px;font-weight:600;cursor:pointer;width:100%;">📝 Download Project</button></a>'
-            st.markdown(download_button, unsafe_allow_html=True)
+            project_download_button("📝 Download Project", key="download_project")
+        with col3:
+            project_download_button("📄 Download Word", key="download_project_docx", file_format="docx")
+        
+        if regenerate:
+            generate_project(form_data, use_cache=False)
+            st.rerun()
+        elif regenerate_sections:
+            regenerate_project_sections(regenerate_sections)
+            st.rerun()
     
     with tab2:
         st.markdown("""
@@ -792,9 +1063,19 @@ elif st.session_state.project_data:
         </div>
         """, unsafe_allow_html=True)
         
-        # Display chat messages
-        if st.session_state.messages:
-            for message in st.session_state.messages:
+        if st.session_state.get("chat_notice"):
+            st.info(st.session_state.chat_notice)
+            st.session_state.chat_notice = None
+        
+        # Display the latest chat messages; earlier ones are loaded a page at a time
+        chat_history = project_session.chat
+        if chat_history:
+            earlier = len(chat_history) - st.session_state.chat_visible
+            if earlier > 0:
+                if st.button(f"⬆ Load earlier messages ({earlier} more)", key="load_earlier_messages"):
+                    st.session_state.chat_visible += chat_history.config.history_page_size
+                    st.rerun()
+            for message in chat_history.tail(st.session_state.chat_visible):
                 if message["role"] == "user":
                     st.markdown(f"""
                     <div class="chat-message user">
@@ -809,29 +1090,27 @@ elif st.session_state.project_data:
                         <div class="message">{message['content']}</div>
                     </div>
                     """, unsafe_allow_html=True)
+            
+            render_stats = st.session_state.get("last_render_stats")
+            if render_stats:
+                st.caption(f"Last response: {render_stats['chunks']} chunks streamed in {render_stats['messages']} updates, {render_stats['bytes'] / 1024:.1f} KB sent to the browser")
+            
+            context_tokens = project_session.last_context_tokens
+            if context_tokens:
+                st.caption(f"Context sent: ≈{context_tokens['total']} tokens (prefix {context_tokens['prefix']}, summary {context_tokens['summary']}, recent turns {context_tokens['history']}, sections {context_tokens['sections']}: {', '.join(context_tokens['sections_included']) or 'none'})")
         
         # Suggestion buttons
-        if not st.session_state.chat_started:
+        if not chat_history:
             st.markdown("### Quick Suggestions")
-            suggestion_col1, suggestion_col2 = st.columns(2)
+            if st.session_state.prefetch_suggestions:
+                project_session.start_prefetch()
+            suggestion_columns = st.columns(2)
             
-            with suggestion_col1:
-                if st.button("Make it more challenging", key="more_challenging", use_container_width=True):
-                    chat_with_project("Could you make this project more challenging for advanced students?")
-                    st.rerun()
-                    
-                if st.button("Add teamwork component", key="teamwork", use_container_width=True):
-                    chat_with_project("How can I incorporate more teamwork and collaboration into this project?")
-                    st.rerun()
-            
-            with suggestion_col2:
-                if st.button("Simplify requirements", key="simplify", use_container_width=True):
-                    chat_with_project("I'd like to simplify some of the requirements to make this more accessible.")
-                    st.rerun()
-                    
-                if st.button("More real-world relevance", key="real_world", use_container_width=True):
-                    chat_with_project("How can I connect this project more directly to real-world applications?")
-                    st.rerun()
+            for index, (suggestion_key, (label, question)) in enumerate(QUICK_SUGGESTIONS.items()):
+                with suggestion_columns[index % 2]:
+                    if st.button(label, key=suggestion_key, use_container_width=True):
+                        chat_with_project(question, suggestion_key=suggestion_key)
+                        st.rerun()
         
         # Chat input
         user_input = st.text_area("Your question or request:", key="chat_input", help="Ask about modifying specific aspects of the project or request additional resources.", height=100)
@@ -851,30 +1130,20 @@ elif st.session_state.project_data:
         
         # Display the markdown preview
         st.markdown(get_project_markdown())
-
-elif st.session_state.generation_in_progress:
-    # Show loading state
-    st.markdown("""
-    <div class="card">
-        <div class="card-title">Generating Your Project</div>
-        <p>Please wait while we craft your custom project...</p>
-        <div class="custom-progress">
-            <div class="progress-bar" style="width: 70%;"></div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
     
-    # Animation for loading
-    progress_placeholder = st.empty()
-    for i in range(100):
-        # Update progress every 0.1 seconds
-        time.sleep(0.05)
-        # Update the progress bar
-        progress_placeholder.markdown(f"""
-        <div class="custom-progress">
-            <div class="progress-bar" style="width: {i}%;"></div>
+    with tab4:
+        st.markdown("""
+        <div class="card">
+            <div class="card-title">Revision History</div>
+            <p>Compare earlier versions of your project side by side and restore one.</p>
         </div>
         """, unsafe_allow_html=True)
+        
+        show_revision_history()
+
+elif st.session_state.generation_in_progress:
+    # Show the progress of the background job
+    show_generation_progress()
 
 # Footer
 st.markdown("""
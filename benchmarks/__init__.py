@@ -0,0 +1,4 @@
+"""
+Offline benchmarks for ProjectCraft. Run from the repository root, e.g.
+python -m benchmarks.section_parser
+"""
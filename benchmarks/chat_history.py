@@ -0,0 +1,69 @@
+"""
+Work and memory of one rerun of the Refine tab as a chat grows: the whole
+conversation kept in session state and rendered on every rerun vs.
+ChatHistory, which keeps a window in memory and renders the latest page.
+
+A rerun renders the visible messages as HTML blocks and builds the context
+for a question, as the app does; the session memory is what the chat holds.
+
+    python -m benchmarks.chat_history [--turns 10 100 1000] [--repeat 20]
+"""
+import argparse
+import os
+import tempfile
+import timeit
+
+from benchmarks.page_payload import FORM_DATA, make_messages
+from benchmarks.section_parser import make_response
+from projectcraft.chat_context import build_chat_messages
+from projectcraft.chat_history import ChatHistory, HistoryConfig, deep_sizeof
+from projectcraft.sections import parse_project_response
+from projectcraft.store import ProjectStore
+
+QUESTION = "How can we add more teamwork to the deliverables?"
+
+
+def render(messages):
+    """The HTML the Refine tab sends for messages"""
+    return "".join(
+        f'<div class="chat-message {message["role"]}"><div class="message">{message["content"]}</div></div>'
+        for message in messages
+    )
+
+
+def unbounded_rerun(project_data, messages):
+    render(messages)
+    build_chat_messages(project_data, FORM_DATA, messages, QUESTION)
+
+
+def bounded_rerun(project_data, history):
+    render(history.tail(history.config.history_page_size))
+    build_chat_messages(project_data, FORM_DATA, history.recent, QUESTION)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    project_data = parse_project_response(make_response(16_000))
+    config = HistoryConfig()
+    print(f"{'turns':>6} {'before ms':>10} {'after ms':>9} {'before KB':>10} {'after KB':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        store = ProjectStore(os.path.join(directory, "projects.sqlite3"))
+        for turns in args.turns:
+            project_id = f"benchmark-{turns}"
+            store.append_messages(project_id, make_messages(turns))
+            # Read back, so that every message holds its own strings as in a session
+            messages = store.load_messages(project_id)
+            history = ChatHistory.load(project_id, store, config)
+
+            before_ms = timeit.timeit(lambda: unbounded_rerun(project_data, messages), number=args.repeat) / args.repeat * 1000
+            after_ms = timeit.timeit(lambda: bounded_rerun(project_data, history), number=args.repeat) / args.repeat * 1000
+            print(f"{turns:>6} {before_ms:>10.2f} {after_ms:>9.2f} "
+                  f"{deep_sizeof(messages) / 1024:>10.1f} {history.memory_bytes() / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
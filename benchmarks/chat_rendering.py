@@ -0,0 +1,47 @@
+"""
+Frontend traffic of a streamed chat response: messages and bytes sent with
+per-chunk rendering vs. ThrottledRenderer, on a simulated token stream.
+
+    python -m benchmarks.chat_rendering [--tokens-per-second 60]
+"""
+import argparse
+
+from projectcraft.rendering import ThrottledRenderer
+
+WORD = "project "
+
+
+def simulate(tokens, tokens_per_second, min_interval, min_bytes):
+    """Stream `tokens` chunks through a renderer driven by a simulated clock"""
+    now = [0.0]
+    renderer = ThrottledRenderer(lambda text: None, min_interval, min_bytes, clock=lambda: now[0])
+    text = ""
+    for _ in range(tokens):
+        now[0] += 1.0 / tokens_per_second
+        text += WORD
+        renderer.update(text)
+    renderer.flush()
+    return renderer.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    args = parser.parse_args()
+
+    settings = [
+        ("every chunk", 0, 0),
+        ("100 ms", 0.1, 0),
+        ("200 ms (default)", 0.2, 0),
+        ("500 ms", 0.5, 0),
+        ("2 KB delta", 0, 2048),
+    ]
+    print(f"{'tokens':>7} {'renderer':<18} {'messages':>9} {'KB sent':>10}")
+    for tokens in (500, 2000, 4000):
+        for label, min_interval, min_bytes in settings:
+            stats = simulate(tokens, args.tokens_per_second, min_interval, min_bytes)
+            print(f"{tokens:>7} {label:<18} {stats['messages']:>9} {stats['bytes'] / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Word export throughput in documents per second: a template built per export
+vs. the cached template, and bulk zip export with 1..N worker processes.
+
+    python -m benchmarks.docx_export [--documents 200] [--workers 4]
+"""
+import argparse
+import os
+import tempfile
+import time
+from io import BytesIO
+
+from docx import Document
+
+from benchmarks.section_parser import make_response
+from projectcraft import docx_export
+from projectcraft.sections import parse_project_response
+
+FORM_DATA = {"subject": "Data Science", "academic_level": "Undergraduate", "duration": "4 weeks"}
+
+
+def uncached_export(project_data):
+    """project_to_docx with the template rebuilt every time"""
+    docx_export._templates.clear()
+    return docx_export.project_to_docx(project_data, FORM_DATA, "benchmark")
+
+
+def cached_export(project_data):
+    return docx_export.project_to_docx(project_data, FORM_DATA, "benchmark")
+
+
+def documents_per_second(export, project_data, documents):
+    started = time.perf_counter()
+    for _ in range(documents):
+        export(project_data)
+    return documents / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    project_data = parse_project_response(make_response(12_000))
+    # Sanity check: the export opens as a Word document
+    Document(BytesIO(cached_export(project_data)))
+
+    print(f"{'mode':<28} {'docs/s':>8}")
+    for label, export in (("template per export", uncached_export), ("cached template", cached_export)):
+        print(f"{label:<28} {documents_per_second(export, project_data, args.documents):>8.1f}")
+
+    records = [{"id": str(index), "form_data": FORM_DATA, "project_data": project_data}
+               for index in range(args.documents)]
+    worker_counts = sorted({1, 2, args.workers})
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in worker_counts:
+            started = time.perf_counter()
+            docx_export.export_docx_zip(records, os.path.join(tmp, f"bulk-{workers}.zip"), workers=workers)
+            rate = len(records) / (time.perf_counter() - started)
+            print(f"{f'bulk zip, {workers} worker(s)':<28} {rate:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
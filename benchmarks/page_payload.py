@@ -0,0 +1,97 @@
+"""
+Page payload and export work per rerun of the project page: markdown
+rebuilt on every rerun and inlined as base64 data URIs vs. the export
+memoized per project revision and served through st.download_button.
+
+The payload counts the text the script sends to the browser: section cards,
+the preview tab, chat messages and the download links (for download_button
+only its media URL, since the file is fetched when clicked).
+
+    python -m benchmarks.page_payload [--chat-turns 20] [--repeat 50]
+"""
+import argparse
+import base64
+import timeit
+from datetime import datetime
+
+from benchmarks.section_parser import make_response
+from projectcraft.export import export_file_name, project_revision, project_to_markdown
+from projectcraft.sections import SECTION_NAMES, parse_project_response
+
+FORM_DATA = {
+    "subject": "Data Science",
+    "academic_level": "Undergraduate",
+    "duration": "4 weeks",
+    "objectives": "Data cleaning, visualisation, reporting",
+    "resources": "Python, Jupyter",
+}
+# Typical size of the anchor/button markup around a data URI
+LINK_MARKUP_BYTES = 300
+# Size of the element a download_button sends: label, file name and media URL
+DOWNLOAD_BUTTON_BYTES = 200
+
+
+def legacy_rerun(project_data, messages):
+    """What the page sent before: two markdown builds, one inline base64 link"""
+    payload = sum(len(project_data[name]) for name in SECTION_NAMES)
+    payload += sum(len(message["content"]) for message in messages)
+
+    markdown_text = project_to_markdown(project_data, FORM_DATA, "session")
+    b64 = base64.b64encode(markdown_text.encode()).decode()
+    export_file_name(datetime.now(), "md")
+    payload += len(b64) + LINK_MARKUP_BYTES
+
+    payload += len(project_to_markdown(project_data, FORM_DATA, "session"))
+    return payload
+
+
+def memoized_rerun(project_data, messages, memo):
+    """What the page sends now: markdown built once per revision and reused"""
+    payload = sum(len(project_data[name]) for name in SECTION_NAMES)
+    payload += sum(len(message["content"]) for message in messages)
+
+    if memo.get("sources") is not project_data:
+        revision = project_revision(project_data, FORM_DATA)
+    else:
+        revision = memo["revision"]
+    memo["sources"] = project_data
+    if memo.get("revision") != revision:
+        markdown_text = project_to_markdown(project_data, FORM_DATA, "session")
+        memo.update(revision=revision, markdown=markdown_text, markdown_bytes=markdown_text.encode())
+    payload += 2 * DOWNLOAD_BUTTON_BYTES
+    payload += len(memo["markdown"])
+    return payload
+
+
+def make_messages(turns):
+    answer = "You could add a peer-review step to the deliverables and weight it at 10%. " * 20
+    messages = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"Question {turn}: how can we add teamwork?"})
+        messages.append({"role": "assistant", "content": answer})
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chat-turns", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    messages = make_messages(args.chat_turns)
+    print(f"{'project':>9} {'before KB':>10} {'after KB':>9} {'saved':>6} {'before ms':>10} {'after ms':>9}")
+    for size in (8_000, 64_000, 512_000):
+        project_data = parse_project_response(make_response(size))
+        memo = {}
+
+        before = legacy_rerun(project_data, messages)
+        after = memoized_rerun(project_data, messages, memo)
+        before_ms = timeit.timeit(lambda: legacy_rerun(project_data, messages), number=args.repeat) / args.repeat * 1000
+        after_ms = timeit.timeit(lambda: memoized_rerun(project_data, messages, memo), number=args.repeat) / args.repeat * 1000
+
+        print(f"{size // 1000:>7}KB {before / 1024:>10.1f} {after / 1024:>9.1f} {1 - after / before:>6.0%} "
+              f"{before_ms:>10.2f} {after_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
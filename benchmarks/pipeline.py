@@ -0,0 +1,218 @@
+"""
+End-to-end benchmark of the generation pipeline against the fake backend:
+streamed generation through the shared scheduler, response parsing, export
+and the page payload, reported as p50/p95/p99 per metric.
+
+Results can be written as JSON and compared with a baseline written by an
+earlier commit; the comparison exits non-zero when a p50 or p95 regressed by
+more than the tolerance (p99 is shown but too noisy to gate on).
+
+    python -m benchmarks.pipeline [--requests 40] [--concurrency 4] [--json out.json] [--compare base.json]
+"""
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks.page_payload import make_messages, memoized_rerun
+from benchmarks.section_parser import make_response
+from projectcraft import client, scheduler
+from projectcraft.backends import BackendConfig, FakeBackend
+from projectcraft.docx_export import get_template, project_to_docx
+from projectcraft.export import project_to_markdown
+from projectcraft.generation import generate_project_response
+from projectcraft.sections import parse_project_response
+
+PERCENTILES = (50, 95, 99)
+GATED_PERCENTILES = (50, 95)
+PARSE_SIZES = (8_000, 64_000, 512_000)
+SUBJECTS = ["Data Science", "Biology", "Economics", "Robotics", "History", "Chemistry", "Statistics", "Music"]
+LEVELS = ["High School", "Undergraduate", "Graduate"]
+
+
+def make_form(index):
+    return {
+        "subject": SUBJECTS[index % len(SUBJECTS)],
+        "academic_level": LEVELS[index % len(LEVELS)],
+        "duration": f"{2 + index % 6} weeks",
+        "objectives": f"Objective set {index}: research, analysis, presentation",
+        "resources": "Python, spreadsheets, library access",
+    }
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of samples"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(samples, unit):
+    summary = {"unit": unit, "count": len(samples), "mean": sum(samples) / len(samples)}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = percentile(samples, p)
+    return summary
+
+
+def run_generation(index):
+    """Generate one streamed project; returns (ttft, total, response, project_data)"""
+    first_token = []
+    started = time.perf_counter()
+
+    def on_progress(_):
+        if not first_token:
+            first_token.append(time.perf_counter())
+
+    response, project_data = generate_project_response(
+        "offline", client.DEFAULT_MODEL, make_form(index), stream=True, on_progress=on_progress
+    )
+    finished = time.perf_counter()
+    return first_token[0] - started, finished - started, response, project_data
+
+
+def timed(func, *args, number=1):
+    """Mean seconds per call over `number` calls"""
+    started = time.perf_counter()
+    for _ in range(number):
+        func(*args)
+    return (time.perf_counter() - started) / number
+
+
+def run_benchmark(args):
+    """Run every stage and return {metric: summary}"""
+    client.set_backend(FakeBackend(BackendConfig(
+        backend="fake",
+        fake_time_to_first_token=args.ttft,
+        fake_token_delay=args.token_delay,
+        fake_latency_jitter=args.jitter,
+        fake_response_words=args.words,
+        fake_seed=args.seed,
+    )))
+    # Quotas would make the timings depend on the order of the runs, so only
+    # concurrency is limited
+    scheduler._scheduler = scheduler.RequestScheduler(scheduler.SchedulerConfig(
+        requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9, max_concurrent_requests=args.concurrency,
+    ))
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            generated = list(executor.map(run_generation, range(args.requests)))
+    finally:
+        client.set_backend(None)
+        scheduler._scheduler = None
+
+    metrics = {
+        "ttft_ms": summarize([ttft * 1000 for ttft, _, _, _ in generated], "ms"),
+        "generation_ms": summarize([total * 1000 for _, total, _, _ in generated], "ms"),
+        "response_bytes": summarize([len(response.encode()) for _, _, response, _ in generated], "bytes"),
+    }
+
+    for size in PARSE_SIZES:
+        response = make_response(size)
+        # Small responses parse in microseconds, so each sample averages several parses
+        number = max(1, PARSE_SIZES[-1] // size)
+        samples = [timed(parse_project_response, response, number=number) * 1000 for _ in range(args.repeat)]
+        metrics[f"parse_{size // 1000}kb_ms"] = summarize(samples, "ms")
+
+    markdown_ms, docx_ms, payload_bytes = [], [], []
+    messages = make_messages(args.chat_turns)
+    # The first export builds the Word template; that is a one-off per process
+    get_template()
+    for index, (_, _, _, project_data) in enumerate(generated):
+        form_data = make_form(index)
+        markdown_ms.append(timed(project_to_markdown, project_data, form_data, "benchmark") * 1000)
+        docx_ms.append(timed(project_to_docx, project_data, form_data, "benchmark") * 1000)
+        payload_bytes.append(memoized_rerun(project_data, messages, {}))
+    metrics["export_markdown_ms"] = summarize(markdown_ms, "ms")
+    metrics["export_docx_ms"] = summarize(docx_ms, "ms")
+    metrics["page_payload_bytes"] = summarize(payload_bytes, "bytes")
+    return metrics
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{revision}-dirty" if dirty else revision
+
+
+def print_table(metrics):
+    header = "".join(f"{f'p{p}':>11}" for p in PERCENTILES)
+    print(f"{'metric':<22} {'unit':<6} {'n':>4}{header}")
+    for name, summary in metrics.items():
+        values = "".join(f"{summary[f'p{p}']:>11.2f}" for p in PERCENTILES)
+        print(f"{name:<22} {summary['unit']:<6} {summary['count']:>4}{values}")
+
+
+def compare(metrics, baseline, tolerance):
+    """
+    Print the change of every percentile against the baseline and return the
+    metric percentiles in GATED_PERCENTILES that got worse by more than
+    tolerance
+    """
+    regressions = []
+    print(f"\ncompared with {baseline.get('revision') or 'baseline'} (tolerance {tolerance:.0%})")
+    print(f"{'metric':<22}" + "".join(f"{f'p{p}':>11}" for p in PERCENTILES))
+    for name, summary in metrics.items():
+        before = baseline["metrics"].get(name)
+        if before is None:
+            continue
+        changes = []
+        for p in PERCENTILES:
+            key = f"p{p}"
+            change = summary[key] / before[key] - 1 if before[key] else 0.0
+            changes.append(change)
+            if p in GATED_PERCENTILES and change > tolerance:
+                regressions.append(f"{name} {key}")
+        print(f"{name:<22}" + "".join(f"{change:>+11.1%}" for change in changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40, help="projects to generate")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--ttft", type=float, default=0.05, help="fake time to first token in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.0002, help="fake delay per token in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="fake latency jitter fraction")
+    parser.add_argument("--words", type=int, default=1200, help="words per fake project")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20, help="samples per parse size")
+    parser.add_argument("--chat-turns", type=int, default=20, help="chat turns on the page")
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    parser.add_argument("--compare", default=None, help="results file of a baseline run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    metrics = run_benchmark(args)
+    print_table(metrics)
+
+    result = {
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": vars(args),
+        "metrics": metrics,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(metrics, json.load(f), args.tolerance)
+        if regressions:
+            print(f"regressions: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Micro-benchmark: single-pass heading index vs. the per-section
+extract_section() scans previously used by generate_project().
+
+    python -m benchmarks.section_parser [--repeat N]
+"""
+import argparse
+import re
+import timeit
+
+from projectcraft.sections import (
+    SECTION_NAMES,
+    IncrementalSectionParser,
+    extract_section,
+    parse_project_response,
+)
+
+STREAM_MAX_BYTES = 64_000
+
+
+def legacy_parse(response):
+    """The original parse: title regex plus one extract_section() per section"""
+    title_match = re.search(r'^#+ (.+)$', response, re.MULTILINE)
+    project_data = {"title": title_match.group(1) if title_match else "Student Mini-Project"}
+    for index, section_name in enumerate(SECTION_NAMES):
+        next_section_name = SECTION_NAMES[index + 1] if index + 1 < len(SECTION_NAMES) else None
+        project_data[section_name] = extract_section(response, section_name, next_section_name)
+    return project_data
+
+
+def make_response(target_bytes):
+    """Build a synthetic markdown response of roughly target_bytes"""
+    paragraph = ("Students will analyse a real dataset, document their method "
+                 "and present findings to the class. ") * 4
+    per_section = max(1, target_bytes // len(SECTION_NAMES) // (len(paragraph) + 20))
+    parts = ["# Synthetic Benchmark Project\n\n"]
+    for section_name in SECTION_NAMES:
+        # "##" headings make the legacy parser miss "###" and scan twice
+        parts.append(f"## {section_name}\n\n")
+        for item in range(per_section):
+            parts.append(f"- Item {item}: {paragraph}\n")
+        parts.append("\n")
+    return "".join(parts)
+
+
+def stream_parse(response, chunk_size=16):
+    parser = IncrementalSectionParser()
+    for offset in range(0, len(response), chunk_size):
+        parser.feed(response[offset:offset + chunk_size])
+    return parser.finish()[0]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    print(f"{'size':>10} {'legacy ms':>11} {'indexed ms':>11} {'speedup':>8} {'stream ms':>10}")
+    for size in (8_000, 64_000, 512_000, 4_000_000):
+        response = make_response(size)
+        assert legacy_parse(response) == parse_project_response(response)
+        legacy = min(timeit.repeat(lambda: legacy_parse(response), number=1, repeat=args.repeat))
+        indexed = min(timeit.repeat(lambda: parse_project_response(response), number=1, repeat=args.repeat))
+        # Streaming copies the growing buffer per chunk, so only realistic
+        # response sizes are streamed
+        if size <= STREAM_MAX_BYTES:
+            assert stream_parse(response) == legacy_parse(response)
+            streamed = f"{min(timeit.repeat(lambda: stream_parse(response), number=1, repeat=3)) * 1000:.1f}"
+        else:
+            streamed = "-"
+        print(f"{len(response):>10} {legacy * 1000:>11.3f} {indexed * 1000:>11.3f} "
+              f"{legacy / indexed:>7.1f}x {streamed:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Near-duplicate lookup: build a SimilarityIndex over synthetic project forms
+and measure query latency and whether lightly edited forms find their
+original.
+
+    python -m benchmarks.similarity [--projects 50000] [--queries 1000]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from projectcraft.similarity import SimilarityIndex
+
+TOPICS = ["data science", "organic chemistry", "world history", "machine learning", "marine biology",
+          "microeconomics", "creative writing", "statistics", "robotics", "public health", "astronomy",
+          "cybersecurity", "urban planning", "philosophy", "genetics", "linear algebra", "game design",
+          "climate science", "digital marketing", "software engineering"]
+PREFIXES = ["introduction to", "advanced", "applied", "foundations of", "topics in", "principles of"]
+SKILLS = ["visualization", "critical analysis", "teamwork", "statistical modelling", "lab technique",
+          "academic writing", "presentation", "programming", "experimental design", "ethics",
+          "project management", "research methods", "data cleaning", "peer review", "prototyping"]
+TOOLS = ["Python", "R", "Excel", "lab equipment", "Jupyter", "Arduino", "public datasets", "library databases",
+         "Figma", "GitHub", "SPSS", "MATLAB"]
+LEVELS = ["High School", "Undergraduate (Year 1-2)", "Undergraduate (Year 3-4)", "Graduate"]
+DURATIONS = ["1 week", "2 weeks", "3-4 weeks", "5-6 weeks"]
+
+
+def make_form(rng):
+    return {
+        "subject": f"{rng.choice(PREFIXES)} {rng.choice(TOPICS)} {rng.randint(100, 999)}",
+        "academic_level": rng.choice(LEVELS),
+        "duration": rng.choice(DURATIONS),
+        "objectives": ", ".join(rng.sample(SKILLS, 3)),
+        "resources": ", ".join(rng.sample(TOOLS, 2)),
+        "theme": "",
+    }
+
+
+def edit_form(form):
+    """A near-duplicate: abbreviated subject and different spacing/case"""
+    edited = dict(form)
+    edited["subject"] = form["subject"].replace("introduction to", "intro to").replace("advanced", "adv.").title()
+    edited["objectives"] = form["objectives"].replace(", ", ",  ")
+    return edited
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--projects", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    forms = [make_form(rng) for _ in range(args.projects)]
+    index = SimilarityIndex()
+    started = time.perf_counter()
+    for project_id, form in enumerate(forms):
+        index.add(project_id, form)
+    build_seconds = time.perf_counter() - started
+
+    latencies, found = [], 0
+    for project_id in rng.sample(range(args.projects), args.queries):
+        query = edit_form(forms[project_id])
+        started = time.perf_counter()
+        matches = index.query(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found += any(match_id == project_id for match_id, _ in matches)
+
+    latencies.sort()
+    print(f"projects: {args.projects}, index built in {build_seconds:.1f}s")
+    print(f"query ms: p50 {statistics.median(latencies):.3f}, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.3f}")
+    print(f"near-duplicates found: {found / args.queries:.1%}")
+
+
+if __name__ == "__main__":
+    main()
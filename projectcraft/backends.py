@@ -0,0 +1,328 @@
+"""
+Chat backends: the interface behind create_chat_completion() and
+stream_chat_completion(), with local stand-ins for offline tests and
+benchmarks.
+
+A backend has two methods:
+
+- complete(model, messages, max_completion_tokens, timeout, response_format)
+  returns a Completion: the text and the token usage the API reported;
+- stream(...) with the same arguments returns a StreamHandle, an iterator of
+  text deltas with a close() method whose usage is set once the stream has
+  ended.
+
+Requests still go through the shared scheduler, so queueing, rate limits and
+retries behave as with the live API. FakeBackend replays responses recorded
+in a cassette (see RecordingBackend) or, for requests not in the cassette,
+writes a deterministic synthetic response of the right shape: a templated
+project, a single section, JSON for a response_format schema, or a chat
+answer. Time to first token, per-token delay (with optional random jitter) and
+injected errors are configurable.
+
+Select a backend with PROJECTCRAFT_BACKEND=openai (default), fake or record.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from .config import config_from_env
+from .sections import SECTION_NAMES
+
+_SECTION_REQUEST_RE = re.compile(r'starting with the heading "###\s*([^"]+)"')
+_TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+_WORDS = ("students will analyse design evaluate present collaborate dataset model report prototype "
+          "research question method evidence results findings iteration feedback peer review "
+          "visualisation documentation workflow criteria milestone reflection").split()
+
+
+@dataclass(frozen=True)
+class BackendConfig:
+    """Backend selection and FakeBackend behaviour."""
+    backend: str = "openai"
+    # JSONL cassette to replay (fake) or append to (record)
+    cassette_path: str = ""
+    # Fail requests missing from the cassette instead of synthesizing a response
+    fake_replay_strict: bool = False
+    fake_time_to_first_token: float = 0.3
+    fake_token_delay: float = 0.01
+    # Each request's delays are scaled by a random factor in 1 +- this fraction
+    fake_latency_jitter: float = 0.0
+    # Words in a synthetic project (sections and chat answers are shorter)
+    fake_response_words: int = 1200
+    # Fraction of requests that fail before the first token
+    fake_error_rate: float = 0.0
+    fake_error_status: int = 429
+    # Streams fail after this many tokens (0 disables)
+    fake_error_after_tokens: int = 0
+    fake_seed: int = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a config from PROJECTCRAFT_BACKEND, PROJECTCRAFT_CASSETTE_PATH
+        and PROJECTCRAFT_FAKE_* environment variables
+        """
+        return config_from_env(cls)
+
+
+class FakeAPIError(Exception):
+    """Injected API error; carries a status_code like openai.APIStatusError."""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def request_key(model, messages, response_format=None):
+    """Stable hash identifying a request in a cassette"""
+    payload = json.dumps({"model": model, "messages": messages, "response_format": response_format},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_cassette(path):
+    """Read a cassette into {request_key: recorded entry}; later entries win"""
+    entries = {}
+    if not path or not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry["key"]] = entry
+    return entries
+
+
+def split_tokens(text):
+    """Split text into token-sized chunks (words with their trailing space)"""
+    return _TOKEN_RE.findall(text)
+
+
+class Usage(NamedTuple):
+    """Prompt and completion tokens of a request, as counted by the API"""
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class Completion(NamedTuple):
+    """Text of a non-streamed completion; usage is None if the API reported none"""
+    text: str
+    usage: Usage = None
+
+
+class StreamHandle:
+    """
+    Iterator of text deltas with close(), like an API stream. usage is set by
+    the stream's producer when the API reports it, after the last delta.
+    """
+
+    def __init__(self, chunks, on_close=None):
+        self._chunks = iter(chunks)
+        self._on_close = on_close
+        self.closed = False
+        self.usage = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.closed:
+            raise StopIteration
+        return next(self._chunks)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            close = getattr(self._chunks, "close", None)
+            if close:
+                close()
+            if self._on_close:
+                self._on_close()
+
+
+def _sentence(rng, words):
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _paragraph(rng, words):
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 16))
+        sentences.append(_sentence(rng, length))
+        words -= length
+    return " ".join(sentences)
+
+
+def synthetic_section(rng, section_name, words):
+    """Body of a template section with the structure the prompt asks for"""
+    if section_name == "Evaluation Criteria":
+        weights = [30, 25, 25, 20]
+        rows = "\n".join(f"| {_sentence(rng, 3)[:-1]} | {weight}% |" for weight in weights)
+        return f"{_paragraph(rng, max(8, words - 24))}\n\n| Component | Weight |\n|---|---|\n{rows}"
+    if section_name == "Additional Resources":
+        items = max(3, words // 12)
+        return "\n".join(f"- {_sentence(rng, 8)[:-1]}: https://example.org/resource-{rng.randint(1, 999)}"
+                         for _ in range(items))
+    if section_name in ("Learning Objectives", "Deliverables"):
+        items = max(3, words // 12)
+        marker = "-" if section_name == "Learning Objectives" else None
+        return "\n".join(f"{marker or f'{index + 1}.'} {_sentence(rng, 10)}" for index in range(items))
+    return _paragraph(rng, words)
+
+
+def synthetic_response(model, messages, response_format=None, words=1200, seed=0):
+    """
+    Deterministic response of the shape the request asks for
+    """
+    key = request_key(model, messages, response_format)
+    rng = random.Random(f"{seed}:{key}")
+    prompt = messages[-1].get("content") or "" if messages else ""
+    system = messages[0].get("content") or "" if messages else ""
+    per_section = max(12, words // len(SECTION_NAMES))
+
+    if response_format and response_format.get("type") == "json_schema":
+        properties = response_format["json_schema"]["schema"].get("properties", {})
+        sections = {section_name.lower().replace(" ", "_"): section_name for section_name in SECTION_NAMES}
+        data = {}
+        for field in properties:
+            if field in sections:
+                data[field] = synthetic_section(rng, sections[field], per_section)
+            else:
+                data[field] = _sentence(rng, 4)[:-1].title()
+        return json.dumps(data)
+
+    section_request = _SECTION_REQUEST_RE.search(prompt)
+    if section_request:
+        section_name = section_request.group(1).strip()
+        return f"### {section_name}\n{synthetic_section(rng, section_name, per_section)}\n"
+
+    if "Standard Mini-Project Template" in system and "generate a mini-project" in prompt:
+        parts = [f"# {_sentence(rng, 4)[:-1].title()}\n"]
+        for section_name in SECTION_NAMES:
+            parts.append(f"### {section_name}\n{synthetic_section(rng, section_name, per_section)}\n")
+        return "\n".join(parts)
+
+    return "\n\n".join(_paragraph(rng, per_section) for _ in range(3))
+
+
+def _prompt_tokens(messages):
+    # The fake backend's token is a word (see split_tokens)
+    return sum(len(split_tokens(message.get("content") or "")) for message in messages)
+
+
+class FakeBackend:
+    """
+    Deterministic local backend: cassette replay with synthetic fallback,
+    simulated latency and injected errors
+    """
+
+    def __init__(self, config=None, sleep=time.sleep):
+        self.config = config or BackendConfig()
+        self._sleep = sleep
+        self._cassette = load_cassette(self.config.cassette_path)
+        self._rng = random.Random(self.config.fake_seed)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "replayed": 0, "synthesized": 0, "errors_injected": 0}
+
+    def _response(self, model, messages, response_format):
+        """Return (text, chunks or None, delay scale) and count the request"""
+        key = request_key(model, messages, response_format)
+        with self._lock:
+            self._stats["requests"] += 1
+            entry = self._cassette.get(key)
+            if entry is None and self.config.fake_replay_strict:
+                raise KeyError(f"request {key[:12]} is not in cassette {self.config.cassette_path}")
+            if self.config.fake_error_rate and self._rng.random() < self.config.fake_error_rate:
+                self._stats["errors_injected"] += 1
+                raise FakeAPIError(self.config.fake_error_status, "Injected error from the fake backend")
+            self._stats["replayed" if entry else "synthesized"] += 1
+            jitter = self.config.fake_latency_jitter
+            scale = 1.0 + self._rng.uniform(-jitter, jitter) if jitter else 1.0
+        if entry is not None:
+            return entry["response"], entry.get("chunks"), scale
+        text = synthetic_response(model, messages, response_format,
+                                  words=self.config.fake_response_words, seed=self.config.fake_seed)
+        return text, None, scale
+
+    def complete(self, model, messages, max_completion_tokens, timeout=None, response_format=None):
+        text, _, scale = self._response(model, messages, response_format)
+        tokens = split_tokens(text)[:max_completion_tokens]
+        self._sleep(scale * (self.config.fake_time_to_first_token + len(tokens) * self.config.fake_token_delay))
+        return Completion("".join(tokens), Usage(_prompt_tokens(messages), len(tokens)))
+
+    def stream(self, model, messages, max_completion_tokens, timeout=None, response_format=None):
+        def chunks():
+            # Errors are raised on the first next(), like a failing API stream
+            text, recorded, scale = self._response(model, messages, response_format)
+            self._sleep(scale * self.config.fake_time_to_first_token)
+            tokens = (recorded or split_tokens(text))[:max_completion_tokens]
+            for index, chunk in enumerate(tokens):
+                if self.config.fake_error_after_tokens and index == self.config.fake_error_after_tokens:
+                    with self._lock:
+                        self._stats["errors_injected"] += 1
+                    raise FakeAPIError(500, "Injected mid-stream error from the fake backend")
+                if index:
+                    self._sleep(scale * self.config.fake_token_delay)
+                yield chunk
+            handle.usage = Usage(_prompt_tokens(messages), len(tokens))
+
+        handle = StreamHandle(chunks())
+        return handle
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+class RecordingBackend:
+    """
+    Wraps another backend and appends every completed request and response
+    to a cassette that FakeBackend can replay
+    """
+
+    # Shared by all instances, which may append to the same cassette
+    _write_lock = threading.Lock()
+
+    def __init__(self, inner, cassette_path):
+        self.inner = inner
+        self.cassette_path = cassette_path
+        directory = os.path.dirname(cassette_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _record(self, model, messages, response_format, response, chunks=None):
+        entry = {"key": request_key(model, messages, response_format), "model": model, "response": response}
+        if chunks is not None:
+            entry["chunks"] = chunks
+        with self._write_lock, open(self.cassette_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def complete(self, model, messages, max_completion_tokens, timeout=None, response_format=None):
+        completion = self.inner.complete(model, messages, max_completion_tokens, timeout, response_format)
+        self._record(model, messages, response_format, completion.text)
+        return completion
+
+    def stream(self, model, messages, max_completion_tokens, timeout=None, response_format=None):
+        inner_stream = self.inner.stream(model, messages, max_completion_tokens, timeout, response_format)
+
+        def chunks():
+            recorded = []
+            for chunk in inner_stream:
+                recorded.append(chunk)
+                yield chunk
+            handle.usage = inner_stream.usage
+            # Only complete streams are recorded
+            self._record(model, messages, response_format, "".join(recorded), recorded)
+
+        handle = StreamHandle(chunks(), on_close=inner_stream.close)
+        return handle
@@ -0,0 +1,233 @@
+"""
+Bulk project generation from a CSV or JSONL file of course specs.
+
+Each row holds the fields of the project form (subject, academic_level,
+duration, objectives, resources and optionally theme, plus an optional id).
+Rows are generated concurrently and every finished row is appended to
+results.jsonl in the output directory, so an interrupted run can be resumed
+by running the same command again: rows already generated are skipped and
+failed rows are retried.
+
+    python -m projectcraft.batch courses.csv --out-dir batch_output --concurrency 8 --markdown
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from .backends import BackendConfig
+from .cache import ResponseCache, make_cache_key, normalize_form_data
+from .client import DEFAULT_MODEL
+from .export import project_to_markdown, record_file_name
+from .generation import generate_project_response
+from .prompts import PROJECT_GENERATOR_PROMPT
+from .routing import GENERATION, get_router
+from .sections import parse_project_response
+
+FORM_FIELDS = ["subject", "academic_level", "duration", "objectives", "resources", "theme"]
+REQUIRED_FIELDS = ["subject", "academic_level", "duration", "objectives", "resources"]
+RESULTS_FILE = "results.jsonl"
+
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+def read_specs(path):
+    """
+    Read course specs from a .csv or .jsonl file and return a list of
+    (row_id, form_data) tuples. Rows without an "id" column get a stable id
+    derived from their normalized form fields. Numbers and booleans in JSONL
+    rows are read as text; JSONL lines that are not JSON objects are
+    reported on stderr and skipped.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            rows = []
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    row, error = None, f"invalid JSON: {e}"
+                else:
+                    error = "not a JSON object"
+                if not isinstance(row, dict):
+                    print(f"{path}:{line_number}: skipped, {error}", file=sys.stderr)
+                    continue
+                rows.append(row)
+        else:
+            rows = list(csv.DictReader(f))
+
+    specs = []
+    for row in rows:
+        form_data = {field: _text(row.get(field)) for field in FORM_FIELDS}
+        row_id = _text(row.get("id"))
+        if not row_id:
+            payload = json.dumps(normalize_form_data(form_data), sort_keys=True)
+            row_id = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+        specs.append((row_id, form_data))
+    return specs
+
+
+def load_completed(out_dir):
+    """
+    Return the ids of rows that already have a successful result
+    """
+    completed = set()
+    path = os.path.join(out_dir, RESULTS_FILE)
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated last line behind
+                continue
+            if record.get("status") == "ok":
+                completed.add(record["id"])
+    return completed
+
+
+def generate_one(row_id, form_data, api_key, model, response_cache=None, structured=False):
+    """
+    Generate and parse one project. Returns the result record written to
+    results.jsonl; failures are reported in the record, not raised. The
+    record's model is the model that answered: the route's primary model,
+    or its fallback if the primary failed, whose responses are not cached.
+    """
+    generation_model = get_router().primary_model(GENERATION, model)
+    record = {"id": row_id, "form_data": form_data, "model": generation_model}
+    missing = [field for field in REQUIRED_FIELDS if not form_data.get(field)]
+    if missing:
+        record.update(status="failed", error=f"missing fields: {', '.join(missing)}")
+        return record
+
+    started = time.perf_counter()
+    try:
+        cache_key = make_cache_key(form_data, generation_model, PROJECT_GENERATOR_PROMPT)
+        response = response_cache.get(cache_key) if response_cache else None
+        record["cached"] = response is not None
+        if response is None:
+            progress = {}
+            response, project_data = generate_project_response(api_key, model, form_data, structured=structured,
+                                                               on_progress=progress.update)
+            record["model"] = progress.get("model") or generation_model
+            if response_cache and record["model"] == generation_model:
+                response_cache.set(cache_key, response)
+        else:
+            project_data = parse_project_response(response)
+    except Exception as e:
+        record.update(status="failed", error=str(e))
+        return record
+
+    record.update(
+        status="ok",
+        project_data=project_data,
+        raw_response=response,
+        duration_seconds=round(time.perf_counter() - started, 3),
+    )
+    return record
+
+
+def run_batch(specs, out_dir, api_key, model=DEFAULT_MODEL, concurrency=4,
+              write_markdown=False, response_cache=None, progress=None, structured=False):
+    """
+    Generate every spec not yet completed in out_dir using a thread pool of
+    `concurrency` workers. Results are appended to results.jsonl as they
+    finish. Returns a dict of counts (total, skipped, ok, failed).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    completed = load_completed(out_dir)
+
+    pending, seen = [], set(completed)
+    for row_id, form_data in specs:
+        if row_id not in seen:
+            seen.add(row_id)
+            pending.append((row_id, form_data))
+
+    counts = {"total": len(specs), "skipped": len(specs) - len(pending), "ok": 0, "failed": 0}
+    results_path = os.path.join(out_dir, RESULTS_FILE)
+
+    with open(results_path, "a", encoding="utf-8") as results_file, \
+            ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [
+            executor.submit(generate_one, row_id, form_data, api_key, model, response_cache, structured)
+            for row_id, form_data in pending
+        ]
+        try:
+            for future in as_completed(futures):
+                record = future.result()
+                # Only this thread writes, so lines are never interleaved
+                results_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                results_file.flush()
+
+                if record["status"] == "ok" and write_markdown:
+                    markdown_path = os.path.join(out_dir, record_file_name(record, "md"))
+                    with open(markdown_path, "w", encoding="utf-8") as f:
+                        f.write(project_to_markdown(record["project_data"], record["form_data"], f"batch-{record['id']}"))
+
+                counts[record["status"]] += 1
+                if progress:
+                    progress(record, counts)
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return counts
+
+
+def _print_progress(record, counts):
+    done = counts["ok"] + counts["failed"]
+    pending = counts["total"] - counts["skipped"]
+    detail = record["project_data"]["title"] if record["status"] == "ok" else record["error"]
+    print(f"[{done}/{pending}] {record['status']:6} {record['id']}  {detail}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate ProjectCraft projects in bulk from a CSV or JSONL file.")
+    parser.add_argument("specs", help="CSV or JSONL file with one course spec per row")
+    parser.add_argument("--out-dir", default="batch_output", help="directory for results.jsonl and markdown files")
+    parser.add_argument("--concurrency", type=int, default=4, help="maximum number of concurrent API calls")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--markdown", action="store_true", help="also write one markdown file per project")
+    parser.add_argument("--structured", action="store_true",
+                        help="request JSON with one field per section instead of parsing markdown")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the response cache")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    if BackendConfig.from_env().backend == "fake":
+        # Offline mode: responses come from the local fake backend, like in app.py
+        api_key = os.getenv("OPENAI_API_KEY") or "offline"
+    else:
+        api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        parser.error("OPENAI_API_KEY must be set in the environment or a .env file")
+
+    specs = read_specs(args.specs)
+    response_cache = None if args.no_cache else ResponseCache.from_env()
+    counts = run_batch(
+        specs, args.out_dir, api_key,
+        model=args.model,
+        concurrency=args.concurrency,
+        write_markdown=args.markdown,
+        response_cache=response_cache,
+        progress=_print_progress,
+        structured=args.structured,
+    )
+    print(f"{counts['ok']} generated, {counts['failed']} failed, {counts['skipped']} already done", file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+On-disk cache of generated projects, keyed on the normalized form inputs.
+
+Entries live in a small SQLite database. They expire after a TTL and the
+least recently used entries are evicted once the stored responses exceed a
+size budget.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_CACHE_PATH = os.path.join(".projectcraft", "response_cache.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+def normalize_form_data(form_data):
+    """
+    Normalize form fields so that trivially different submissions (case,
+    surrounding or repeated whitespace) share a cache entry
+    """
+    return {
+        field: " ".join(str(value or "").split()).casefold()
+        for field, value in sorted(form_data.items())
+    }
+
+
+def make_cache_key(form_data, model, system_prompt):
+    """
+    Hash the normalized form fields, the model name and the system prompt
+    """
+    payload = json.dumps(
+        {"form": normalize_form_data(form_data), "model": model, "prompt": system_prompt},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache with TTL expiry and size-based LRU eviction.
+
+    A connection is opened per operation, so one instance can be shared by
+    every Streamlit session and thread in the process.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a cache from PROJECTCRAFT_CACHE_PATH, PROJECTCRAFT_CACHE_TTL
+        (seconds) and PROJECTCRAFT_CACHE_MAX_BYTES
+        """
+        return cls(
+            path=os.getenv("PROJECTCRAFT_CACHE_PATH", DEFAULT_CACHE_PATH),
+            ttl_seconds=float(os.getenv("PROJECTCRAFT_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+            max_bytes=int(os.getenv("PROJECTCRAFT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        )
+
+    @contextmanager
+    def _connect(self):
+        # Commit on success, roll back on error, and always close
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """
+        Return the cached response for key, or None if missing or expired
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        return response
+
+    def set(self, key, response):
+        """
+        Store a response, then evict expired and least recently used entries
+        """
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def invalidate(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def stats(self):
+        """
+        Return the number of entries and their total size in bytes
+        """
+        with self._connect() as conn:
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"entries": entries, "bytes": total, "max_bytes": self.max_bytes}
@@ -0,0 +1,197 @@
+"""
+Context building for the refinement chat.
+
+Instead of resending the full raw response with every question, the context
+is assembled from:
+
+1. a static prefix (system prompt and chat instructions, then a short
+   project outline that only changes with the project), so provider-side
+   prompt caching can reuse it across turns;
+2. an extractive, token-budgeted summary of older conversation turns;
+3. the most recent turns verbatim;
+4. only the project sections relevant to the question, then the question.
+
+Token counts are estimated at about four characters per token.
+"""
+import re
+from dataclasses import dataclass
+
+from .config import config_from_env
+from .prompts import PROJECT_GENERATOR_PROMPT, build_project_outline, first_sentences
+from .sections import SECTION_NAMES
+
+CHAT_INSTRUCTIONS = """
+## Refinement Chat
+The teacher has already generated a mini-project with you and is now refining it. The project outline is given first; the full text of the sections relevant to each question is included with the question. Provide helpful suggestions, modifications, or insights about the project. If they're asking for specific changes, explain how those changes could be implemented.
+"""
+
+# Words in a question that point to a particular section
+SECTION_HINTS = {
+    "Overview": {"overview", "summary", "purpose", "introduction", "intro"},
+    "Learning Objectives": {"objective", "objectives", "skills", "learn", "learning", "outcomes", "goals"},
+    "Project Description": {"description", "context", "task", "problem", "scenario", "theme", "real-world",
+                            "real", "world", "relevance", "relevant", "applications", "industry"},
+    "Technical Requirements": {"requirements", "requirement", "technical", "tools", "data", "implementation",
+                               "challenging", "difficulty", "difficult", "simplify", "simpler", "complex",
+                               "advanced", "accessible", "easier", "harder"},
+    "Deliverables": {"deliverables", "deliverable", "report", "presentation", "outputs", "output",
+                     "teamwork", "team", "teams", "group", "groups", "collaboration", "collaborative"},
+    "Evaluation Criteria": {"evaluation", "grading", "grade", "rubric", "assessment", "assess", "weights",
+                            "marks", "criteria", "peer", "teamwork", "collaboration"},
+    "Additional Resources": {"resources", "resource", "links", "references", "datasets", "dataset",
+                             "tutorials", "reading", "urls"},
+    "Submission Guidelines": {"submission", "submit", "deadline", "deadlines", "due", "format"},
+}
+
+# Words that say nothing about which section a question concerns
+STOPWORDS = {
+    "the", "and", "for", "this", "that", "with", "into", "more", "less", "could", "would", "can", "how",
+    "what", "make", "project", "please", "you", "your", "some", "about", "from", "should", "our", "students",
+    "student", "like", "want", "also", "add", "there", "are", "its", "them", "they", "have", "has", "any",
+}
+
+_WORD_RE = re.compile(r"[a-z][a-z\-]{2,}")
+
+
+@dataclass(frozen=True)
+class ContextConfig:
+    """Token budgets for the parts of the chat context."""
+    context_section_tokens: int = 1500
+    context_summary_tokens: int = 300
+    context_history_tokens: int = 1200
+    context_recent_turns: int = 1
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a config from PROJECTCRAFT_CONTEXT_* environment variables
+        """
+        return config_from_env(cls)
+
+
+def estimate_text_tokens(text):
+    """Approximate token count of text (about 4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def _truncate(text, max_tokens):
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " …"
+
+
+def select_relevant_sections(project_data, question, budget_tokens):
+    """
+    Return the names of the sections most relevant to question, best first,
+    that fit within budget_tokens. Sections are scored by hint words and by
+    words shared with the section text; if nothing matches, sections are
+    taken in template order.
+    """
+    question_words = set(_WORD_RE.findall(question.lower())) - STOPWORDS
+    scored = []
+    for order, section_name in enumerate(SECTION_NAMES):
+        content = project_data.get(section_name) or ""
+        if not content:
+            continue
+        score = 3 * len(question_words & SECTION_HINTS[section_name])
+        score += 3 * len(question_words & set(_WORD_RE.findall(section_name.lower())))
+        score += len(question_words & set(_WORD_RE.findall(content.lower())))
+        scored.append((score, order, section_name))
+
+    if any(score for score, _, _ in scored):
+        scored = [entry for entry in scored if entry[0] > 0]
+        scored.sort(key=lambda entry: (-entry[0], entry[1]))
+
+    selected, used = [], 0
+    for _, _, section_name in scored:
+        tokens = estimate_text_tokens(project_data[section_name])
+        if selected and used + tokens > budget_tokens:
+            continue
+        selected.append(section_name)
+        used += tokens
+    return selected
+
+
+def _group_turns(history):
+    """Pair chat messages into (question, answer) turns"""
+    turns = []
+    for message in history:
+        if message["role"] == "user":
+            turns.append([message["content"], ""])
+        elif turns:
+            turns[-1][1] = message["content"]
+    return turns
+
+
+def summarize_history(turns, budget_tokens):
+    """
+    Extractive summary of older turns, newest kept first when the budget
+    runs out: the question and the opening of each answer
+    """
+    lines, used = [], 0
+    for question, answer in reversed(turns):
+        line = f"- Teacher asked: {first_sentences(question, 200)}"
+        if answer:
+            line += f" You answered: {first_sentences(answer, 300)}"
+        tokens = estimate_text_tokens(line)
+        if used + tokens > budget_tokens:
+            break
+        lines.insert(0, line)
+        used += tokens
+    return "\n".join(lines)
+
+
+def build_chat_messages(project_data, form_data, history, question, config=None):
+    """
+    Build the messages for a refinement question. history holds the earlier
+    chat messages (without the current question). Returns (messages,
+    token_report) where token_report has the estimated tokens per part.
+    """
+    config = config or ContextConfig.from_env()
+
+    # Static prefix: identical for every turn on the same project
+    system_content = PROJECT_GENERATOR_PROMPT + CHAT_INSTRUCTIONS
+    outline = build_project_outline(project_data, form_data)
+    messages = [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": outline},
+    ]
+
+    # Older turns are summarized, the latest ones are kept verbatim
+    turns = _group_turns(history)
+    recent = turns[-config.context_recent_turns:] if config.context_recent_turns else []
+    older = turns[:len(turns) - len(recent)]
+
+    summary = summarize_history(older, config.context_summary_tokens) if older else ""
+    if summary:
+        messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+
+    history_tokens = 0
+    per_message_budget = config.context_history_tokens // max(1, 2 * len(recent))
+    for recent_question, recent_answer in recent:
+        messages.append({"role": "user", "content": _truncate(recent_question, per_message_budget)})
+        history_tokens += estimate_text_tokens(messages[-1]["content"])
+        if recent_answer:
+            messages.append({"role": "assistant", "content": _truncate(recent_answer, per_message_budget)})
+            history_tokens += estimate_text_tokens(messages[-1]["content"])
+
+    # Only the sections the question is about, in full
+    section_names = select_relevant_sections(project_data, question, config.context_section_tokens)
+    sections_text = "\n\n".join(
+        f"### {section_name}\n{_truncate(project_data[section_name], config.context_section_tokens)}"
+        for section_name in section_names
+    )
+    final_content = f"Relevant sections of the current project:\n\n{sections_text}\n\nThe user is asking: {question}"
+    messages.append({"role": "user", "content": final_content})
+
+    token_report = {
+        "prefix": estimate_text_tokens(system_content) + estimate_text_tokens(outline),
+        "summary": estimate_text_tokens(summary),
+        "history": history_tokens,
+        "sections": estimate_text_tokens(sections_text),
+        "question": estimate_text_tokens(question),
+        "sections_included": section_names,
+    }
+    token_report["total"] = sum(token_report[part] for part in ("prefix", "summary", "history", "sections", "question"))
+    return messages, token_report
@@ -0,0 +1,137 @@
+"""
+Bounded chat history for a session.
+
+The refinement chat of a project is written to the project store one
+message at a time as it happens, and only the latest messages are kept in
+session memory. Older messages are read back from the store in pages when
+the user asks to see them, so the memory of a session and the work of a
+rerun stay the same however long the conversation gets. The context of a
+new question is built from the messages in memory (older turns are
+summarized there, see chat_context.build_chat_messages).
+
+Several sessions can chat about the same project: each message is added
+after the last stored one and removed by its own row, so no session
+overwrites another's messages.
+
+deep_sizeof() estimates what a session keeps in memory, for the sidebar's
+memory gauge.
+"""
+import sys
+from dataclasses import dataclass
+
+from .config import config_from_env
+
+
+@dataclass(frozen=True)
+class HistoryConfig:
+    """Chat window and memory budget of a session."""
+    # Messages kept in session memory; older ones are read from the store
+    history_window: int = 40
+    # Messages shown at first, and added by each "Load earlier messages"
+    history_page_size: int = 20
+    # Session memory shown as full on the gauge, in bytes
+    session_memory_budget: int = 5_000_000
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a config from PROJECTCRAFT_HISTORY_WINDOW,
+        PROJECTCRAFT_HISTORY_PAGE_SIZE and PROJECTCRAFT_SESSION_MEMORY_BUDGET
+        """
+        return config_from_env(cls)
+
+
+class ChatHistory:
+    """
+    The chat of one project: every message in the store, the latest
+    history_window of them in memory. Messages are dicts with role and
+    content, like the API's.
+    """
+
+    def __init__(self, project_id, store, config=None):
+        self.project_id = project_id
+        self.store = store
+        self.config = config or HistoryConfig.from_env()
+        # The latest messages, and how many earlier ones are only in the store
+        self.recent = []
+        self.spilled = 0
+        # Store sequence numbers of the messages in recent
+        self.seqs = []
+
+    @classmethod
+    def load(cls, project_id, store, config=None):
+        """The chat of a stored project, with its latest messages in memory"""
+        history = cls(project_id, store, config)
+        total = store.count_messages(project_id)
+        history.spilled = max(0, total - history.config.history_window)
+        history._set_window(store.load_messages(project_id, history.spilled, total, with_seq=True))
+        return history
+
+    def _set_window(self, rows):
+        self.seqs = [seq for seq, _ in rows]
+        self.recent = [message for _, message in rows]
+
+    def __len__(self):
+        return self.spilled + len(self.recent)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def append(self, role, content):
+        message = {"role": role, "content": content}
+        self.seqs.extend(self.store.append_messages(self.project_id, [message]))
+        self.recent.append(message)
+        overflow = len(self.recent) - self.config.history_window
+        if overflow > 0:
+            # Already in the store, so dropping them from memory loses nothing
+            del self.recent[:overflow]
+            del self.seqs[:overflow]
+            self.spilled += overflow
+
+    def pop(self):
+        """Remove and return the last message"""
+        message = self.recent.pop()
+        self.store.delete_message(self.project_id, self.seqs.pop())
+        if not self.recent and self.spilled:
+            start = max(0, self.spilled - self.config.history_window)
+            self._set_window(self.store.load_messages(self.project_id, start, self.spilled, with_seq=True))
+            self.spilled = start
+        return message
+
+    def last(self):
+        return self.recent[-1] if self.recent else None
+
+    def tail(self, count):
+        """
+        The last count messages, oldest first; those no longer in memory are
+        read from the store
+        """
+        if count <= len(self.recent):
+            return self.recent[len(self.recent) - count:]
+        start = max(0, len(self) - count)
+        return self.store.load_messages(self.project_id, start, self.spilled) + self.recent
+
+    def memory_bytes(self):
+        """Approximate memory held by the messages in the window"""
+        return deep_sizeof(self.recent)
+
+
+def deep_sizeof(value, seen=None):
+    """
+    Approximate bytes held by value and the containers and strings it
+    references. Objects with a memory_bytes() method report their own size;
+    other objects count only their own size.
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    memory_bytes = getattr(value, "memory_bytes", None)
+    if callable(memory_bytes) and not isinstance(value, type):
+        return memory_bytes()
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in value)
+    return size
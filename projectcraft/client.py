@@ -0,0 +1,409 @@
+"""
+Process-wide OpenAI client with a shared, pooled HTTP connection.
+
+Streamlit re-runs app.py for every interaction and every browser session, but
+imported modules stay loaded, so the client built here is reused by all
+sessions and reruns instead of paying for a new pool and TLS handshake on
+every call. Requests hold the client while they use it, so a client replaced
+after a change of API key or configuration is only closed once the requests
+still using it have ended.
+"""
+import os
+import threading
+from contextlib import closing
+from dataclasses import dataclass
+
+import httpx
+import openai
+
+from .backends import BackendConfig, Completion, FakeBackend, RecordingBackend, StreamHandle, Usage
+from .config import config_from_env
+from .metrics import get_metrics
+from .scheduler import Cancelled, DeadlineExceeded, check_cancelled, estimate_tokens, get_scheduler, is_retryable
+
+DEFAULT_MODEL = "gpt-5.1-2025-11-13"
+DEFAULT_MAX_COMPLETION_TOKENS = 4000
+
+
+@dataclass(frozen=True)
+class ClientConfig:
+    """Connection pool and timeout settings for the shared client."""
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 120.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 10.0
+    # Retries are handled by the request scheduler
+    max_retries: int = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a config from PROJECTCRAFT_* environment variables, e.g.
+        PROJECTCRAFT_MAX_CONNECTIONS=50 or PROJECTCRAFT_READ_TIMEOUT=90.
+        """
+        return config_from_env(cls)
+
+
+_lock = threading.Lock()
+_client = None
+_client_key = None
+# Requests in flight per client; a replaced client is closed by the last of them
+_users = {}
+_stats = {
+    "clients_created": 0,
+    "requests_sent": 0,
+    "responses_received": 0,
+    "in_flight": 0,
+}
+
+
+def _on_request(request):
+    with _lock:
+        _stats["requests_sent"] += 1
+        _stats["in_flight"] += 1
+
+
+def _on_response(response):
+    with _lock:
+        _stats["responses_received"] += 1
+        _stats["in_flight"] = max(0, _stats["in_flight"] - 1)
+
+
+def _build_http_client(config):
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=config.connect_timeout,
+            read=config.read_timeout,
+            write=config.write_timeout,
+            pool=config.pool_timeout,
+        ),
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+    )
+
+
+def _retire(client):
+    """
+    Return client if it can be closed now, None if requests are still using
+    it (the last one closes it); call with _lock held
+    """
+    return None if client is None or _users.get(client) else client
+
+
+def _current_client(api_key, config):
+    """
+    Return (the client for api_key and config, the client it replaced if that
+    can be closed now); call with _lock held
+    """
+    global _client, _client_key
+    key = (api_key, config)
+    if _client is not None and _client_key == key:
+        return _client, None
+
+    previous = _client
+    _client = openai.Client(
+        api_key=api_key,
+        http_client=_build_http_client(config),
+        max_retries=config.max_retries,
+    )
+    _client_key = key
+    _stats["clients_created"] += 1
+    return _client, _retire(previous)
+
+
+def get_openai_client(api_key, config=None):
+    """
+    Return the process-wide OpenAI client, creating it on first use.
+
+    The client is rebuilt only when the API key or pool configuration changes.
+    The previous client stays open for the requests still using it (see
+    acquire_openai_client) and is closed when the last of them has ended.
+    """
+    with _lock:
+        client, replaced = _current_client(api_key, config or ClientConfig.from_env())
+    if replaced is not None:
+        replaced.close()
+    return client
+
+
+def acquire_openai_client(api_key, config=None):
+    """
+    Return the shared client like get_openai_client(), kept open for the
+    caller until release_openai_client(client) even if it is replaced or
+    closed meanwhile
+    """
+    with _lock:
+        client, replaced = _current_client(api_key, config or ClientConfig.from_env())
+        _users[client] = _users.get(client, 0) + 1
+    if replaced is not None:
+        replaced.close()
+    return client
+
+
+def release_openai_client(client):
+    """Release a client from acquire_openai_client(), closing it if it was replaced and is no longer used"""
+    with _lock:
+        _users[client] -= 1
+        if not _users[client]:
+            del _users[client]
+        retired = None if client is _client else _retire(client)
+    if retired is not None:
+        retired.close()
+
+
+def get_pool_stats():
+    """
+    Return a snapshot of the shared client's connection pool.
+
+    Connection counts come from the underlying httpcore pool when it is
+    available; request counters are tracked by this module.
+    """
+    with _lock:
+        stats = dict(_stats)
+        client = _client
+        key = _client_key
+
+    if key is not None:
+        config = key[1]
+        stats["max_connections"] = config.max_connections
+        stats["max_keepalive_connections"] = config.max_keepalive_connections
+
+    connections = []
+    if client is not None:
+        transport = getattr(client._client, "_transport", None)
+        pool = getattr(transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+
+    stats["open_connections"] = len(connections)
+    stats["idle_connections"] = sum(1 for conn in connections if conn.is_idle())
+    return stats
+
+
+def close_openai_client():
+    """
+    Close the shared client and its connection pool, or once the requests
+    still using it have ended.
+    """
+    global _client, _client_key
+    with _lock:
+        client, _client, _client_key = _client, None, None
+        retired = _retire(client)
+    if retired is not None:
+        retired.close()
+
+
+def _usage(usage):
+    """Usage of an API response or stream chunk, None if it carries none"""
+    if usage is None:
+        return None
+    return Usage(usage.prompt_tokens, usage.completion_tokens)
+
+
+class OpenAIBackend:
+    """Chat backend for the live OpenAI API, on the shared client"""
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def complete(self, model, messages, max_completion_tokens, timeout=None, response_format=None):
+        extra = {"response_format": response_format} if response_format else {}
+        client = acquire_openai_client(self.api_key)
+        try:
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=False,
+                max_completion_tokens=max_completion_tokens,
+                timeout=timeout,
+                **extra,
+            )
+        finally:
+            release_openai_client(client)
+        return Completion(response.choices[0].message.content, _usage(response.usage))
+
+    def stream(self, model, messages, max_completion_tokens, timeout=None, response_format=None):
+        extra = {"response_format": response_format} if response_format else {}
+        # The client is released when the stream is closed
+        client = acquire_openai_client(self.api_key)
+        try:
+            stream = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                # The usage arrives in a last chunk without choices
+                stream_options={"include_usage": True},
+                max_completion_tokens=max_completion_tokens,
+                timeout=timeout,
+                **extra,
+            )
+        except BaseException:
+            release_openai_client(client)
+            raise
+
+        def close():
+            try:
+                stream.close()
+            finally:
+                release_openai_client(client)
+
+        def deltas():
+            for chunk in stream:
+                if chunk.usage is not None:
+                    handle.usage = _usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    yield chunk.choices[0].delta.content
+
+        handle = StreamHandle(deltas(), on_close=close)
+        return handle
+
+
+DEFAULT_CASSETTE_PATH = os.path.join("cassettes", "recorded.jsonl")
+
+_backend_lock = threading.Lock()
+_backend_override = None
+_backend_config = None
+_fake_backend = None
+
+
+def set_backend(backend):
+    """
+    Use backend for every request in the process, e.g. a FakeBackend in
+    tests and benchmarks; None restores the configured backend
+    """
+    global _backend_override
+    with _backend_lock:
+        _backend_override = backend
+
+
+def get_backend(api_key):
+    """
+    Return the backend for requests made with api_key: the one set with
+    set_backend(), otherwise the one selected by PROJECTCRAFT_BACKEND
+    """
+    global _backend_config, _fake_backend
+    with _backend_lock:
+        if _backend_override is not None:
+            return _backend_override
+        if _backend_config is None:
+            _backend_config = BackendConfig.from_env()
+            if _backend_config.backend == "fake":
+                _fake_backend = FakeBackend(_backend_config)
+        config = _backend_config
+
+    if config.backend == "fake":
+        return _fake_backend
+    if config.backend == "record":
+        return RecordingBackend(OpenAIBackend(api_key), config.cassette_path or DEFAULT_CASSETTE_PATH)
+    if config.backend == "openai":
+        return OpenAIBackend(api_key)
+    raise ValueError(f"Unknown PROJECTCRAFT_BACKEND {config.backend!r}")
+
+
+def _attempts(model, fallback_model, primary_retries):
+    """(model, max_retries, is_fallback) for the primary model and the fallback, if any"""
+    if not fallback_model or fallback_model == model:
+        return [(model, None, False)]
+    return [(model, primary_retries, False), (fallback_model, None, True)]
+
+
+def _should_fall_back(error):
+    # Rate limits, timeouts and server errors; not bad requests
+    return is_retryable(error) or isinstance(error, DeadlineExceeded)
+
+
+def create_chat_completion(api_key, model, messages, max_completion_tokens=DEFAULT_MAX_COMPLETION_TOKENS,
+                           deadline=None, response_format=None, kind="other", fallback_model=None,
+                           primary_retries=None, on_model=None):
+    """
+    Return the text of a non-streamed chat completion. The request goes
+    through the shared scheduler, which applies rate limits, retries and the
+    deadline (seconds). response_format is passed to the API as is, e.g. a
+    JSON schema for structured output. kind labels the request in the
+    metrics (generation, section, suggestion or chat).
+
+    With a fallback_model, the request is retried at most primary_retries
+    times on model and then sent to fallback_model if it failed with a rate
+    limit, timeout or server error (see routing.Route.options()). on_model
+    is called with the model that answered before its response is returned,
+    so callers can tell a fallback answer from one of model.
+    """
+    backend = get_backend(api_key)
+    attempts = _attempts(model, fallback_model, primary_retries)
+    for index, (attempt_model, max_retries, fallback) in enumerate(attempts):
+        timer = get_metrics().start(kind, attempt_model, messages, fallback=fallback)
+
+        def call(timeout):
+            return backend.complete(attempt_model, messages, max_completion_tokens, timeout, response_format)
+
+        try:
+            completion = get_scheduler().run(call, estimate_tokens(messages, max_completion_tokens), deadline,
+                                             on_retry=timer.retry, max_retries=max_retries)
+        except Cancelled:
+            timer.finish(status="cancelled")
+            raise
+        except Exception as e:
+            timer.fail(e)
+            if index == len(attempts) - 1 or not _should_fall_back(e):
+                raise
+            continue
+        timer.finish(completion_tokens=len(completion.text or "") // 4, usage=completion.usage)
+        if on_model:
+            on_model(attempt_model)
+        return completion.text
+
+
+def stream_chat_completion(api_key, model, messages, max_completion_tokens=DEFAULT_MAX_COMPLETION_TOKENS,
+                           deadline=None, response_format=None, kind="other", fallback_model=None,
+                           primary_retries=None, on_model=None):
+    """
+    Yield the content of a streamed chat completion chunk by chunk, through
+    the shared scheduler. Falls back like create_chat_completion(), but only
+    before the first chunk, and calls on_model with the answering model
+    before yielding it. Closing the generator, or cancelling the request
+    (see scheduler.cancellable), closes the stream and frees its slot.
+    """
+    backend = get_backend(api_key)
+    attempts = _attempts(model, fallback_model, primary_retries)
+    for index, (attempt_model, max_retries, fallback) in enumerate(attempts):
+        timer = get_metrics().start(kind, attempt_model, messages, streamed=True, fallback=fallback)
+
+        # The stream of the last attempt, which carries the usage once it has ended
+        opened = []
+
+        def open_stream(timeout):
+            opened.append(backend.stream(attempt_model, messages, max_completion_tokens, timeout, response_format))
+            return opened[-1]
+
+        # The API streams roughly one token per chunk
+        chunks = 0
+        scheduled = get_scheduler().stream(open_stream, estimate_tokens(messages, max_completion_tokens),
+                                           deadline, on_retry=timer.retry, max_retries=max_retries)
+        try:
+            # Closing the scheduler's generator closes the HTTP stream and frees the slot
+            with closing(scheduled):
+                for content in scheduled:
+                    check_cancelled()
+                    if not chunks:
+                        timer.first_token()
+                        if on_model:
+                            on_model(attempt_model)
+                    chunks += 1
+                    yield content
+        except (GeneratorExit, Cancelled):
+            # The consumer stopped reading, or the request was cancelled
+            timer.finish(completion_tokens=chunks, status="cancelled")
+            raise
+        except Exception as e:
+            timer.fail(e, completion_tokens=chunks)
+            if chunks or index == len(attempts) - 1 or not _should_fall_back(e):
+                raise
+            continue
+        timer.finish(completion_tokens=chunks, usage=opened[-1].usage)
+        return
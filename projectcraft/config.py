@@ -0,0 +1,23 @@
+"""
+Helpers for settings read from the environment.
+"""
+import os
+from dataclasses import fields
+
+
+def config_from_env(config_cls, prefix="PROJECTCRAFT_"):
+    """
+    Instantiate a dataclass of settings, overriding each field's default with
+    the environment variable PREFIX + FIELD_NAME (upper case) when it is set
+    """
+    values = {}
+    for field in fields(config_cls):
+        raw = os.getenv(f"{prefix}{field.name.upper()}")
+        if not raw:
+            continue
+        if isinstance(field.default, bool):
+            # bool("false") is True, so booleans are parsed by name
+            values[field.name] = raw.strip().lower() in ("1", "true", "yes", "on")
+        else:
+            values[field.name] = type(field.default)(raw)
+    return config_cls(**values)
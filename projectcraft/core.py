@@ -0,0 +1,452 @@
+"""
+Headless core of ProjectCraft: one project with its chat, revisions and
+exports, driven without any UI framework.
+
+A ProjectSession holds what a teacher works on: the form, the generated
+project, its candidates, chat and revisions. app.py keeps one per browser
+session and only adds widgets around it; a worker process, a batch job or a
+test can drive one directly:
+
+    session = ProjectSession(api_key, model, ProjectStore.from_env())
+    session.generate(form_data, on_progress=print)
+    for delta in session.stream_answer("How can we add teamwork?"):
+        print(delta, end="")
+    docx_bytes = session.export_docx()["docx_bytes"]
+
+Long-running work is available both ways: generate(), regenerate_sections()
+and ask() block and report progress through callbacks, while
+start_generation(), start_section_regeneration() and start_prefetch() submit
+the same work to a JobManager, whose progress can be polled, and
+apply_job() moves a finished job's result into the session. Answers stream
+as iterators of text deltas.
+"""
+import uuid
+from contextlib import closing
+from datetime import datetime
+
+from .cache import make_cache_key
+from .chat_context import build_chat_messages
+from .chat_history import ChatHistory, deep_sizeof
+from .client import stream_chat_completion
+from .docx_export import project_to_docx
+from .export import export_file_name, project_revision, project_to_markdown
+from .generation import run_generation_job, run_section_regeneration_job
+from .jobs import get_job_manager
+from .metrics import get_metrics
+from .prefetch import PrefetchConfig, run_suggestion_prefetch, wait_for_answer
+from .prompts import PROJECT_GENERATOR_PROMPT
+from .revisions import RevisionLog
+from .routing import CHAT, GENERATION, SUGGESTION, get_router
+from .sections import SECTION_NAMES, parse_project_response
+
+# Recorded in place of an answer when the API call fails
+API_ERROR_MESSAGE = "I'm sorry, there was an error processing your request. Please try again."
+
+# Outcomes of ProjectSession.prepare_generation()
+CACHED = "cached"
+SIMILAR = "similar"
+GENERATE = "generate"
+
+
+class CallbackProgress:
+    """Stands in for a Job when job functions run inline: update() calls on_progress"""
+
+    def __init__(self, on_progress=None):
+        self.progress = {}
+        self._on_progress = on_progress
+
+    def update(self, **progress):
+        self.progress.update(progress)
+        if self._on_progress:
+            self._on_progress(dict(self.progress))
+
+
+class ProjectSession:
+    """
+    A project being worked on, with its chat and revisions in the store.
+    Not thread-safe: one session belongs to one user (or worker) at a time.
+    """
+
+    def __init__(self, api_key, model, store, response_cache=None, similarity_index=None, job_manager=None,
+                 project_id=None):
+        self.api_key = api_key
+        self.model = model
+        self.store = store
+        self.response_cache = response_cache
+        self.similarity_index = similarity_index
+        self.job_manager = job_manager or get_job_manager()
+        self.reset(project_id)
+
+    def reset(self, project_id=None):
+        """Start over with an empty project under a new id"""
+        self.project_id = project_id or str(uuid.uuid4())
+        self.form_data = None
+        self.project_data = None
+        self.raw_response = ""
+        # Model that generated the project; the route's fallback if the primary failed
+        self.generation_model = None
+        # Best-of-N candidates of the last full generation, best first
+        self.candidates = None
+        self.served_from_cache = False
+        # Why structured output was not used, if it was asked for but failed
+        self.structured_fallback = None
+        self.chat = ChatHistory(self.project_id, self.store)
+        self.revisions = RevisionLog(self.project_id, self.store)
+        # Estimated tokens per part of the context of the last question
+        self.last_context_tokens = None
+        self._export = None
+        # The project_data and form_data objects the export was made from
+        self._export_sources = None
+        self._prefetch = None
+
+    def open(self, project_id):
+        """
+        Load a stored project with its chat and revisions; later changes
+        update the same entry. Returns False if the project is not stored.
+        """
+        record = self.store.get(project_id)
+        if record is None:
+            return False
+        self.cancel_prefetch()
+        self.reset(record["id"])
+        self.form_data = record["form_data"]
+        self.project_data = record["project_data"]
+        self.raw_response = record["raw_response"]
+        self.generation_model = record["model"]
+        self.chat = ChatHistory.load(record["id"], self.store)
+        self.revisions = RevisionLog.load(record["id"], self.store)
+        if not self.revisions:
+            # Stored before revisions were kept, or by a bulk generation
+            self.revisions.record(self.project_data, self.raw_response, "Stored version")
+        return True
+
+    def save(self, label):
+        """
+        Keep the project in the store under its id. A change of the project
+        is recorded as a new revision described by label.
+        """
+        self.revisions.record(self.project_data, self.raw_response, label)
+        self.store.save(self.project_id, self.form_data, self.project_data, self.raw_response,
+                        model=self.generation_model or self.model)
+        if self.similarity_index is not None:
+            self.similarity_index.add(self.project_id, self.form_data)
+
+    def _set_project(self, project_data, raw_response, label):
+        self.project_data = project_data
+        self.raw_response = raw_response
+        self.save(label)
+
+    # Generation
+
+    def prepare_generation(self, form_data, use_cache=True, check_similar=True):
+        """
+        First step of generating a project for form_data. Returns (outcome,
+        value):
+
+        - (CACHED, project_data) if an identical (normalized) request was in
+          the response cache; the project is set and saved
+        - (SIMILAR, matches) if stored projects were made from nearly the
+          same form; matches are dicts of id, similarity, title and form_data
+        - (GENERATE, cache_key) otherwise, to pass to generate() or
+          start_generation()
+
+        use_cache=False (e.g. on Regenerate) skips both lookups.
+        """
+        self.form_data = form_data
+        self.structured_fallback = None
+        generation_model = get_router().primary_model(GENERATION, self.model)
+        cache_key = make_cache_key(form_data, generation_model, PROJECT_GENERATOR_PROMPT)
+        response = self.response_cache.get(cache_key) if use_cache and self.response_cache is not None else None
+        self.served_from_cache = response is not None
+        if response is not None:
+            get_metrics().record_cache_hit(GENERATION, generation_model, "response_cache")
+            self.candidates = None
+            self.generation_model = generation_model
+            self._set_project(parse_project_response(response), response, "Generated (from cache)")
+            return CACHED, self.project_data
+
+        if use_cache and check_similar and self.similarity_index is not None:
+            matches = []
+            for project_id, similarity in self.similarity_index.query(form_data, exclude={self.project_id}):
+                record = self.store.get(project_id)
+                if record is not None:
+                    matches.append({"id": project_id, "similarity": similarity,
+                                    "title": record["project_data"].get("title", ""),
+                                    "form_data": record["form_data"]})
+            if matches:
+                return SIMILAR, matches
+        return GENERATE, cache_key
+
+    def _generation_args(self, cache_key, stream, structured, candidates):
+        return (self.api_key, self.model, self.form_data), {
+            "stream": stream,
+            "response_cache": self.response_cache,
+            "cache_key": cache_key,
+            "structured": structured,
+            "candidates": candidates,
+        }
+
+    def generate(self, form_data, stream=True, structured=False, candidates=1, use_cache=True, on_progress=None):
+        """
+        Generate a project for form_data and make it the current one,
+        reporting progress (tokens_received, title, completed sections) to
+        on_progress. Returns the project data.
+        """
+        outcome, value = self.prepare_generation(form_data, use_cache, check_similar=False)
+        if outcome == CACHED:
+            return value
+        progress = CallbackProgress(on_progress)
+        args, kwargs = self._generation_args(value, stream, structured, candidates)
+        result = run_generation_job(progress, *args, **kwargs)
+        self._apply_result(result, progress.progress, "Regenerated" if self.project_data else "Generated")
+        return self.project_data
+
+    def start_generation(self, cache_key, stream=True, structured=False, candidates=1, **submit_options):
+        """
+        Submit the generation prepared by prepare_generation() as a
+        background job and return it; a repeated call while it runs returns
+        the same job. submit_options go to JobManager.submit().
+        """
+        args, kwargs = self._generation_args(cache_key, stream, structured, candidates)
+        metadata = dict(submit_options.pop("metadata", None) or {}, form_data=self.form_data,
+                        label="Regenerated" if self.project_data else "Generated")
+        return self.job_manager.submit((self.project_id, cache_key), run_generation_job, *args,
+                                       metadata=metadata, **kwargs, **submit_options)
+
+    def _section_args(self, section_names):
+        return (self.api_key, self.model, self.form_data, self.project_data, self.raw_response, section_names)
+
+    @staticmethod
+    def _ordered_sections(section_names):
+        return [section_name for section_name in SECTION_NAMES if section_name in section_names]
+
+    def regenerate_sections(self, section_names, on_progress=None):
+        """
+        Rewrite section_names, one concurrent request per section with the
+        rest of the project as context, keeping the other sections. Returns
+        {section_name: error} of the sections that could not be rewritten.
+        """
+        section_names = self._ordered_sections(section_names)
+        progress = CallbackProgress(on_progress)
+        result = run_section_regeneration_job(progress, *self._section_args(section_names))
+        self.served_from_cache = False
+        return self._apply_result(result, progress.progress, "Regenerated " + ", ".join(section_names))
+
+    def start_section_regeneration(self, section_names, **submit_options):
+        """regenerate_sections() as a background job; see start_generation()"""
+        section_names = self._ordered_sections(section_names)
+        metadata = dict(submit_options.pop("metadata", None) or {}, form_data=self.form_data,
+                        label="Regenerated " + ", ".join(section_names))
+        self.served_from_cache = False
+        return self.job_manager.submit((self.project_id, "sections", tuple(section_names)),
+                                       run_section_regeneration_job, *self._section_args(section_names),
+                                       metadata=metadata, **submit_options)
+
+    def apply_job(self, job):
+        """
+        Move the result of a successfully finished job from start_generation()
+        or start_section_regeneration() into the session. Returns
+        {section_name: error} of sections that could not be regenerated.
+        """
+        return self._apply_result(job.result, job.snapshot()["progress"], job.metadata.get("label", "Generated"))
+
+    def _apply_result(self, result, progress, label):
+        self.structured_fallback = progress.get("structured_fallback")
+        if "candidates" in result:
+            # Section regeneration keeps the candidates and model of the last full generation
+            self.candidates = result["candidates"]
+            self.generation_model = result["model"]
+        self._set_project(result["project_data"], result["raw_response"], label)
+        return result.get("failed_sections") or {}
+
+    def show_candidate(self, index):
+        """Make candidate index (0 is the best) the current project"""
+        candidate = self.candidates[index]
+        self.generation_model = candidate["model"]
+        self._set_project(candidate["project_data"], candidate["raw_response"], f"Candidate #{index + 1}")
+
+    def restore(self, number):
+        """Make revision number the current project, recorded as a new revision"""
+        project_data, raw_response = self.revisions.checkout(number)
+        self._set_project(project_data, raw_response, f"Restored #{number}")
+
+    # Chat
+
+    def has_history(self):
+        """True if the chat in memory holds messages that go into the context of a question"""
+        return any(message["content"] != API_ERROR_MESSAGE for message in self.chat.recent)
+
+    def chat_messages(self, question):
+        """
+        The API messages for a refinement question: a cacheable prefix, a
+        summary of the conversation and only the sections relevant to the
+        question. Failed answers carry no context.
+        """
+        history = [message for message in self.chat.recent if message["content"] != API_ERROR_MESSAGE]
+        messages, self.last_context_tokens = build_chat_messages(self.project_data, self.form_data, history, question)
+        return messages
+
+    def stream_answer(self, question):
+        """
+        Ask a refinement question and yield the answer in text deltas as it
+        streams. The question is added to the chat at once and the answer
+        once complete; if the request fails, API_ERROR_MESSAGE is recorded
+        as the answer and the error re-raised. Closing the iterator early
+        ends the request and leaves the question unanswered (see
+        discard_unanswered).
+        """
+        messages = self.chat_messages(question)
+        self.chat.append("user", question)
+        route = get_router().route(CHAT, self.model)
+        chunks = []
+        try:
+            # The stream is closed, and its scheduler slot freed, however the loop ends
+            with closing(stream_chat_completion(self.api_key, route.model, messages, **route.options())) as stream:
+                for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+        except Exception:
+            self.chat.append("assistant", API_ERROR_MESSAGE)
+            raise
+        self.chat.append("assistant", "".join(chunks))
+
+    def ask(self, question, on_delta=None):
+        """stream_answer() to the end; on_delta gets each delta. Returns the answer."""
+        answer = ""
+        for delta in self.stream_answer(question):
+            answer += delta
+            if on_delta:
+                on_delta(delta)
+        return answer
+
+    def add_answer(self, question, answer):
+        """Add a question answered elsewhere, e.g. by a prefetch, to the chat"""
+        self.last_context_tokens = None
+        self.chat.append("user", question)
+        self.chat.append("assistant", answer)
+
+    def discard_unanswered(self, question):
+        """Drop question from the end of the chat if its answer never arrived"""
+        last = self.chat.last()
+        if last is not None and last["role"] == "user" and last["content"] == question:
+            self.chat.pop()
+            return True
+        return False
+
+    # Quick Suggestion prefetch
+
+    def start_prefetch(self):
+        """
+        Answer the Quick Suggestions of the current project revision in a
+        background job, once per revision; answers for an older revision are
+        dropped with it
+        """
+        revision = self.export()["revision"]
+        if self._prefetch is not None and self._prefetch["revision"] == revision:
+            self._touch_prefetch()
+            return
+        self.cancel_prefetch()
+        config = PrefetchConfig.from_env()
+        job = self.job_manager.submit(
+            (self.project_id, "prefetch", revision),
+            run_suggestion_prefetch, self.api_key, self.model, self.project_data, self.form_data, config,
+            heartbeat_timeout=config.prefetch_heartbeat_seconds,
+        )
+        self._prefetch = {"revision": revision, "job_id": job.id}
+
+    def _touch_prefetch(self):
+        job = self.job_manager.get(self._prefetch["job_id"])
+        if job is not None:
+            job.touch()
+        return job
+
+    def cancel_prefetch(self, reason="project changed"):
+        """Cancel the prefetch job, if any, and drop its answers"""
+        if self._prefetch is not None:
+            job = self.job_manager.get(self._prefetch["job_id"])
+            if job is not None:
+                job.cancel(reason)
+        self._prefetch = None
+
+    def prefetched_answer(self, suggestion_key):
+        """
+        The prefetched answer to a Quick Suggestion for the current project
+        revision, waiting for it if the prefetch is still running, or None
+        """
+        if self._prefetch is None or self._prefetch["revision"] != self.export()["revision"]:
+            return None
+        job = self._touch_prefetch()
+        if job is None:
+            return None
+        answer = wait_for_answer(job, suggestion_key)
+        if answer is not None:
+            get_metrics().record_cache_hit(SUGGESTION, get_router().primary_model(SUGGESTION, self.model), "prefetch")
+        return answer
+
+    # Export
+
+    def export(self):
+        """
+        The markdown export (text, bytes and file name) of the current
+        project revision, rendered once per revision and reused until the
+        project changes
+        """
+        cached = self._export
+        # Until the project changes, the same objects are kept, so an identity
+        # check avoids hashing the project on every call. The objects themselves
+        # are kept, not their id()s, which a new object may reuse once they are freed.
+        sources = self._export_sources
+        if cached is not None and sources[0] is self.project_data and sources[1] is self.form_data:
+            return cached
+
+        revision = project_revision(self.project_data, self.form_data)
+        if cached is None or cached["revision"] != revision:
+            generated_at = datetime.now()
+            markdown_text = project_to_markdown(self.project_data, self.form_data, self.project_id, generated_at)
+            cached = {
+                "revision": revision,
+                "generated_at": generated_at,
+                "markdown": markdown_text,
+                "markdown_bytes": markdown_text.encode("utf-8"),
+                "markdown_file_name": export_file_name(generated_at, "md"),
+                "docx_file_name": export_file_name(generated_at, "docx"),
+            }
+        self._export = cached
+        self._export_sources = (self.project_data, self.form_data)
+        return cached
+
+    def export_docx(self):
+        """export() with the Word document added on first use"""
+        self.docx_builder()()
+        return self.export()
+
+    def docx_builder(self):
+        """
+        A callable returning the Word document of the current revision, built
+        on its first call and kept with the export, e.g. for a download
+        button that builds the file only when clicked
+        """
+        project_export = self.export()
+        project_data, form_data, project_id = self.project_data, self.form_data, self.project_id
+
+        def build():
+            if "docx_bytes" not in project_export:
+                project_export["docx_bytes"] = project_to_docx(
+                    project_data, form_data, project_id, project_export["generated_at"],
+                )
+            return project_export["docx_bytes"]
+
+        return build
+
+    def memory_usage(self):
+        """Approximate bytes held in memory per part of the session"""
+        return {
+            "project": deep_sizeof([self.form_data, self.project_data, self.raw_response]),
+            "candidates": deep_sizeof(self.candidates),
+            "exports": deep_sizeof(self._export),
+            "chat": self.chat.memory_bytes(),
+            "revisions": self.revisions.memory_bytes(),
+        }
+
+    def memory_bytes(self):
+        return sum(self.memory_usage().values())
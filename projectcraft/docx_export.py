@@ -0,0 +1,341 @@
+"""
+Word (.docx) export of generated projects.
+
+Each section's markdown is mapped to native Word styles: headings to
+"Heading N", bullet and numbered lists to "List Bullet" / "List Number"
+(with the "2" and "3" variants for nested items; every numbered list
+restarts at its first number), pipe tables to tables in
+the "Table Grid" style, and **bold**, *italic* and `code` spans to run
+formatting. Styles are configured and their ids resolved once per template,
+and the prepared template is kept as bytes, so each export only loads it.
+
+Stored projects (e.g. the results.jsonl of a batch run) can be rendered into
+a zip file in bulk on a pool of worker processes:
+
+    python -m projectcraft.docx_export batch_output/results.jsonl --out projects.zip --workers 4
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+
+from docx import Document
+from docx.shared import Pt, RGBColor
+
+from .export import record_file_name
+from .sections import DEFAULT_TITLE, SECTION_NAMES
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_BULLET_RE = re.compile(r"^(\s*)[-*+]\s+(.*)$")
+_NUMBERED_RE = re.compile(r"^(\s*)(\d+)[.)]\s+(.*)$")
+_TABLE_SEPARATOR_RE = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+_RULE_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_INLINE_RE = re.compile(r"(\*\*[^*]+\*\*|__[^_]+__|\*[^*\s][^*]*\*|`[^`]+`|\[[^\]]+\]\([^)\s]+\))")
+
+HEADING_COLOR = RGBColor(0x4C, 0xAF, 0x50)
+
+# Paragraph styles used by the export, resolved to style ids once per template
+PARAGRAPH_STYLES = ["Title", *(f"Heading {level}" for level in range(1, 10)),
+                    *(f"List {kind}{suffix}" for kind in ("Bullet", "Number") for suffix in ("", " 2", " 3"))]
+
+_template_lock = threading.Lock()
+_templates = {}
+
+
+def _configure_styles(document):
+    """Fonts and colors applied once per template"""
+    styles = document.styles
+    styles["Normal"].font.name = "Calibri"
+    styles["Normal"].font.size = Pt(11)
+    for level in (1, 2, 3):
+        styles[f"Heading {level}"].font.color.rgb = HEADING_COLOR
+
+
+def get_template(template_path=None):
+    """
+    Return (template_bytes, style_ids) for the prepared template: the given
+    .docx (or python-docx's default template) with the body emptied and the
+    styles configured, plus the ids of PARAGRAPH_STYLES by name. Built once
+    per template path and process.
+    """
+    key = template_path or ""
+    with _template_lock:
+        if key not in _templates:
+            document = Document(template_path)
+            body = document.element.body
+            for element in list(body):
+                # Keep the page setup, drop any sample content
+                if not element.tag.endswith("}sectPr"):
+                    body.remove(element)
+            _configure_styles(document)
+            style_ids = {}
+            for name in PARAGRAPH_STYLES:
+                try:
+                    style_ids[name] = document.styles[name].style_id
+                except KeyError:
+                    # A custom template may lack the deeper levels
+                    pass
+            buffer = BytesIO()
+            document.save(buffer)
+            _templates[key] = (buffer.getvalue(), style_ids)
+        return _templates[key]
+
+
+def _add_paragraph(document, style_ids, style=None):
+    """
+    Add a paragraph with a style from PARAGRAPH_STYLES. The style id is set
+    directly because python-docx resolves style names with a scan of all
+    styles on every paragraph, which dominates the export time.
+    """
+    paragraph = document.add_paragraph()
+    if style in style_ids:
+        paragraph._p.style = style_ids[style]
+    return paragraph
+
+
+def _add_inline(paragraph, text):
+    """Add text to paragraph, turning inline markdown into run formatting"""
+    for token in _INLINE_RE.split(text):
+        if not token:
+            continue
+        if token.startswith(("**", "__")) and len(token) > 4:
+            paragraph.add_run(token[2:-2]).bold = True
+        elif token.startswith("`"):
+            paragraph.add_run(token[1:-1]).font.name = "Consolas"
+        elif token.startswith("*") and len(token) > 2:
+            paragraph.add_run(token[1:-1]).italic = True
+        elif token.startswith("["):
+            label, url = token[1:].split("](", 1)
+            paragraph.add_run(label)
+            paragraph.add_run(f" ({url[:-1]})")
+        else:
+            paragraph.add_run(token)
+
+
+def _table_cells(line):
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def _add_table(document, lines):
+    rows = [_table_cells(line) for line in lines if not _TABLE_SEPARATOR_RE.match(line)]
+    if not rows:
+        # Only separator rows, nothing to show
+        return
+    columns = max(len(row) for row in rows)
+    table = document.add_table(rows=len(rows), cols=columns)
+    table.style = "Table Grid"
+    for row_index, row in enumerate(rows):
+        for column, text in enumerate(row):
+            paragraph = table.cell(row_index, column).paragraphs[0]
+            _add_inline(paragraph, text)
+            if row_index == 0:
+                for run in paragraph.runs:
+                    run.bold = True
+
+
+def _new_list(document, style_ids, style, start):
+    """
+    Add a numbering instance for a new list in style, restarting at start,
+    and return its (numId, ilvl), or None if the style is not numbered.
+    Paragraphs that only carry the style share the style's numbering, so
+    Word would continue counting from the previous list.
+    """
+    style_element = document.styles.element.get_by_id(style_ids.get(style))
+    num_ids = style_element.xpath("./w:pPr/w:numPr/w:numId/@w:val") if style_element is not None else []
+    if not num_ids:
+        return None
+    numbering = document.part.numbering_part.element
+    abstract_num_id = numbering.num_having_numId(int(num_ids[0])).abstractNumId.val
+    # The level of the abstract numbering that is linked to the style
+    levels = numbering.xpath(f'./w:abstractNum[@w:abstractNumId="{abstract_num_id}"]'
+                             f'/w:lvl[w:pStyle/@w:val="{style_ids[style]}"]/@w:ilvl')
+    ilvl = int(levels[0]) if levels else 0
+    num = numbering.add_num(abstract_num_id)
+    num.add_lvlOverride(ilvl=ilvl).add_startOverride(start)
+    return num.numId, ilvl
+
+
+def _set_numbering(paragraph, num_id, ilvl):
+    num_pr = paragraph._p.get_or_add_pPr().get_or_add_numPr()
+    num_pr.get_or_add_ilvl().val = ilvl
+    num_pr.get_or_add_numId().val = num_id
+
+
+def _list_style(base, indent):
+    depth = min(indent // 2, 2)
+    return base if depth == 0 else f"{base} {depth + 1}"
+
+
+def add_markdown(document, style_ids, text, heading_offset=1):
+    """
+    Append markdown text to document. Headings inside the text are shifted
+    by heading_offset so that they nest under the section heading.
+    """
+    paragraph_lines = []
+    # Numbering of the numbered lists being written, per list style
+    open_lists = {}
+
+    def flush_paragraph():
+        if paragraph_lines:
+            _add_inline(document.add_paragraph(), " ".join(paragraph_lines))
+            paragraph_lines.clear()
+            open_lists.clear()
+
+    lines = text.splitlines()
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        stripped = line.strip()
+
+        if stripped.startswith("|"):
+            flush_paragraph()
+            table_lines = []
+            while index < len(lines) and lines[index].strip().startswith("|"):
+                table_lines.append(lines[index])
+                index += 1
+            _add_table(document, table_lines)
+            open_lists.clear()
+            continue
+
+        heading = _HEADING_RE.match(stripped)
+        bullet = _BULLET_RE.match(line)
+        numbered = _NUMBERED_RE.match(line)
+        if not stripped or _RULE_RE.match(stripped):
+            flush_paragraph()
+        elif heading:
+            flush_paragraph()
+            # Sections use "###", so "####" becomes the first level below the section
+            level = min(9, heading_offset + max(1, len(heading.group(1)) - 3))
+            _add_inline(_add_paragraph(document, style_ids, f"Heading {level}"), heading.group(2))
+            open_lists.clear()
+        elif bullet:
+            flush_paragraph()
+            indent = len(bullet.group(1).expandtabs(4))
+            if indent < 2:
+                # Only bullets nested in a numbered item keep its list going
+                open_lists.clear()
+            _add_inline(_add_paragraph(document, style_ids, _list_style("List Bullet", indent)), bullet.group(2))
+        elif numbered:
+            flush_paragraph()
+            indent = len(numbered.group(1).expandtabs(4))
+            style = _list_style("List Number", indent)
+            # A new item ends the lists nested below its level
+            for nested in [name for name in open_lists if name > style]:
+                del open_lists[nested]
+            if style not in open_lists:
+                open_lists[style] = _new_list(document, style_ids, style, int(numbered.group(2)))
+            paragraph = _add_paragraph(document, style_ids, style)
+            if open_lists[style]:
+                _set_numbering(paragraph, *open_lists[style])
+            _add_inline(paragraph, numbered.group(3))
+        else:
+            paragraph_lines.append(stripped)
+        index += 1
+    flush_paragraph()
+
+
+def project_to_docx(project_data, form_data, session_id, generated_at=None, template_path=None):
+    """
+    Convert a generated project to a Word document and return its bytes
+    """
+    generated_at = generated_at or datetime.now()
+    template_bytes, style_ids = get_template(template_path)
+    document = Document(BytesIO(template_bytes))
+
+    _add_inline(_add_paragraph(document, style_ids, "Title"), project_data.get("title") or DEFAULT_TITLE)
+    for label, field in (("Subject", "subject"), ("Academic Level", "academic_level"), ("Duration", "duration")):
+        paragraph = document.add_paragraph()
+        paragraph.add_run(f"{label}: ").bold = True
+        paragraph.add_run(form_data.get(field) or "N/A")
+
+    for section_name in SECTION_NAMES:
+        content = project_data.get(section_name)
+        if content:
+            _add_paragraph(document, style_ids, "Heading 1").add_run(section_name)
+            add_markdown(document, style_ids, content)
+
+    footer = document.add_paragraph()
+    footer.add_run(f"Generated by ProjectCraft on {generated_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                   f"Session ID: {session_id}").italic = True
+
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _render_record(record, template_path):
+    return record_file_name(record, "docx"), project_to_docx(
+        record["project_data"], record["form_data"], f"batch-{record['id']}", template_path=template_path
+    )
+
+
+def read_records(path):
+    """
+    Read the successful records of a results.jsonl file; later records for
+    the same id replace earlier ones
+    """
+    records = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status", "ok") == "ok" and record.get("project_data"):
+                records[record["id"]] = record
+    return list(records.values())
+
+
+def export_docx_zip(records, zip_path, workers=4, template_path=None, progress=None):
+    """
+    Render records (dicts with id, form_data and project_data) to .docx files
+    in a zip archive, using `workers` processes. Documents are written to the
+    archive as they are rendered, so memory stays bounded. Returns the number
+    of documents written.
+    """
+    count = 0
+    # .docx files are already deflated, so they are stored as is
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        if workers <= 1:
+            rendered = (_render_record(record, template_path) for record in records)
+            for file_name, data in rendered:
+                archive.writestr(file_name, data)
+                count += 1
+                if progress:
+                    progress(count, file_name)
+            return count
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(records) // (workers * 4))
+            for file_name, data in executor.map(_render_record, records, [template_path] * len(records),
+                                                chunksize=chunksize):
+                archive.writestr(file_name, data)
+                count += 1
+                if progress:
+                    progress(count, file_name)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export stored ProjectCraft projects to Word documents in a zip file.")
+    parser.add_argument("results", help="results.jsonl from a batch run")
+    parser.add_argument("--out", default=None, help="zip file to write (default: projects_<timestamp>.zip)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--template", default=None, help=".docx whose styles and page setup are used")
+    args = parser.parse_args(argv)
+
+    records = read_records(args.results)
+    out = args.out or f"projects_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    count = export_docx_zip(records, out, workers=args.workers, template_path=args.template)
+    print(f"{count} documents written to {out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Export of generated projects.
+"""
+import hashlib
+import re
+from datetime import datetime
+
+
+def project_to_markdown(project_data, form_data, session_id, generated_at=None):
+    """
+    Convert a generated project to a markdown string
+    """
+    generated_at = generated_at or datetime.now()
+
+    markdown_text = f"# {project_data.get('title', 'Student Mini-Project')}\n\n"
+    markdown_text += f"**Subject:** {form_data.get('subject', 'N/A')}\n"
+    markdown_text += f"**Academic Level:** {form_data.get('academic_level', 'N/A')}\n"
+    markdown_text += f"**Duration:** {form_data.get('duration', 'N/A')}\n\n"
+
+    # Add each section of the project
+    for section, content in project_data.items():
+        if section != 'title' and content:
+            markdown_text += f"## {section}\n\n"
+            markdown_text += f"{content}\n\n"
+
+    markdown_text += "---\n\n"
+    markdown_text += f"Generated by ProjectCraft on {generated_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
+    markdown_text += f"Session ID: {session_id}\n"
+
+    return markdown_text
+
+
+def project_revision(project_data, form_data):
+    """
+    Content hash of a project and its form, used to memoize exports: any
+    change to a section, the title or the form gives a new revision
+    """
+    digest = hashlib.sha256()
+    for data in (project_data, form_data):
+        for key in sorted(data):
+            digest.update(f"{key}\0{data[key] or ''}\0".encode("utf-8"))
+        digest.update(b"\1")
+    return digest.hexdigest()[:16]
+
+
+def export_file_name(generated_at, extension):
+    """File name for a downloaded project, e.g. student_project_20250101_120000.md"""
+    return f"student_project_{generated_at.strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+def record_file_name(record, extension):
+    """File name for a stored project record (id, form_data), from its subject and id"""
+    slug = re.sub(r"[^a-z0-9]+", "-", record["form_data"]["subject"].lower()).strip("-")[:60]
+    return f"{slug or 'project'}-{record['id']}.{extension}"
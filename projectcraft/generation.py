@@ -0,0 +1,273 @@
+"""
+Project generation independent of the UI, shared by the app's background
+jobs and the batch runner.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .client import create_chat_completion, stream_chat_completion
+from .prompts import build_project_messages, build_section_messages
+from .routing import GENERATION, SECTION, get_router
+from .scoring import score_project
+from .sections import (
+    IncrementalSectionParser,
+    SECTION_NAMES,
+    index_headings,
+    parse_project_response,
+    replace_section,
+    split_sections,
+)
+from .structured import (
+    PROJECT_RESPONSE_FORMAT,
+    StructuredOutputError,
+    build_structured_project_messages,
+    parse_structured_response,
+    project_data_to_markdown,
+)
+
+
+def generate_project_response(api_key, model, form_data, stream=False, on_progress=None, structured=False):
+    """
+    Generate a project for form_data and return (raw_response, project_data).
+
+    With stream=True the response is parsed as it arrives and on_progress is
+    called with a dict of tokens_received, title and the sections completed
+    so far. Either way on_progress gets the model that answered, which is
+    the route's fallback model if the primary failed.
+
+    With structured=True the model fills a JSON schema with one field per
+    section (see generate_structured_project). If that request is rejected
+    or its response does not validate, the project is generated again the
+    markdown way and on_progress reports the reason as structured_fallback.
+    """
+    if structured:
+        try:
+            return generate_structured_project(api_key, model, form_data, stream=stream, on_progress=on_progress)
+        except StructuredOutputError as e:
+            fallback_reason = str(e)
+        except Exception as e:
+            # Models without structured output support reject the request
+            if getattr(e, "status_code", None) != 400:
+                raise
+            fallback_reason = str(e)
+        if on_progress:
+            on_progress({"structured_fallback": fallback_reason})
+
+    messages = build_project_messages(form_data)
+    route = get_router().route(GENERATION, model, form_data)
+    on_model = _model_reporter(on_progress)
+
+    if not stream:
+        response = create_chat_completion(api_key, route.model, messages, on_model=on_model, **route.options())
+        return response, parse_project_response(response)
+
+    parser = IncrementalSectionParser()
+    tokens_received = 0
+    for content in stream_chat_completion(api_key, route.model, messages, on_model=on_model, **route.options()):
+        # The API streams roughly one token per chunk
+        tokens_received += 1
+        completed = parser.feed(content)
+        if on_progress:
+            progress = {"tokens_received": tokens_received, "title": parser.title}
+            if completed:
+                progress["sections"] = dict(parser.sections)
+            on_progress(progress)
+
+    project_data, _ = parser.finish()
+    if on_progress:
+        on_progress({"tokens_received": tokens_received, "title": project_data["title"],
+                     "sections": {name: project_data[name] for name in SECTION_NAMES}})
+    return parser.buffer, project_data
+
+
+def _model_reporter(on_progress):
+    if on_progress is None:
+        return None
+    return lambda answered_model: on_progress({"model": answered_model})
+
+
+def generate_structured_project(api_key, model, form_data, stream=False, on_progress=None):
+    """
+    Generate a project as schema-constrained JSON and return (raw_response,
+    project_data), where raw_response is the project rendered as markdown.
+    Raises StructuredOutputError if the response does not validate.
+    """
+    messages = build_structured_project_messages(form_data)
+    route = get_router().route(GENERATION, model, form_data)
+    on_model = _model_reporter(on_progress)
+
+    chunks = []
+    if not stream:
+        response = create_chat_completion(api_key, route.model, messages, response_format=PROJECT_RESPONSE_FORMAT,
+                                          on_model=on_model, **route.options())
+    else:
+        # Partial JSON is not shown; only the token count is reported
+        for content in stream_chat_completion(api_key, route.model, messages, response_format=PROJECT_RESPONSE_FORMAT,
+                                              on_model=on_model, **route.options()):
+            chunks.append(content)
+            if on_progress:
+                on_progress({"tokens_received": len(chunks)})
+        response = "".join(chunks)
+
+    project_data = parse_structured_response(response)
+    if on_progress:
+        on_progress({"tokens_received": len(chunks), "title": project_data["title"],
+                     "sections": {name: project_data[name] for name in SECTION_NAMES}})
+    return project_data_to_markdown(project_data), project_data
+
+
+def generate_candidates(api_key, model, form_data, count, stream=False, on_progress=None, structured=False):
+    """
+    Generate `count` projects concurrently and score them locally (see
+    scoring.score_project). Returns (candidates, errors): candidates are
+    dicts of raw_response, project_data, score, checks and the model that
+    answered, best first, and errors lists the exceptions of the candidates
+    that failed.
+
+    on_progress reports the candidate that is furthest along, so a streamed
+    best-of-N generation looks like a single one.
+    """
+    lock = threading.Lock()
+    progress_by_candidate = {}
+
+    def candidate_progress(index, progress):
+        with lock:
+            progress_by_candidate.setdefault(index, {}).update(progress)
+            leader = max(progress_by_candidate.values(),
+                         key=lambda state: (len(state.get("sections", {})), state.get("tokens_received", 0)))
+            if on_progress:
+                on_progress(dict(leader, candidates=count))
+
+    def generate(index):
+        return generate_project_response(
+            api_key, model, form_data, stream=stream, structured=structured,
+            on_progress=lambda progress: candidate_progress(index, progress),
+        )
+
+    candidates, errors = [], []
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = {executor.submit(contextvars.copy_context().run, generate, index): index for index in range(count)}
+        for future in as_completed(futures):
+            try:
+                raw_response, project_data = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            score, checks = score_project(project_data, form_data)
+            with lock:
+                answered_model = progress_by_candidate.get(futures[future], {}).get("model")
+            candidates.append({"raw_response": raw_response, "project_data": project_data,
+                               "score": score, "checks": checks, "model": answered_model})
+    candidates.sort(key=lambda candidate: -candidate["score"])
+    return candidates, errors
+
+
+def run_generation_job(job, api_key, model, form_data, stream=True, response_cache=None, cache_key=None,
+                       structured=False, candidates=1):
+    """
+    Job function for JobManager.submit(): generate a project, reporting
+    progress on the job, and store the response in the cache. cache_key
+    must be made for the route's primary model: a response from the
+    fallback model is not cached, so it cannot be served later as the
+    primary's. The result's model is the model that answered.
+
+    With candidates > 1 that many projects are generated concurrently and
+    the best-scoring one becomes the result; all of them are returned in
+    the result's candidates, best first. Fails only if every candidate
+    failed.
+    """
+    job.update(tokens_received=0, title=None, sections={})
+    answered = {}
+
+    def on_progress(progress):
+        if "model" in progress:
+            answered["model"] = progress["model"]
+        job.update(**progress)
+
+    if candidates > 1:
+        scored, errors = generate_candidates(api_key, model, form_data, candidates, stream=stream,
+                                             on_progress=on_progress, structured=structured)
+        if not scored:
+            raise errors[0]
+        response, project_data = scored[0]["raw_response"], scored[0]["project_data"]
+        answered_model = scored[0]["model"]
+    else:
+        scored = None
+        response, project_data = generate_project_response(
+            api_key, model, form_data, stream=stream, on_progress=on_progress, structured=structured,
+        )
+        answered_model = answered.get("model")
+    if response_cache is not None and cache_key and answered_model == get_router().primary_model(GENERATION, model):
+        response_cache.set(cache_key, response)
+    return {"raw_response": response, "project_data": project_data, "candidates": scored, "model": answered_model}
+
+
+def regenerate_section(api_key, model, form_data, project_data, section_name):
+    """
+    Rewrite one section of a project and return its new content
+    """
+    messages = build_section_messages(form_data, project_data, section_name)
+    route = get_router().route(SECTION, model, form_data, section_name)
+    response = create_chat_completion(api_key, route.model, messages, **route.options())
+
+    content = split_sections(response).get(section_name)
+    if not content:
+        # The model left out or renamed the heading; drop a leading heading line
+        headings = index_headings(response)
+        if headings and not response[:headings[0].start].strip():
+            response = response[headings[0].content_start:]
+        content = response.strip()
+    return content
+
+
+def regenerate_sections(api_key, model, form_data, project_data, section_names, on_progress=None):
+    """
+    Rewrite several sections concurrently. Returns ({section_name: content},
+    {section_name: error}); on_progress is called with the sections
+    finished so far.
+    """
+    new_sections, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, len(section_names))) as executor:
+        futures = {
+            # Each worker runs in a copy of the caller's context, so metrics keep the session
+            executor.submit(contextvars.copy_context().run, regenerate_section, api_key, model, form_data,
+                            project_data, section_name): section_name
+            for section_name in section_names
+        }
+        for future in as_completed(futures):
+            section_name = futures[future]
+            try:
+                new_sections[section_name] = future.result()
+            except Exception as e:
+                errors[section_name] = e
+            if on_progress:
+                on_progress(dict(new_sections))
+    return new_sections, errors
+
+
+def run_section_regeneration_job(job, api_key, model, form_data, project_data, raw_response, section_names):
+    """
+    Job function for JobManager.submit(): regenerate section_names and merge
+    them into the project data and raw response. Fails only if every
+    section failed; otherwise failed sections keep their old content and are
+    listed in the result's failed_sections.
+    """
+    job.update(title=project_data.get("title"), sections={}, sections_total=len(section_names))
+    new_sections, errors = regenerate_sections(
+        api_key, model, form_data, project_data, section_names,
+        on_progress=lambda sections: job.update(sections=sections),
+    )
+    if errors and not new_sections:
+        raise next(iter(errors.values()))
+
+    merged_project_data = dict(project_data)
+    merged_project_data.update(new_sections)
+    for section_name, content in new_sections.items():
+        raw_response = replace_section(raw_response, section_name, content)
+
+    return {
+        "project_data": merged_project_data,
+        "raw_response": raw_response,
+        "failed_sections": {section_name: str(error) for section_name, error in errors.items()},
+    }
@@ -0,0 +1,221 @@
+"""
+Background jobs for work that must not block a Streamlit script run.
+
+Jobs run on a process-wide worker pool and are looked up by id, so a rerun,
+a tab switch or a reconnecting browser can keep polling the same job instead
+of starting the request again.
+
+Jobs can be cancelled: their API requests stop at the next chunk, queue
+check or retry, or when a non-streamed response arrives (see
+scheduler.cancellable), and a partial result is discarded. Jobs submitted
+with a heartbeat timeout are cancelled automatically when nobody has polled
+them for that long, e.g. because the browser tab was closed.
+"""
+import contextvars
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .scheduler import Cancelled, cancellable
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Seconds between checks for jobs whose heartbeat timed out
+REAP_INTERVAL_SECONDS = 5.0
+
+
+class Job:
+    """
+    A unit of background work. The worker reports progress through update();
+    readers use snapshot() to get a consistent copy.
+    """
+
+    def __init__(self, key, metadata=None, heartbeat_timeout=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.metadata = metadata or {}
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.heartbeat_timeout = heartbeat_timeout
+        self.last_seen = time.monotonic()
+        self.cancel_event = threading.Event()
+        self.cancel_reason = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        """
+        Ask the job to stop; it finishes as CANCELLED without a result.
+        Returns False if it had already finished.
+        """
+        with self._lock:
+            if self.done:
+                return False
+            self.cancel_reason = reason
+            self.cancel_event.set()
+        return True
+
+    def _start(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.status = RUNNING
+
+    def _finish(self, status, result=None, error=None):
+        """
+        Record the outcome. finished_at is set together with the terminal
+        status, so a done job always has one.
+        """
+        with self._lock:
+            self.finished_at = time.time()
+            self.result = result
+            self.error = error
+            self.status = status
+
+    def touch(self):
+        """Record that a client is still waiting for the job"""
+        self.last_seen = time.monotonic()
+
+    def update(self, **progress):
+        """Merge progress values reported by the worker"""
+        with self._lock:
+            self.progress.update(progress)
+
+    def snapshot(self):
+        """Return the job state as a plain dict"""
+        with self._lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "progress": dict(self.progress),
+                "error": self.error,
+                "cancel_reason": self.cancel_reason,
+            }
+
+
+class JobManager:
+    """
+    Runs jobs on a thread pool. Submitting a job whose key matches an
+    unfinished job returns that job instead of starting a duplicate. Finished
+    jobs are kept for retention_seconds so that clients can collect them.
+    """
+
+    def __init__(self, max_workers=8, retention_seconds=3600):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="projectcraft-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._reap_abandoned, name="projectcraft-job-reaper", daemon=True).start()
+
+    def submit(self, key, func, *args, metadata=None, heartbeat_timeout=None, **kwargs):
+        """
+        Run func(job, *args, **kwargs) in the background; its return value
+        becomes job.result. Returns the Job. With heartbeat_timeout, the job
+        is cancelled once it has not been touch()ed for that many seconds.
+        A cancelled job with the same key does not count as a duplicate.
+        """
+        with self._lock:
+            self._purge()
+            for job in self._jobs.values():
+                if job.key == key and not job.done and not job.cancelled:
+                    job.touch()
+                    return job
+            job = Job(key, metadata, heartbeat_timeout)
+            self._jobs[job.id] = job
+        # The job runs in a copy of the submitter's context (e.g. its metrics session)
+        self._executor.submit(contextvars.copy_context().run, self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancelled:
+            # Cancelled while queued
+            job._finish(CANCELLED)
+            return
+        job._start()
+        try:
+            with cancellable(job.cancel_event):
+                result = func(job, *args, **kwargs)
+        except Exception as e:
+            if job.cancelled or isinstance(e, Cancelled):
+                job._finish(CANCELLED)
+            else:
+                job._finish(FAILED, error=str(e) or type(e).__name__)
+        else:
+            if job.cancelled:
+                # Finished while being cancelled: the result is discarded all the same
+                job._finish(CANCELLED)
+            else:
+                job._finish(DONE, result=result)
+
+    def _reap_abandoned(self):
+        while True:
+            time.sleep(REAP_INTERVAL_SECONDS)
+            self.reap_abandoned()
+
+    def reap_abandoned(self, now=None):
+        """
+        Cancel the jobs whose heartbeat timed out (now is a time.monotonic()).
+        Returns them.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            jobs = list(self._jobs.values())
+        abandoned = [job for job in jobs
+                     if job.heartbeat_timeout and not job.done and now - job.last_seen > job.heartbeat_timeout]
+        for job in abandoned:
+            job.cancel("abandoned")
+        return abandoned
+
+    def get(self, job_id):
+        """Return the job with job_id, or None if unknown or purged"""
+        if not job_id:
+            return None
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _purge(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.done and job.finished_at is not None and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """
+    Return the process-wide job manager. PROJECTCRAFT_JOB_WORKERS sets the
+    number of worker threads (default 8).
+    """
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager(max_workers=int(os.getenv("PROJECTCRAFT_JOB_WORKERS", 8)))
+        return _job_manager
@@ -0,0 +1,413 @@
+"""
+Per-request metrics for chat completions.
+
+Every request made through create_chat_completion() and
+stream_chat_completion() is recorded with its kind (generation, section,
+suggestion, chat), model, prompt and completion tokens (as reported by the
+API, estimated when it reports none), estimated cost, time to first token, total duration, retries (and how many were rate
+limits), whether it went to a fallback model, and outcome. Answers served without a
+request (response cache, prefetched suggestions) are recorded as cache hits.
+
+Records are
+
+- logged as one JSON object per line on the "projectcraft.metrics" logger
+  (at INFO level), which writes to stderr unless the application has
+  configured logging itself,
+- aggregated into Prometheus counters and histograms, served as text on
+  PROJECTCRAFT_METRICS_PORT (/metrics) and/or written to
+  PROJECTCRAFT_METRICS_FILE (e.g. for node_exporter's textfile collector),
+- kept in rolling windows, process-wide and per browser session, for the
+  percentiles shown in the app's sidebar.
+
+The session of a request is taken from a context variable set with
+set_session(); JobManager jobs inherit it from the code that submitted them.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .config import config_from_env
+
+logger = logging.getLogger("projectcraft.metrics")
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+PERCENTILES = (50, 95, 99)
+
+# USD per million (prompt, completion) tokens, matched by model name prefix;
+# override with PROJECTCRAFT_MODEL_PRICES='{"my-model": [1.0, 4.0]}'
+MODEL_PRICES = {
+    "gpt-5.1": (1.25, 10.0),
+    "gpt-5-mini": (0.25, 2.0),
+    "gpt-5-nano": (0.05, 0.4),
+    "gpt-5": (1.25, 10.0),
+    "gpt-4.1-mini": (0.4, 1.6),
+    "gpt-4.1-nano": (0.1, 0.4),
+    "gpt-4.1": (2.0, 8.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4o": (2.5, 10.0),
+}
+
+_session = contextvars.ContextVar("projectcraft_metrics_session", default=None)
+
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    """Retention and export of request metrics."""
+    # Requests kept for the rolling percentiles, process-wide and per session
+    metrics_window: int = 500
+    metrics_session_window: int = 100
+    # Sessions with a rolling window; the least recently active are dropped
+    metrics_max_sessions: int = 200
+    metrics_log: bool = True
+    # Prometheus text file rewritten after every request ("" disables)
+    metrics_file: str = ""
+    # Port of an HTTP server answering /metrics (0 disables)
+    metrics_port: int = 0
+    # JSON object of extra {model prefix: [prompt, completion]} USD prices per million tokens
+    model_prices: str = ""
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a config from PROJECTCRAFT_METRICS_* environment variables
+        """
+        return config_from_env(cls)
+
+
+def set_session(session_id):
+    """Attribute the requests made from this context to session_id"""
+    _session.set(session_id)
+
+
+def current_session():
+    return _session.get()
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of samples (None for no samples)"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def request_cost(model, prompt_tokens, completion_tokens, prices=None):
+    """Estimated USD cost of a request, or None for a model without a price"""
+    prices = MODEL_PRICES if prices is None else prices
+    for prefix in sorted(prices, key=len, reverse=True):
+        if model.startswith(prefix):
+            prompt_price, completion_price = prices[prefix]
+            return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+    return None
+
+
+def _prompt_tokens(messages):
+    # The same 4-characters-per-token estimate as the scheduler's
+    return sum(len(message.get("content") or "") for message in messages) // 4
+
+
+def _configure_logger():
+    """Send the records to stderr, unless logging has been configured by the application"""
+    if logger.handlers or logging.getLogger().handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class RequestTimer:
+    """
+    Measures one request. The client calls first_token() when the first
+    content arrives, retry() for every retried attempt and finish() once.
+    """
+
+    def __init__(self, registry, kind, model, messages, streamed=False, fallback=False):
+        self.registry = registry
+        self.record = {
+            "kind": kind,
+            "model": model,
+            "session": current_session(),
+            "prompt_tokens": _prompt_tokens(messages),
+            "completion_tokens": 0,
+            "estimated_tokens": True,
+            "ttft": None,
+            "duration": None,
+            "retries": 0,
+            "rate_limited": 0,
+            "streamed": streamed,
+            "fallback": fallback,
+            "cache_hit": False,
+            "status": "ok",
+        }
+        self._started = time.monotonic()
+
+    def first_token(self):
+        if self.record["ttft"] is None:
+            self.record["ttft"] = time.monotonic() - self._started
+
+    def retry(self, error=None):
+        self.record["retries"] += 1
+        if getattr(error, "status_code", None) == 429:
+            self.record["rate_limited"] += 1
+
+    def fail(self, error, completion_tokens=0):
+        """Record the request as failed with error"""
+        if getattr(error, "status_code", None) == 429:
+            self.record["rate_limited"] += 1
+        self.finish(completion_tokens, status=type(error).__name__)
+
+    def finish(self, completion_tokens=0, status="ok", usage=None):
+        """
+        Record the request; status is "ok", "cancelled" or the name of the
+        exception it failed with. The tokens are taken from usage, the API's
+        count, when there is one; otherwise the estimated prompt tokens and
+        completion_tokens are kept and the record is marked as estimated.
+        """
+        self.record["duration"] = time.monotonic() - self._started
+        if usage is not None:
+            self.record["prompt_tokens"] = usage.prompt_tokens
+            completion_tokens = usage.completion_tokens
+            self.record["estimated_tokens"] = False
+        self.record["completion_tokens"] = completion_tokens
+        self.record["status"] = status
+        self.record["cost"] = self.registry.cost(self.record["model"], self.record["prompt_tokens"], completion_tokens)
+        if self.record["ttft"] is None and status == "ok":
+            # Without streaming the whole response is the first token
+            self.record["ttft"] = self.record["duration"]
+        self.registry.record(self.record)
+
+
+class _Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+
+def _labels(**labels):
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+class MetricsRegistry:
+    """
+    Aggregates request records into counters, histograms and rolling
+    windows. Thread-safe; one registry is shared by the process.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or MetricsConfig()
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=self.config.metrics_window)
+        self._sessions = OrderedDict()
+        self._counters = {}
+        self._histograms = {}
+        self._prices = dict(MODEL_PRICES, **json.loads(self.config.model_prices or "{}"))
+
+    def start(self, kind, model, messages, streamed=False, fallback=False):
+        """Return a RequestTimer for a request about to be made"""
+        return RequestTimer(self, kind, model, messages, streamed=streamed, fallback=fallback)
+
+    def cost(self, model, prompt_tokens, completion_tokens):
+        return request_cost(model, prompt_tokens, completion_tokens, self._prices)
+
+    def record_cache_hit(self, kind, model, source):
+        """Record an answer served from source (e.g. response_cache) without a request"""
+        self.record({
+            "kind": kind,
+            "model": model,
+            "session": current_session(),
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "estimated_tokens": False,
+            "ttft": None,
+            "duration": None,
+            "retries": 0,
+            "rate_limited": 0,
+            "streamed": False,
+            "fallback": False,
+            "cost": 0.0,
+            "cache_hit": True,
+            "source": source,
+            "status": "ok",
+        })
+
+    def _count(self, name, labels, amount=1):
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _observe(self, name, labels, value):
+        key = (name, labels)
+        if key not in self._histograms:
+            self._histograms[key] = _Histogram(LATENCY_BUCKETS)
+        self._histograms[key].observe(value)
+
+    def record(self, record):
+        record = dict(record, time=time.time())
+        with self._lock:
+            self._window.append(record)
+            session = record.get("session")
+            if session:
+                if session not in self._sessions:
+                    self._sessions[session] = deque(maxlen=self.config.metrics_session_window)
+                    while len(self._sessions) > self.config.metrics_max_sessions:
+                        self._sessions.popitem(last=False)
+                self._sessions[session].append(record)
+                self._sessions.move_to_end(session)
+
+            labels = (("kind", record["kind"]), ("model", record["model"]))
+            if record["cache_hit"]:
+                self._count("projectcraft_cache_hits_total", labels + (("source", record["source"]),))
+            else:
+                self._count("projectcraft_requests_total", labels + (("status", record["status"]),))
+                self._count("projectcraft_retries_total", labels, record["retries"])
+                self._count("projectcraft_rate_limited_total", labels, record["rate_limited"])
+                self._count("projectcraft_fallbacks_total", labels, int(record["fallback"]))
+                self._count("projectcraft_cost_usd_total", labels, record["cost"] or 0.0)
+                self._count("projectcraft_prompt_tokens_total", labels, record["prompt_tokens"])
+                self._count("projectcraft_completion_tokens_total", labels, record["completion_tokens"])
+                if record["status"] == "ok":
+                    # Latencies of failed and cancelled requests would skew the histograms
+                    self._observe("projectcraft_request_duration_seconds", labels, record["duration"])
+                    self._observe("projectcraft_time_to_first_token_seconds", labels, record["ttft"])
+
+        if self.config.metrics_log:
+            logger.info(json.dumps(record))
+        if self.config.metrics_file:
+            self.write_prometheus(self.config.metrics_file)
+
+    def recent(self, since, model=None):
+        """Records of the process-wide window made after since (a time.time()), optionally of one model"""
+        with self._lock:
+            return [record for record in self._window
+                    if record["time"] >= since and (model is None or record["model"] == model)]
+
+    def summary(self, session=None):
+        """
+        Rolling statistics per request kind, for one session or (session=None)
+        the whole process: count, cache hits, retries, fallbacks, errors, the
+        models used, mean tokens and cost per request, total cost and
+        p50/p95/p99 of ttft and duration in seconds
+        """
+        with self._lock:
+            if session is None:
+                records = list(self._window)
+            else:
+                records = list(self._sessions.get(session, ()))
+
+        summary = {}
+        for kind in sorted({record["kind"] for record in records}):
+            kind_records = [record for record in records if record["kind"] == kind]
+            requests = [record for record in kind_records if not record["cache_hit"]]
+            succeeded = [record for record in requests if record["status"] == "ok"]
+            stats = {
+                "count": len(kind_records),
+                "cache_hits": len(kind_records) - len(requests),
+                "retries": sum(record["retries"] for record in requests),
+                "fallbacks": sum(1 for record in requests if record["fallback"]),
+                "errors": len(requests) - len(succeeded),
+                "models": sorted({record["model"] for record in requests}),
+                "cost": sum(record["cost"] or 0.0 for record in requests) / len(requests) if requests else 0.0,
+                "total_cost": sum(record["cost"] or 0.0 for record in requests),
+                "prompt_tokens": sum(r["prompt_tokens"] for r in requests) / len(requests) if requests else 0,
+                "completion_tokens": sum(r["completion_tokens"] for r in requests) / len(requests) if requests else 0,
+            }
+            for field in ("ttft", "duration"):
+                samples = [record[field] for record in succeeded if record[field] is not None]
+                stats[field] = {f"p{p}": percentile(samples, p) for p in PERCENTILES}
+            summary[kind] = stats
+        return summary
+
+    def render_prometheus(self):
+        """Return the counters and histograms in the Prometheus text format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+            histograms = [(key, list(histogram.counts), histogram.total) for key, histogram in histograms]
+
+        lines, typed = [], set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_labels(**dict(labels))} {value}")
+        for (name, labels), counts, total in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(**dict(labels), le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(**dict(labels))} {total:.6f}")
+            lines.append(f"{name}_count{_labels(**dict(labels))} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the Prometheus text atomically, so scrapers never read half a file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(temporary, path)
+
+
+def serve_prometheus(registry, port, host="0.0.0.0"):
+    """Serve registry.render_prometheus() at /metrics from a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="projectcraft-metrics", daemon=True).start()
+    return server
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Return the process-wide registry, configured from the environment on
+    first use (which also sets up the log and starts the /metrics server if
+    a port is set)
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry(MetricsConfig.from_env())
+            if _registry.config.metrics_log:
+                _configure_logger()
+            if _registry.config.metrics_port:
+                serve_prometheus(_registry, _registry.config.metrics_port)
+        return _registry
@@ -0,0 +1,118 @@
+"""
+Speculative prefetch of the Quick Suggestion refinements.
+
+The four Quick Suggestions send fixed questions, so their answers can be
+generated in the background as soon as a project exists. The prefetch runs
+as a job on the shared JobManager, answers the suggestions concurrently,
+and stops issuing requests once the estimated token cost would exceed the
+budget. Answers belong to one project revision; callers discard them when
+the project changes, and cancel the job then (or let its heartbeat run out
+when the session is abandoned).
+"""
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from .chat_context import build_chat_messages
+from .client import create_chat_completion
+from .config import config_from_env
+from .routing import SUGGESTION, get_router
+from .scheduler import estimate_tokens
+
+# Quick Suggestion buttons: key -> (label, question)
+QUICK_SUGGESTIONS = {
+    "more_challenging": ("Make it more challenging",
+                         "Could you make this project more challenging for advanced students?"),
+    "teamwork": ("Add teamwork component",
+                 "How can I incorporate more teamwork and collaboration into this project?"),
+    "simplify": ("Simplify requirements",
+                 "I'd like to simplify some of the requirements to make this more accessible."),
+    "real_world": ("More real-world relevance",
+                   "How can I connect this project more directly to real-world applications?"),
+}
+
+
+@dataclass(frozen=True)
+class PrefetchConfig:
+    """Cost cap for prefetching Quick Suggestion answers."""
+    # Estimated tokens (prompt plus completion budget) for all four requests together
+    prefetch_token_budget: int = 16000
+    prefetch_max_completion_tokens: int = 1500
+    # A prefetch is cancelled when its session has not asked for it for this
+    # many seconds, e.g. because the browser tab was closed
+    prefetch_heartbeat_seconds: float = 300.0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a config from PROJECTCRAFT_PREFETCH_* environment variables
+        """
+        return config_from_env(cls)
+
+
+def plan_prefetch(project_data, form_data, config, max_completion_tokens=None):
+    """
+    Return [(key, messages, max_completion_tokens)] for the suggestions that
+    fit within the token budget, in button order. max_completion_tokens
+    (e.g. the route's budget) is capped at the configured maximum.
+    """
+    max_completion_tokens = min(max_completion_tokens or config.prefetch_max_completion_tokens,
+                                config.prefetch_max_completion_tokens)
+    plan, remaining = [], config.prefetch_token_budget
+    for key, (_, question) in QUICK_SUGGESTIONS.items():
+        messages, _ = build_chat_messages(project_data, form_data, [], question)
+        cost = estimate_tokens(messages, max_completion_tokens)
+        if cost > remaining:
+            break
+        plan.append((key, messages, max_completion_tokens))
+        remaining -= cost
+    return plan
+
+
+def run_suggestion_prefetch(job, api_key, model, project_data, form_data, config=None):
+    """
+    Job function for JobManager.submit(): answer the Quick Suggestions that
+    fit the budget concurrently. Answers are published in the job's
+    progress["answers"] as they complete; progress["planned"] lists the
+    suggestions being prefetched. Returns the answers dict.
+    """
+    config = config or PrefetchConfig.from_env()
+    route = get_router().route(SUGGESTION, model, form_data)
+    plan = plan_prefetch(project_data, form_data, config, route.max_completion_tokens)
+    answers = {}
+    job.update(planned=[key for key, _, _ in plan], answers={}, failed=[])
+    if not plan:
+        return answers
+
+    with ThreadPoolExecutor(max_workers=len(plan)) as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, create_chat_completion, api_key, route.model, messages,
+                            **dict(route.options(), max_completion_tokens=max_completion_tokens)): key
+            for key, messages, max_completion_tokens in plan
+        }
+        failed = []
+        for future in as_completed(futures):
+            try:
+                answers[futures[future]] = future.result()
+            except Exception:
+                # A failed prefetch only means the click makes a live request
+                failed.append(futures[future])
+            job.update(answers=dict(answers), failed=list(failed))
+    return answers
+
+
+def wait_for_answer(job, key, timeout=120.0, poll_seconds=0.1):
+    """
+    Return the prefetched answer for key, waiting while the job is still
+    working on it. Returns None if key was not prefetched or failed.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        progress = job.snapshot()["progress"]
+        if key in progress.get("answers", {}):
+            return progress["answers"][key]
+        if (job.done or key not in progress.get("planned", [key]) or key in progress.get("failed", [])
+                or time.monotonic() > deadline):
+            return None
+        time.sleep(poll_seconds)
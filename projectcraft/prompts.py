@@ -0,0 +1,161 @@
+"""
+Prompts used to generate projects from the project form.
+"""
+import re
+
+from .sections import SECTION_NAMES
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+# Project generator system prompt
+PROJECT_GENERATOR_PROMPT = """
+You are ProjectCraft, a specialized assistant designed to help educators create comprehensive mini-project assignments for their students. Your goal is to guide teachers through the process of designing structured, engaging projects with clear objectives, requirements, and evaluation criteria.
+
+## Core Purpose
+Help educators create detailed, well-structured mini-project assignments that are appropriate for their subject area, student level, and available resources. The projects should be engaging, educational, and achievable within the specified timeframe.
+
+## Standard Mini-Project Template
+Use this consistent template structure for all project assignments:
+
+### Overview
+A brief introduction (2-3 sentences) explaining the project's overall purpose and relevance.
+
+### Learning Objectives
+A bulleted list of 4-6 specific skills or knowledge areas students will develop through the project.
+
+### Project Description
+A paragraph (5-8 sentences) providing context and explaining the core task or problem students will address.
+
+### Technical Requirements
+Break this section into logical subsections based on the project type, such as:
+- Data/Resource Collection
+- Analysis/Development Process
+- Implementation Requirements
+- Testing/Evaluation Methods
+
+Each subsection should include specific, measurable requirements with appropriate detail.
+
+### Deliverables
+A numbered list of concrete outputs students must submit, including:
+- Format specifications
+- Length/scope guidelines
+- Presentation requirements
+- Documentation needs
+
+### Evaluation Criteria
+A breakdown of how the project will be assessed, with percentage weights for different components.
+
+### Additional Resources
+A list of helpful resources, including:
+- Relevant websites, APIs, or data sources (with URLs)
+- Reference materials
+- Tools or platforms
+- Starter templates or examples (if applicable)
+
+### Submission Guidelines
+Clear instructions for how and when deliverables should be submitted.
+
+## What to Avoid
+1. Creating projects that are too vague or too prescriptive
+2. Recommending resources that aren't freely accessible
+3. Designing projects that require excessive time or resources beyond what's reasonable
+4. Using overly technical language inappropriate for the specified academic level
+5. Creating projects without clear, measurable learning outcomes
+6. Suggesting projects that don't have real-world relevance or application
+
+Based on the information provided by the user, generate a complete mini-project assignment following this template. Make it specific, practical, engaging, and appropriate for the subject area and academic level.
+"""
+
+
+def build_project_prompt(form_data):
+    """
+    Build the user prompt for a project from the project form fields
+    """
+    project_prompt = f"""
+    Please generate a mini-project assignment based on the following specifications:
+    
+    Subject/Course: {form_data['subject']}
+    Academic Level: {form_data['academic_level']}
+    Project Duration: {form_data['duration']}
+    Key Learning Objectives: {form_data['objectives']}
+    Available Resources: {form_data['resources']}
+    Project Theme/Focus: {form_data['theme'] if form_data.get('theme') else 'Any appropriate theme for the subject'}
+    
+    The project should be challenging but achievable within the given timeframe and with the specified resources.
+    Please format your response using markdown and structure it according to the standard template.
+    
+    Additionally, provide a short, catchy title for the project at the beginning.
+    """
+    return project_prompt
+
+
+def build_project_messages(form_data):
+    """
+    Build the chat messages for generating a project from form_data
+    """
+    return [
+        {"role": "system", "content": PROJECT_GENERATOR_PROMPT},
+        {"role": "user", "content": build_project_prompt(form_data)}
+    ]
+
+
+def first_sentences(text, max_chars):
+    """
+    Return the leading sentences of text that fit in max_chars
+    """
+    text = " ".join(text.split())
+    summary = ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        if summary and len(summary) + len(sentence) > max_chars:
+            break
+        summary = f"{summary} {sentence}".strip()
+    return summary[:max_chars]
+
+
+def build_project_outline(project_data, form_data):
+    """
+    Short description of the project: metadata plus the first sentence of
+    each section. Stable for a given project, so it belongs in the prefix.
+    """
+    lines = [
+        f"Project title: {project_data.get('title', 'Student Mini-Project')}",
+        f"Subject/Course: {form_data.get('subject', 'N/A')}",
+        f"Academic Level: {form_data.get('academic_level', 'N/A')}",
+        f"Project Duration: {form_data.get('duration', 'N/A')}",
+        "",
+        "Outline of the current project:",
+    ]
+    for section_name in SECTION_NAMES:
+        content = project_data.get(section_name) or ""
+        lines.append(f"- {section_name}: {first_sentences(content, 160) or '(empty)'}")
+    return "\n".join(lines)
+
+
+def build_section_messages(form_data, project_data, section_name):
+    """
+    Build the chat messages for rewriting a single section. Only that section
+    is sent in full; the rest of the project is summarized by its outline.
+    """
+    section_prompt = f"""
+    Here is a mini-project assignment that was generated from these specifications:
+    
+    Subject/Course: {form_data['subject']}
+    Academic Level: {form_data['academic_level']}
+    Project Duration: {form_data['duration']}
+    Key Learning Objectives: {form_data['objectives']}
+    Available Resources: {form_data['resources']}
+    Project Theme/Focus: {form_data['theme'] if form_data.get('theme') else 'Any appropriate theme for the subject'}
+    
+    {build_project_outline(project_data, form_data)}
+    
+    Current "{section_name}" section:
+    
+    {project_data.get(section_name) or '(missing)'}
+    
+    Rewrite only the "{section_name}" section so that it is stronger and follows the standard template, while staying consistent with the rest of the project.
+    Respond with the new section only, starting with the heading "### {section_name}".
+    """
+    return [
+        {"role": "system", "content": PROJECT_GENERATOR_PROMPT},
+        {"role": "user", "content": section_prompt}
+    ]
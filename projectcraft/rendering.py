@@ -0,0 +1,84 @@
+"""
+Throttled rendering of streamed text.
+
+Re-rendering the whole accumulated response on every chunk sends O(n^2)
+bytes to the browser. ThrottledRenderer coalesces chunks and only renders
+when enough time has passed or enough new text has arrived, plus a final
+flush, and counts what it sent.
+"""
+import time
+from dataclasses import dataclass
+
+from .config import config_from_env
+
+
+@dataclass(frozen=True)
+class RenderConfig:
+    """Update thresholds for streamed text; 0 disables a trigger."""
+    render_min_interval: float = 0.2
+    render_min_bytes: int = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a config from PROJECTCRAFT_RENDER_MIN_INTERVAL (seconds) and
+        PROJECTCRAFT_RENDER_MIN_BYTES
+        """
+        return config_from_env(cls)
+
+
+class ThrottledRenderer:
+    """
+    Call render(text) for a growing text at most once per min_interval
+    seconds, or whenever min_bytes of new text have accumulated, whichever
+    comes first. With both triggers disabled every update is rendered.
+    """
+
+    def __init__(self, render, min_interval=0.2, min_bytes=0, clock=time.monotonic):
+        self.render = render
+        self.min_interval = min_interval
+        self.min_bytes = min_bytes
+        self.clock = clock
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.updates = 0
+        self._text = ""
+        self._rendered_length = 0
+        self._last_render = None
+
+    @classmethod
+    def from_config(cls, render, config=None):
+        config = config or RenderConfig.from_env()
+        return cls(render, config.render_min_interval, config.render_min_bytes)
+
+    def update(self, text):
+        """Report the full text so far; renders it if a threshold is reached"""
+        self.updates += 1
+        self._text = text
+        if not self.min_interval and not self.min_bytes:
+            self._render()
+            return
+        now = self.clock()
+        due = self._last_render is None or (
+            self.min_interval and now - self._last_render >= self.min_interval
+        ) or (
+            self.min_bytes and len(text) - self._rendered_length >= self.min_bytes
+        )
+        if due:
+            self._render(now)
+
+    def flush(self):
+        """Render the final text if it has not been rendered yet"""
+        if len(self._text) != self._rendered_length or self.messages_sent == 0:
+            self._render()
+
+    def _render(self, now=None):
+        self.render(self._text)
+        self.messages_sent += 1
+        self.bytes_sent += len(self._text.encode("utf-8"))
+        self._rendered_length = len(self._text)
+        self._last_render = self.clock() if now is None else now
+
+    def stats(self):
+        """Chunks received, render messages sent and bytes sent"""
+        return {"chunks": self.updates, "messages": self.messages_sent, "bytes": self.bytes_sent}
@@ -0,0 +1,186 @@
+"""
+Revision history of projects.
+
+Every change of a project (a generation, regenerated sections, another
+candidate, a restored revision) is recorded as a revision in the project
+store. A revision stores only the sections that changed since the previous
+one, plus a line diff of the raw response; every revision_snapshot_interval
+revisions a full snapshot is stored instead. Checking out a revision reads
+the nearest snapshot before it and applies at most that many deltas.
+
+A session keeps only the index of the revisions (number, label, changed
+sections) and a reference to the latest project, which it holds anyway, so
+its memory does not grow with the size of the revisions. Several sessions
+can record revisions of the same project: the store numbers each revision
+after the latest stored one, and a revision is always diffed against that
+stored head.
+"""
+import difflib
+import html
+import time
+from dataclasses import dataclass
+
+from .chat_history import deep_sizeof
+from .config import config_from_env
+from .sections import SECTION_NAMES
+from .store import RevisionConflict
+
+# Attempts of record() when other sessions keep adding revisions to the same project
+RECORD_ATTEMPTS = 5
+
+
+@dataclass(frozen=True)
+class RevisionConfig:
+    """How often a revision is stored in full."""
+    # Every this many revisions, the whole project is stored instead of a delta
+    revision_snapshot_interval: int = 10
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a config from PROJECTCRAFT_REVISION_SNAPSHOT_INTERVAL
+        """
+        return config_from_env(cls)
+
+
+def project_fields(project_data):
+    """Field names of project_data: title, the template sections, then any others"""
+    ordered = ["title"] + SECTION_NAMES
+    return [name for name in ordered if name in project_data] + sorted(set(project_data) - set(ordered))
+
+
+def text_delta(old, new):
+    """
+    Line diff turning old into new: [start, end, replacement] for each
+    changed range of old's lines
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [[i1, i2, "".join(new_lines[j1:j2])]
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+
+def apply_text_delta(old, delta):
+    lines = old.splitlines(keepends=True)
+    # From the end, so the line numbers of earlier ranges stay valid
+    for start, end, replacement in reversed(delta):
+        lines[start:end] = [replacement]
+    return "".join(lines)
+
+
+def diff_project(old_project_data, old_raw_response, project_data, raw_response):
+    """Delta from one revision to the next: changed and removed fields, raw response line diff"""
+    return {
+        "fields": {name: value for name, value in project_data.items() if old_project_data.get(name) != value},
+        "removed": [name for name in old_project_data if name not in project_data],
+        "raw": text_delta(old_raw_response or "", raw_response or ""),
+    }
+
+
+def apply_delta(project_data, raw_response, delta):
+    project_data = {name: value for name, value in project_data.items() if name not in delta["removed"]}
+    project_data.update(delta["fields"])
+    return project_data, apply_text_delta(raw_response, delta["raw"])
+
+
+class RevisionLog:
+    """
+    The revisions of one project: their data in the store, their index in
+    memory. Revisions are numbered from 1.
+    """
+
+    def __init__(self, project_id, store, config=None):
+        self.project_id = project_id
+        self.store = store
+        self.config = config or RevisionConfig.from_env()
+        self.revisions = []
+        # (project_data, raw_response) of the latest revision, shared with the session
+        self._head = None
+
+    @classmethod
+    def load(cls, project_id, store, config=None):
+        log = cls(project_id, store, config)
+        log.revisions = store.list_revisions(project_id)
+        return log
+
+    def __len__(self):
+        return len(self.revisions)
+
+    @property
+    def latest(self):
+        return self.revisions[-1]["number"] if self.revisions else None
+
+    def record(self, project_data, raw_response, label):
+        """
+        Add a revision if the project differs from the latest stored one.
+        Returns the new revision's number, or None if nothing changed.
+        Raises RevisionConflict if other sessions kept adding revisions
+        in between for RECORD_ATTEMPTS attempts.
+        """
+        raw_response = raw_response or ""
+        for _ in range(RECORD_ATTEMPTS):
+            self._sync()
+            if self.revisions:
+                head_project_data, head_raw_response = self._head or self.checkout(self.latest)
+                delta = diff_project(head_project_data, head_raw_response, project_data, raw_response)
+                if not (delta["fields"] or delta["removed"] or delta["raw"]):
+                    return None
+                changed = [name for name in project_fields(dict(head_project_data, **project_data))
+                           if name in delta["fields"] or name in delta["removed"]]
+            else:
+                changed = project_fields(project_data)
+
+            snapshot = len(self.revisions) % self.config.revision_snapshot_interval == 0
+            data = {"project_data": project_data, "raw_response": raw_response} if snapshot else delta
+            created_at = time.time()
+            try:
+                number = self.store.add_revision(self.project_id, self.latest or 0, snapshot, label, changed, data,
+                                                 created_at)
+            except RevisionConflict:
+                continue
+            self.revisions.append({"number": number, "snapshot": snapshot, "label": label, "changed": changed,
+                                   "created_at": created_at})
+            self._head = (project_data, raw_response)
+            return number
+        raise RevisionConflict(f"project {self.project_id} kept changing while recording {label!r}")
+
+    def _sync(self):
+        """Reload the index if other sessions added revisions since this one last saw the store"""
+        if self.store.latest_revision(self.project_id) != (self.latest or 0):
+            self.revisions = self.store.list_revisions(self.project_id)
+            self._head = None
+
+    def checkout(self, number):
+        """Return (project_data, raw_response) of revision number"""
+        if not 1 <= number <= len(self.revisions):
+            raise KeyError(f"project {self.project_id} has no revision {number}")
+        base = max(entry["number"] for entry in self.revisions[:number] if entry["snapshot"])
+        rows = self.store.load_revisions(self.project_id, base, number + 1)
+        project_data, raw_response = rows[0]["project_data"], rows[0]["raw_response"]
+        for delta in rows[1:]:
+            project_data, raw_response = apply_delta(project_data, raw_response, delta)
+        return project_data, raw_response
+
+    def diff(self, old_number, new_number):
+        """[(field, old text, new text)] of the fields that differ between two revisions"""
+        old_project_data, _ = self.checkout(old_number)
+        new_project_data, _ = self.checkout(new_number)
+        return [
+            (name, old_project_data.get(name) or "", new_project_data.get(name) or "")
+            for name in project_fields(dict(old_project_data, **new_project_data))
+            if old_project_data.get(name) != new_project_data.get(name)
+        ]
+
+    def memory_bytes(self):
+        """Memory held by the index; the latest project is counted with the session"""
+        return deep_sizeof(self.revisions)
+
+
+def side_by_side_diff(old_text, new_text, old_label, new_label, wrap_column=60):
+    """HTML table showing old_text and new_text side by side, changed lines highlighted"""
+    table = difflib.HtmlDiff(wrapcolumn=wrap_column).make_table(
+        old_text.splitlines(), new_text.splitlines(), html.escape(old_label), html.escape(new_label),
+        context=True, numlines=2,
+    )
+    return f'<div class="revision-diff">{table}</div>'
@@ -0,0 +1,239 @@
+"""
+Model routing per request kind.
+
+Each kind of request (full generation, section regeneration, Quick
+Suggestion, free-form chat) gets its own model and completion budget from
+a RoutingConfig. Budgets for projects and sections are sized from the
+expected section lengths, scaled for the academic level and duration, so a
+one-week high-school project does not reserve the tokens of a semester-long
+graduate one (and a semester-long project is not cut off).
+
+When the primary model of a route keeps failing on rate limits or is slow
+(judged from the recent requests in the metrics registry), requests go to
+the fallback model
+instead; requests that still hit a rate limit, timeout or server error on
+the primary are retried once on the fallback (see
+client.create_chat_completion).
+"""
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from .config import config_from_env
+from .metrics import get_metrics, percentile
+from .sections import SECTION_NAMES
+
+GENERATION = "generation"
+SECTION = "section"
+SUGGESTION = "suggestion"
+CHAT = "chat"
+REQUEST_KINDS = (GENERATION, SECTION, SUGGESTION, CHAT)
+
+# Typical words per section of a three-to-four-week undergraduate project
+EXPECTED_SECTION_WORDS = {
+    "Overview": 120,
+    "Learning Objectives": 100,
+    "Project Description": 200,
+    "Technical Requirements": 220,
+    "Deliverables": 120,
+    "Evaluation Criteria": 150,
+    "Additional Resources": 100,
+    "Submission Guidelines": 90,
+}
+# Length relative to that baseline per academic level (matched by prefix)
+LEVEL_FACTORS = {
+    "high school": 0.8,
+    "undergraduate (year 1-2)": 0.9,
+    "undergraduate": 1.0,
+    "graduate": 1.15,
+    "professional development": 0.85,
+}
+SEMESTER_WEEKS = 15
+
+_NUMBER_RE = re.compile(r"\d+")
+
+
+@dataclass(frozen=True)
+class RoutingConfig:
+    """Models, budgets and fallback rules per request kind."""
+    # Model per request kind; "" uses the model selected in the app
+    route_generation_model: str = ""
+    route_section_model: str = ""
+    route_suggestion_model: str = ""
+    route_chat_model: str = ""
+    # Cheaper, faster model for when the primary is rate-limited or slow ("" disables)
+    route_fallback_model: str = "gpt-5-mini"
+    # Retries on the primary before a failed request moves to the fallback
+    route_primary_retries: int = 1
+    # The primary counts as rate-limited once this many of its recent
+    # requests failed on a rate limit (requests that got through on a retry
+    # do not count)
+    route_rate_limited_failures: int = 2
+    # The primary counts as slow when the p95 time to first token of its
+    # recent streamed requests exceeds this many seconds
+    route_slow_ttft: float = 20.0
+    # Seconds of recent requests considered, and the samples needed to call a model slow
+    route_health_window: float = 120.0
+    route_min_samples: int = 3
+    # Budget = expected words * tokens per word * headroom + reasoning tokens
+    route_tokens_per_word: float = 1.4
+    route_budget_headroom: float = 1.5
+    route_reasoning_tokens: int = 1000
+    # Least budget per kind, the fixed limits used before budgets were sized;
+    # reasoning models can spend much of it before the first word of the answer
+    route_min_generation_tokens: int = 4000
+    route_min_section_tokens: int = 1500
+    route_min_suggestion_tokens: int = 1500
+    route_min_chat_tokens: int = 4000
+    # Expected words of a chat or Quick Suggestion answer
+    route_answer_words: int = 400
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a config from PROJECTCRAFT_ROUTE_* environment variables, e.g.
+        PROJECTCRAFT_ROUTE_CHAT_MODEL=gpt-5-mini
+        """
+        return config_from_env(cls)
+
+
+@dataclass(frozen=True)
+class Route:
+    """Where and how one request is sent."""
+    kind: str
+    model: str
+    max_completion_tokens: int
+    fallback_model: str = ""
+    primary_retries: int = 1
+    # The configured primary was unhealthy, so model is the fallback
+    degraded: bool = False
+
+    def options(self):
+        """Keyword arguments for create_chat_completion / stream_chat_completion"""
+        return {
+            "max_completion_tokens": self.max_completion_tokens,
+            "kind": self.kind,
+            "fallback_model": self.fallback_model,
+            "primary_retries": self.primary_retries,
+        }
+
+
+def level_factor(academic_level):
+    level = " ".join(str(academic_level or "").split()).casefold()
+    for prefix in sorted(LEVEL_FACTORS, key=len, reverse=True):
+        if level.startswith(prefix):
+            return LEVEL_FACTORS[prefix]
+    return 1.0
+
+
+def duration_weeks(duration):
+    """Weeks of a duration like "2 weeks", "3-4 weeks" or "Full semester" (upper bound of a range)"""
+    text = str(duration or "").casefold()
+    if "semester" in text:
+        return SEMESTER_WEEKS
+    numbers = [int(number) for number in _NUMBER_RE.findall(text)]
+    if not numbers:
+        return 4
+    return max(numbers) / 7 if "day" in text else max(numbers)
+
+
+def duration_factor(duration):
+    # 1 week -> 0.85, 4 weeks -> 1.0, a semester -> 1.4 (capped)
+    return min(1.4, 0.8 + 0.05 * duration_weeks(duration))
+
+
+def expected_words(form_data, section_name=None):
+    """Expected words of one section, or of the whole project, for form_data"""
+    if section_name is None:
+        words = sum(EXPECTED_SECTION_WORDS.values())
+    else:
+        words = EXPECTED_SECTION_WORDS.get(section_name, sum(EXPECTED_SECTION_WORDS.values()) / len(SECTION_NAMES))
+    form_data = form_data or {}
+    return words * level_factor(form_data.get("academic_level")) * duration_factor(form_data.get("duration"))
+
+
+class Router:
+    """
+    Picks the model and completion budget of each request from a
+    RoutingConfig and the recent health of the models
+    """
+
+    def __init__(self, config=None, metrics=None, clock=time.time):
+        self.config = config or RoutingConfig()
+        self.metrics = metrics or get_metrics()
+        self.clock = clock
+
+    def primary_model(self, kind, default_model):
+        return getattr(self.config, f"route_{kind}_model", "") or default_model
+
+    def budget(self, kind, form_data=None, section_name=None):
+        """
+        Completion budget in tokens, including room for reasoning; never
+        below the route_min_<kind>_tokens of the kind
+        """
+        if kind == GENERATION:
+            words = expected_words(form_data)
+        elif kind == SECTION:
+            # Without a section name, the budget of the longest section
+            section_name = section_name or max(EXPECTED_SECTION_WORDS, key=EXPECTED_SECTION_WORDS.get)
+            words = expected_words(form_data, section_name)
+        else:
+            words = self.config.route_answer_words
+        tokens = words * self.config.route_tokens_per_word * self.config.route_budget_headroom
+        budget = int(math.ceil(tokens)) + self.config.route_reasoning_tokens
+        return max(budget, getattr(self.config, f"route_min_{kind}_tokens", 0))
+
+    def is_degraded(self, model):
+        """
+        True if route_rate_limited_failures of model's requests failed on a
+        rate limit, or its streamed requests were slow, within the health
+        window
+        """
+        records = self.metrics.recent(self.clock() - self.config.route_health_window, model=model)
+        failures = sum(1 for record in records
+                       if record["rate_limited"] and record["status"] not in ("ok", "cancelled"))
+        if failures >= self.config.route_rate_limited_failures:
+            return True
+        ttfts = [record["ttft"] for record in records
+                 if record["streamed"] and record["status"] == "ok" and record["ttft"] is not None]
+        return len(ttfts) >= self.config.route_min_samples and percentile(ttfts, 95) > self.config.route_slow_ttft
+
+    def route(self, kind, default_model, form_data=None, section_name=None):
+        """Return the Route of a request of kind"""
+        model = self.primary_model(kind, default_model)
+        fallback_model = self.config.route_fallback_model
+        if fallback_model == model:
+            fallback_model = ""
+        degraded = bool(fallback_model) and self.is_degraded(model)
+        if degraded:
+            model, fallback_model = fallback_model, ""
+        return Route(
+            kind=kind,
+            model=model,
+            max_completion_tokens=self.budget(kind, form_data, section_name),
+            fallback_model=fallback_model,
+            primary_retries=self.config.route_primary_retries,
+            degraded=degraded,
+        )
+
+    def policy(self, default_model, form_data=None):
+        """The current Route of every request kind, e.g. for display"""
+        return {kind: self.route(kind, default_model, form_data) for kind in REQUEST_KINDS}
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """
+    Return the process-wide router, configured from the environment on
+    first use
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = Router(RoutingConfig.from_env())
+        return _router
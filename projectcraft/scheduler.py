@@ -0,0 +1,382 @@
+"""
+Rate-limit-aware scheduling of OpenAI requests.
+
+All Streamlit sessions (and batch workers) in the process share one
+RequestScheduler. Requests wait in a FIFO queue until a concurrency slot is
+free and the requests-per-minute and tokens-per-minute buckets allow them,
+so peak load is spread over the quota instead of failing with 429s.
+Retryable failures are retried with exponential backoff and full jitter, and
+a 429 pauses admission for everyone until the server's Retry-After has passed.
+
+Requests can be cancelled cooperatively: code running under cancellable(event)
+stops waiting in the queue or between retries once the event is set, and
+raises Cancelled.
+"""
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from .config import config_from_env
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError"}
+
+
+# Polling interval of cancellable waits, which cannot be woken by the event itself
+CANCEL_POLL_SECONDS = 0.25
+
+_cancel_event = contextvars.ContextVar("projectcraft_cancel_event", default=None)
+
+
+class Cancelled(Exception):
+    """The request was cancelled by its caller."""
+
+
+@contextmanager
+def cancellable(event):
+    """Make the requests in the with-block stop with Cancelled once event is set"""
+    token = _cancel_event.set(event)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+
+def check_cancelled():
+    """Raise Cancelled if the current context's cancel event is set"""
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise Cancelled("Request cancelled")
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request cannot complete before its deadline."""
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    """Quota, concurrency and retry settings for the shared scheduler."""
+    requests_per_minute: int = 500
+    tokens_per_minute: int = 200000
+    max_concurrent_requests: int = 16
+    scheduler_max_retries: int = 5
+    backoff_base: float = 1.0
+    backoff_max: float = 30.0
+    request_deadline: float = 300.0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a config from PROJECTCRAFT_* environment variables, e.g.
+        PROJECTCRAFT_TOKENS_PER_MINUTE=30000
+        """
+        return config_from_env(cls)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute, holding at most one
+    minute of quota. Not thread-safe; RequestScheduler guards it with its lock.
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate_per_minute, now=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """
+        Seconds until amount can be consumed. Requests larger than the
+        capacity are admitted once the bucket is full.
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def consume(self, amount, now):
+        if self.rate <= 0:
+            return
+        self._refill(now)
+        self.tokens -= amount
+
+
+def estimate_tokens(messages, max_completion_tokens):
+    """
+    Estimate the tokens a request counts against the TPM quota: the prompt
+    (about 4 characters per token) plus the completion budget, which is how
+    OpenAI's rate limiter accounts for requests
+    """
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    return prompt_chars // 4 + max_completion_tokens
+
+
+def is_retryable(error):
+    """
+    True for rate limits, timeouts, connection errors and 5xx responses
+    """
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def retry_after_seconds(error):
+    """
+    Return the server's Retry-After hint for an API error, if any
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class RequestScheduler:
+    """
+    FIFO admission queue with RPM/TPM token buckets, a concurrency limit,
+    retries with exponential backoff and jitter, and per-request deadlines.
+    clock (a monotonic time) and sleep can be replaced, e.g. in tests.
+    """
+
+    def __init__(self, config=None, clock=time.monotonic, sleep=time.sleep):
+        self.config = config or SchedulerConfig()
+        self.clock = clock
+        self.sleep = sleep
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._active = 0
+        self._paused_until = 0.0
+        self._request_bucket = TokenBucket(self.config.requests_per_minute, now=clock())
+        self._token_bucket = TokenBucket(self.config.tokens_per_minute, now=clock())
+        self._stats = {"completed": 0, "failed": 0, "retries": 0, "deadline_exceeded": 0, "cancelled": 0,
+                       "queued_seconds": 0.0}
+
+    def _admission_wait(self, ticket, estimated_tokens, now):
+        """
+        Return 0 when ticket may start now, None to wait for a notification
+        (not first in line or no free slot), or the seconds to wait for quota
+        """
+        if self._queue[0] is not ticket or self._active >= self.config.max_concurrent_requests:
+            return None
+        wait = max(
+            self._paused_until - now,
+            self._request_bucket.wait_time(1, now),
+            self._token_bucket.wait_time(estimated_tokens, now),
+        )
+        return max(wait, 0.0)
+
+    @contextmanager
+    def slot(self, estimated_tokens, deadline_at=None):
+        """
+        Wait in line for a concurrency slot and quota, and hold the slot for
+        the duration of the with-block
+        """
+        ticket = object()
+        queued_at = self.clock()
+        cancel_event = _cancel_event.get()
+        with self._cond:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    now = self.clock()
+                    if cancel_event is not None and cancel_event.is_set():
+                        self._stats["cancelled"] += 1
+                        raise Cancelled("Request cancelled while waiting in the queue")
+                    wait = self._admission_wait(ticket, estimated_tokens, now)
+                    if wait == 0:
+                        break
+                    if cancel_event is not None:
+                        wait = CANCEL_POLL_SECONDS if wait is None else min(wait, CANCEL_POLL_SECONDS)
+                    if deadline_at is not None:
+                        remaining = deadline_at - now
+                        if remaining <= 0:
+                            self._stats["deadline_exceeded"] += 1
+                            raise DeadlineExceeded("Request deadline exceeded while waiting in the queue")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+                self._queue.popleft()
+                self._active += 1
+                self._request_bucket.consume(1, now)
+                self._token_bucket.consume(estimated_tokens, now)
+                self._stats["queued_seconds"] += now - queued_at
+            finally:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def _deadline_at(self, deadline):
+        deadline = self.config.request_deadline if deadline is None else deadline
+        return self.clock() + deadline if deadline else None
+
+    def _remaining(self, deadline_at):
+        return None if deadline_at is None else max(0.0, deadline_at - self.clock())
+
+    def _backoff(self, error, attempt, deadline_at, max_retries=None):
+        """
+        Sleep before retrying after error, or re-raise it if it is not
+        retryable, retries are exhausted, or the deadline would pass
+        """
+        max_retries = self.config.scheduler_max_retries if max_retries is None else max_retries
+        if not is_retryable(error) or attempt >= max_retries:
+            with self._cond:
+                self._stats["failed"] += 1
+            raise error
+
+        # Exponential backoff with full jitter, but never sooner than the server asks
+        delay = random.uniform(0, min(self.config.backoff_max, self.config.backoff_base * 2 ** attempt))
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        with self._cond:
+            self._stats["retries"] += 1
+            if getattr(error, "status_code", None) == 429:
+                # Hold back every queued request, not just this one
+                self._paused_until = max(self._paused_until, self.clock() + delay)
+
+        if deadline_at is not None and self.clock() + delay > deadline_at:
+            with self._cond:
+                self._stats["deadline_exceeded"] += 1
+            raise DeadlineExceeded("Request deadline exceeded while retrying") from error
+        cancel_event = _cancel_event.get()
+        if cancel_event is None:
+            self.sleep(delay)
+        elif cancel_event.wait(delay):
+            with self._cond:
+                self._stats["cancelled"] += 1
+            raise Cancelled("Request cancelled while waiting to retry") from error
+
+    def run(self, call, estimated_tokens, deadline=None, on_retry=None, max_retries=None):
+        """
+        Run call(timeout) once admitted, retrying retryable errors. timeout is
+        the time left until the deadline (None without a deadline).
+        on_retry(error) is called before every retry; max_retries overrides
+        the configured number of retries.
+
+        A call in progress cannot be interrupted, so cancellation is checked
+        before it is sent (while queued) and again when it returns: the
+        response of a call cancelled meanwhile is dropped with Cancelled.
+        """
+        deadline_at = self._deadline_at(deadline)
+        cancel_event = _cancel_event.get()
+        attempt = 0
+        while True:
+            with self.slot(estimated_tokens, deadline_at):
+                try:
+                    result = call(self._remaining(deadline_at))
+                except Exception as e:
+                    error = e
+                else:
+                    with self._cond:
+                        if cancel_event is not None and cancel_event.is_set():
+                            self._stats["cancelled"] += 1
+                            raise Cancelled("Request cancelled while waiting for the response")
+                        self._stats["completed"] += 1
+                    return result
+            if cancel_event is not None and cancel_event.is_set():
+                with self._cond:
+                    self._stats["cancelled"] += 1
+                raise Cancelled("Request cancelled while waiting for the response") from error
+            self._backoff(error, attempt, deadline_at, max_retries)
+            attempt += 1
+            if on_retry:
+                on_retry(error)
+
+    def stream(self, open_stream, estimated_tokens, deadline=None, on_retry=None, max_retries=None):
+        """
+        Yield the items of open_stream(timeout), holding a slot while
+        streaming. Errors before the first item are retried as in run(), after
+        closing the failed stream; once items have been yielded, errors
+        propagate to the caller and count as failed.
+        """
+        deadline_at = self._deadline_at(deadline)
+        attempt = 0
+        while True:
+            with self.slot(estimated_tokens, deadline_at):
+                stream = None
+                try:
+                    stream = open_stream(self._remaining(deadline_at))
+                    iterator = iter(stream)
+                    first = next(iterator, None)
+                except Exception as e:
+                    error = e
+                    close = getattr(stream, "close", None)
+                    if close:
+                        close()
+                else:
+                    try:
+                        if first is not None:
+                            yield first
+                            yield from iterator
+                    except (GeneratorExit, Cancelled):
+                        # The consumer closed the stream early; the slot is freed on the way out
+                        with self._cond:
+                            self._stats["cancelled"] += 1
+                        raise
+                    except Exception:
+                        # Too late to retry: part of the response has been yielded
+                        with self._cond:
+                            self._stats["failed"] += 1
+                        raise
+                    finally:
+                        close = getattr(stream, "close", None)
+                        if close:
+                            close()
+                    with self._cond:
+                        self._stats["completed"] += 1
+                    return
+            self._backoff(error, attempt, deadline_at, max_retries)
+            attempt += 1
+            if on_retry:
+                on_retry(error)
+
+    def stats(self):
+        """
+        Return queue depth, active requests and counters
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queued"] = len(self._queue)
+            stats["active"] = self._active
+            stats["paused_seconds"] = max(0.0, self._paused_until - self.clock())
+        return stats
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Return the process-wide scheduler, configured from the environment on
+    first use
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(SchedulerConfig.from_env())
+        return _scheduler
@@ -0,0 +1,105 @@
+"""
+Cheap local quality checks for generated projects, used to pick the best of
+several candidates without another API call.
+
+Each check returns a value between 0 and 1, and the score is their weighted
+sum on a 0-100 scale:
+
+- sections: share of the template sections that are present and non-empty
+- weights: the Evaluation Criteria percentages add up to 100%
+- resources: Additional Resources contains links
+- length: the project's word count is within the bounds for the academic level
+"""
+import re
+
+from .sections import SECTION_NAMES
+
+CHECK_WEIGHTS = {"sections": 40, "weights": 20, "resources": 15, "length": 25}
+
+# Word-count bounds of a whole project per academic level (matched by prefix)
+LENGTH_BOUNDS = {
+    "high school": (500, 1600),
+    "undergraduate (year 1-2)": (700, 2000),
+    "undergraduate (year 3-4)": (800, 2400),
+    "undergraduate": (700, 2400),
+    "graduate": (900, 2800),
+    "professional development": (500, 1800),
+}
+DEFAULT_LENGTH_BOUNDS = (600, 2400)
+
+_PERCENT_RE = re.compile(r"(\d{1,3}(?:\.\d+)?)\s*%")
+_WEIGHT_LINE_RE = re.compile(r"^\s*(\||[-*+]\s|\d+[.)]\s)")
+_URL_RE = re.compile(r"https?://[^\s)>\]]+")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def length_bounds(academic_level):
+    """(min_words, max_words) of a project for academic_level"""
+    level = " ".join(str(academic_level or "").split()).casefold()
+    for prefix, bounds in sorted(LENGTH_BOUNDS.items(), key=lambda item: -len(item[0])):
+        if level.startswith(prefix):
+            return bounds
+    return DEFAULT_LENGTH_BOUNDS
+
+
+def evaluation_weights(text):
+    """
+    The percentages of the evaluation components: the last percentage on each
+    table row or list item, or every percentage if there are no such lines
+    """
+    weights = []
+    for line in text.splitlines():
+        if _WEIGHT_LINE_RE.match(line):
+            percentages = _PERCENT_RE.findall(line)
+            if percentages:
+                weights.append(float(percentages[-1]))
+    return weights or [float(value) for value in _PERCENT_RE.findall(text)]
+
+
+def check_sections(project_data):
+    present = [name for name in SECTION_NAMES if (project_data.get(name) or "").strip()]
+    missing = [name for name in SECTION_NAMES if name not in present]
+    detail = "all sections present" if not missing else "missing " + ", ".join(missing)
+    return len(present) / len(SECTION_NAMES), detail
+
+
+def check_weights(project_data):
+    weights = evaluation_weights(project_data.get("Evaluation Criteria") or "")
+    if not weights:
+        return 0.0, "no weights in Evaluation Criteria"
+    total = sum(weights)
+    if abs(total - 100) < 0.5:
+        return 1.0, "weights sum to 100%"
+    # Partial credit for being close, e.g. a rounding slip
+    return max(0.0, 1 - abs(total - 100) / 50), f"weights sum to {total:g}%"
+
+
+def check_resources(project_data):
+    urls = _URL_RE.findall(project_data.get("Additional Resources") or "")
+    if not urls:
+        return 0.0, "no links in Additional Resources"
+    return 1.0, f"{len(urls)} links in Additional Resources"
+
+
+def check_length(project_data, form_data):
+    words = sum(len(_WORD_RE.findall(project_data.get(name) or "")) for name in SECTION_NAMES)
+    low, high = length_bounds(form_data.get("academic_level"))
+    if low <= words <= high:
+        return 1.0, f"{words} words (expected {low}-{high})"
+    distance = (low - words) / low if words < low else (words - high) / high
+    return max(0.0, 1 - distance), f"{words} words (expected {low}-{high})"
+
+
+def score_project(project_data, form_data):
+    """
+    Return (score, checks) where score is 0-100 and checks maps each check
+    name to (value between 0 and 1, human-readable detail)
+    """
+    checks = {
+        "sections": check_sections(project_data),
+        "weights": check_weights(project_data),
+        "resources": check_resources(project_data),
+        "length": check_length(project_data, form_data),
+    }
+    score = sum(CHECK_WEIGHTS[name] * value for name, (value, _) in checks.items())
+    return round(score, 1), checks
@@ -0,0 +1,301 @@
+"""
+Parsing of generated projects into the sections of the standard template.
+"""
+import re
+from typing import NamedTuple
+
+# Sections of the standard mini-project template, in the order they are generated
+SECTION_NAMES = [
+    "Overview",
+    "Learning Objectives",
+    "Project Description",
+    "Technical Requirements",
+    "Deliverables",
+    "Evaluation Criteria",
+    "Additional Resources",
+    "Submission Guidelines",
+]
+
+DEFAULT_TITLE = "Student Mini-Project"
+
+
+# Helper function to extract a single section from the response.
+# Superseded by split_sections(); kept for callers that need one section.
+def extract_section(text, section_name, next_section_name):
+    start_pattern = f"### {section_name}"
+    start_index = text.find(start_pattern)
+
+    if start_index == -1:
+        # Try with ## prefix
+        start_pattern = f"## {section_name}"
+        start_index = text.find(start_pattern)
+
+        if start_index == -1:
+            return ""
+
+    # Add the length of the section heading to get to the content
+    start_index += len(start_pattern)
+
+    # Find the end of the section
+    if next_section_name:
+        end_pattern = f"### {next_section_name}"
+        end_index = text.find(end_pattern, start_index)
+
+        if end_index == -1:
+            # Try with ## prefix
+            end_pattern = f"## {next_section_name}"
+            end_index = text.find(end_pattern, start_index)
+
+            if end_index == -1:
+                end_index = len(text)
+    else:
+        end_index = len(text)
+
+    section_content = text[start_index:end_index].strip()
+    return section_content
+
+
+# Alternative headings the model sometimes uses for template sections
+SECTION_ALIASES = {
+    "objectives": "Learning Objectives",
+    "description": "Project Description",
+    "requirements": "Technical Requirements",
+    "evaluation": "Evaluation Criteria",
+    "evaluation rubric": "Evaluation Criteria",
+    "assessment criteria": "Evaluation Criteria",
+    "grading rubric": "Evaluation Criteria",
+    "resources": "Additional Resources",
+    "submission": "Submission Guidelines",
+    "submission instructions": "Submission Guidelines",
+}
+
+# Deepest heading level that can introduce a template section
+MAX_SECTION_LEVEL = 3
+
+_HEADING_RE = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t#]*$', re.MULTILINE)
+_NUMBERING_RE = re.compile(r'^\d+[.)]\s+')
+_SECTION_LOOKUP = {name.lower(): name for name in SECTION_NAMES}
+_SECTION_LOOKUP.update(SECTION_ALIASES)
+
+
+class Heading(NamedTuple):
+    level: int
+    title: str
+    start: int
+    content_start: int
+
+
+def index_headings(text, start=0, end=None):
+    """
+    Return every markdown heading in text[start:end] in a single pass.
+    start must be the beginning of a line. Only lines starting with "#" are
+    matched against the heading pattern; the rest is skipped with str.find.
+    """
+    if end is None:
+        end = len(text)
+    headings = []
+    line_start = start
+    while line_start < end:
+        if text.startswith("#", line_start):
+            match = _HEADING_RE.match(text, line_start, end)
+            if match:
+                headings.append(Heading(len(match.group(1)), match.group(2), match.start(), match.end()))
+        next_heading = text.find("\n#", line_start, end)
+        if next_heading == -1:
+            break
+        line_start = next_heading + 1
+    return headings
+
+
+def match_section_name(heading_title):
+    """
+    Map a heading to the template section it introduces, or None.
+    Numbering, emphasis, trailing colons and case are ignored, and headings
+    that extend a section name ("Evaluation Criteria and Weights") match it.
+    """
+    normalized = _NUMBERING_RE.sub("", heading_title.strip()).strip("*_ ").rstrip(":").strip().lower()
+    if normalized in _SECTION_LOOKUP:
+        return _SECTION_LOOKUP[normalized]
+    for section_name in SECTION_NAMES:
+        if normalized.startswith(section_name.lower()):
+            return section_name
+    return None
+
+
+def is_section_heading(heading, section_level=None):
+    """
+    Return the template section heading introduces, or None. Only headings at
+    section_level or above can start a section (at most MAX_SECTION_LEVEL
+    before the first section fixed the level); deeper ones belong to the
+    body of the current section, even when named like a section
+    ("#### Resources" inside Technical Requirements).
+    """
+    if heading.level > (section_level or MAX_SECTION_LEVEL):
+        return None
+    return match_section_name(heading.title)
+
+
+def section_marks(headings):
+    """
+    Return (heading, section_name) for every heading that starts a template
+    section. The level of the first one is the section level.
+    """
+    marks = []
+    section_level = None
+    for heading in headings:
+        section_name = is_section_heading(heading, section_level)
+        if section_name:
+            section_level = section_level or heading.level
+            marks.append((heading, section_name))
+    return marks
+
+
+class HeadingIndex:
+    """
+    Headings of a buffer that grows at the end, e.g. a streamed response.
+
+    Each update() only tokenizes the lines completed since the previous call.
+    """
+
+    def __init__(self):
+        self.headings = []
+        self._scanned = 0
+
+    def update(self, text, final=False):
+        """
+        Index the complete lines added to text since the last call and return
+        the new headings. With final=True the unterminated last line is
+        indexed as well.
+        """
+        end = len(text) if final else text.rfind("\n", self._scanned) + 1
+        if end <= self._scanned:
+            return []
+        new_headings = index_headings(text, self._scanned, end)
+        self.headings.extend(new_headings)
+        self._scanned = end
+        return new_headings
+
+
+def split_sections(text, headings=None):
+    """
+    Return {section_name: content} for every template section in one pass
+    over the heading index. Sections may appear in any order; they all sit
+    at the level of the first one (### or above), and a section runs until
+    the next template section heading at that level, so sub-headings stay
+    inside it even when named like a section. Missing sections map to "".
+    """
+    if headings is None:
+        headings = index_headings(text)
+
+    marks = section_marks(headings)
+    sections = {}
+    for index, (heading, section_name) in enumerate(marks):
+        # The first occurrence of a section wins
+        if section_name in sections:
+            continue
+        end = marks[index + 1][0].start if index + 1 < len(marks) else len(text)
+        sections[section_name] = text[heading.content_start:end].strip()
+
+    return {section_name: sections.get(section_name, "") for section_name in SECTION_NAMES}
+
+
+def replace_section(text, section_name, content):
+    """
+    Return text with the body of section_name replaced by content, leaving
+    the heading and every other section untouched. A missing section is
+    appended at the end.
+    """
+    marks = section_marks(index_headings(text))
+    for index, (heading, matched_name) in enumerate(marks):
+        if matched_name == section_name:
+            end = marks[index + 1][0].start if index + 1 < len(marks) else len(text)
+            return f"{text[:heading.content_start]}\n{content.strip()}\n\n{text[end:]}"
+
+    return f"{text.rstrip()}\n\n### {section_name}\n{content.strip()}\n"
+
+
+def extract_title(text, headings=None):
+    """
+    Return the project title: the first heading before the template sections
+    """
+    if headings is None:
+        headings = index_headings(text)
+    for heading in headings:
+        if is_section_heading(heading):
+            break
+        return heading.title
+    return DEFAULT_TITLE
+
+
+def parse_project_response(response):
+    """
+    Build the structured project data dict (title plus one entry per section)
+    from a complete model response
+    """
+    headings = index_headings(response)
+    project_data = {"title": extract_title(response, headings)}
+    project_data.update(split_sections(response, headings))
+    return project_data
+
+
+class IncrementalSectionParser:
+    """
+    Parse a response while it is being streamed.
+
+    feed() returns the sections whose closing heading (the next template
+    section heading) has arrived. finish() runs the same split as
+    parse_project_response() over the complete heading index, so the final
+    result is identical to parsing the non-streamed response.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.title = None
+        self.sections = {}
+        self._index = HeadingIndex()
+        self._last_mark = None
+        self._section_level = None
+
+    def feed(self, delta):
+        """
+        Append a chunk of streamed text and return a list of
+        (section_name, content) tuples for sections completed by it
+        """
+        self.buffer += delta
+        return self._consume(self._index.update(self.buffer))
+
+    def _consume(self, headings):
+        completed = []
+        for heading in headings:
+            section_name = is_section_heading(heading, self._section_level)
+            if section_name is None:
+                if self.title is None and self._last_mark is None:
+                    self.title = heading.title
+                continue
+            if self._last_mark is not None:
+                previous_heading, previous_name = self._last_mark
+                if previous_name not in self.sections:
+                    content = self.buffer[previous_heading.content_start:heading.start].strip()
+                    self.sections[previous_name] = content
+                    completed.append((previous_name, content))
+            self._last_mark = (heading, section_name)
+            self._section_level = self._section_level or heading.level
+        return completed
+
+    def finish(self):
+        """
+        Parse the complete buffer. Returns the final project data and the
+        (section_name, content) tuples that differ from what feed() reported.
+        """
+        self._consume(self._index.update(self.buffer, final=True))
+        headings = self._index.headings
+        project_data = {"title": extract_title(self.buffer, headings)}
+        project_data.update(split_sections(self.buffer, headings))
+
+        self.title = project_data["title"]
+        changed = []
+        for section_name in SECTION_NAMES:
+            if self.sections.get(section_name) != project_data[section_name]:
+                changed.append((section_name, project_data[section_name]))
+            self.sections[section_name] = project_data[section_name]
+        return project_data, changed
@@ -0,0 +1,142 @@
+"""
+Near-duplicate detection of project requests.
+
+The exact-hash response cache misses forms that differ only slightly, e.g.
+"Intro to Data Science" vs "Introduction to Data Science" with the same
+objectives. SimilarityIndex keeps a MinHash signature of every stored
+form's free-text fields (character 3-gram shingles) and finds candidates
+through LSH banding, so a lookup touches only a handful of signatures even
+with tens of thousands of projects. Candidates must have the same academic
+level and duration; their similarity is the estimated Jaccard similarity of
+the shingle sets.
+"""
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from .cache import normalize_form_data
+
+# Free-text fields compared by similarity; the others must match exactly
+TEXT_FIELDS = ["subject", "objectives", "resources", "theme"]
+EXACT_FIELDS = ["academic_level", "duration"]
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 32
+DEFAULT_THRESHOLD = 0.75
+
+_NON_WORD_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def form_shingles(form_data, size=3):
+    """
+    Character n-grams of each free-text field, tagged with the field name so
+    that the same words in different fields do not match
+    """
+    normalized = normalize_form_data(form_data)
+    shingles = set()
+    for field in TEXT_FIELDS:
+        text = _NON_WORD_RE.sub(" ", normalized.get(field, "")).strip()
+        if not text:
+            continue
+        padded = f" {text} "
+        for start in range(max(1, len(padded) - size + 1)):
+            shingles.add(f"{field}:{padded[start:start + size]}")
+    return shingles
+
+
+class SimilarityIndex:
+    """
+    MinHash/LSH index of form data. num_perm hash functions are split into
+    `bands` bands; two forms become candidates when all hashes of any band
+    agree, which happens with high probability above about
+    (1 / bands) ** (bands / num_perm) similarity.
+    """
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS, threshold=DEFAULT_THRESHOLD, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        # Multiply-shift hashing: (a * x + b) mod 2**64, keeping the top 32 bits
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self._signatures = {}
+        self._exact = {}
+        self._buckets = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def signature(self, form_data):
+        """MinHash signature of the form's shingles (uint32 array of num_perm)"""
+        shingles = form_shingles(form_data)
+        if not shingles:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        values = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        with np.errstate(over="ignore"):
+            hashed = (values[:, None] * self._a + self._b) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature, exact_key):
+        # Buckets are per level and duration, so other levels are never candidates
+        return [(exact_key, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    @staticmethod
+    def _exact_key(form_data):
+        normalized = normalize_form_data(form_data)
+        return tuple(normalized.get(field, "") for field in EXACT_FIELDS)
+
+    def add(self, project_id, form_data):
+        """Add or replace the form of project_id"""
+        signature = self.signature(form_data)
+        exact_key = self._exact_key(form_data)
+        with self._lock:
+            self._remove(project_id)
+            self._signatures[project_id] = signature
+            self._exact[project_id] = exact_key
+            for band, key in enumerate(self._band_keys(signature, exact_key)):
+                self._buckets[band].setdefault(key, set()).add(project_id)
+
+    def remove(self, project_id):
+        with self._lock:
+            self._remove(project_id)
+
+    def _remove(self, project_id):
+        signature = self._signatures.pop(project_id, None)
+        if signature is None:
+            return
+        exact_key = self._exact.pop(project_id)
+        for band, key in enumerate(self._band_keys(signature, exact_key)):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(project_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def query(self, form_data, limit=3, threshold=None, exclude=()):
+        """
+        Return up to `limit` (project_id, similarity) pairs for the stored
+        forms most similar to form_data, at or above threshold, best first
+        """
+        threshold = self.threshold if threshold is None else threshold
+        signature = self.signature(form_data)
+        exact_key = self._exact_key(form_data)
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature, exact_key)):
+                candidates.update(self._buckets[band].get(key, ()))
+            candidates = [project_id for project_id in candidates if project_id not in exclude]
+            if not candidates:
+                return []
+            signatures = np.stack([self._signatures[project_id] for project_id in candidates])
+        similarities = (signatures == signature).mean(axis=1)
+        ranked = sorted(zip(candidates, similarities.tolist()), key=lambda item: -item[1])
+        return [(project_id, similarity) for project_id, similarity in ranked[:limit] if similarity >= threshold]
+
+    def __len__(self):
+        return len(self._signatures)
@@ -0,0 +1,396 @@
+"""
+Persistent store of generated projects, so that a project survives "Start
+New Project" and browser refreshes, and past projects can be found and
+reopened instead of being generated again.
+
+Each project is one row holding its form data, parsed sections and raw
+response. Its chat is kept one row per message, so a turn is appended
+without rewriting the conversation and any range of it can be read back
+(see chat_history.ChatHistory), and its revisions are kept one row per
+revision (see revisions.RevisionLog). Subject, academic level and duration are indexed
+(case- and whitespace-insensitive) for exact filters, and the title, form
+fields and section text are indexed with SQLite FTS5 for full-text search.
+Without FTS5 support in the SQLite build, search falls back to LIKE.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from .sections import SECTION_NAMES
+
+DEFAULT_STORE_PATH = os.path.join(".projectcraft", "projects.sqlite3")
+
+_QUERY_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _normalize(value):
+    return " ".join(str(value or "").split()).casefold()
+
+
+def _fts_query(text):
+    """
+    Turn free text into an FTS5 query that matches every word as a prefix,
+    so that user input cannot produce FTS syntax errors
+    """
+    return " ".join(f'"{term}"*' for term in _QUERY_TERM_RE.findall(text))
+
+
+class RevisionConflict(Exception):
+    """Another session added a revision after the one a new revision was based on."""
+
+
+class ProjectStore:
+    """
+    SQLite-backed project store with indexed filters and full-text search.
+
+    Like ResponseCache, a connection is opened per operation, so one instance
+    can be shared by every Streamlit session and thread in the process.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS projects (
+                    rowid INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    academic_level TEXT NOT NULL,
+                    duration TEXT NOT NULL,
+                    form_data TEXT NOT NULL,
+                    project_data TEXT NOT NULL,
+                    raw_response TEXT NOT NULL,
+                    messages TEXT NOT NULL,
+                    model TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            for column in ("subject", "academic_level", "duration", "updated_at"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS projects_{column} ON projects ({column})")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chat_messages (
+                    project_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    PRIMARY KEY (project_id, seq)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS project_revisions (
+                    project_id TEXT NOT NULL,
+                    number INTEGER NOT NULL,
+                    snapshot INTEGER NOT NULL,
+                    label TEXT NOT NULL,
+                    changed TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (project_id, number)
+                ) WITHOUT ROWID
+            """)
+            # Chats of older databases were kept as JSON in projects.messages
+            for project_id, messages_json in conn.execute(
+                    "SELECT id, messages FROM projects WHERE messages != '[]'").fetchall():
+                self._replace_messages(conn, project_id, json.loads(messages_json))
+                conn.execute("UPDATE projects SET messages = '[]' WHERE id = ?", (project_id,))
+            try:
+                conn.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5(
+                        title, form, body, tokenize = 'porter unicode61'
+                    )
+                """)
+                self.full_text = True
+            except sqlite3.OperationalError:
+                self.full_text = False
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a store from PROJECTCRAFT_STORE_PATH
+        """
+        return cls(path=os.getenv("PROJECTCRAFT_STORE_PATH", DEFAULT_STORE_PATH))
+
+    @contextmanager
+    def _connect(self):
+        # Commit on success, roll back on error, and always close
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save(self, project_id, form_data, project_data, raw_response, messages=None, model=None):
+        """
+        Insert or update a project. messages=None keeps the stored chat
+        history of an existing project.
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT rowid FROM projects WHERE id = ?", (project_id,)).fetchone()
+            if messages is not None:
+                self._replace_messages(conn, project_id, messages)
+            values = (
+                project_data.get("title") or "",
+                _normalize(form_data.get("subject")),
+                _normalize(form_data.get("academic_level")),
+                _normalize(form_data.get("duration")),
+                json.dumps(form_data, ensure_ascii=False),
+                json.dumps(project_data, ensure_ascii=False),
+                raw_response or "",
+                "[]",
+                model,
+            )
+            if row is None:
+                rowid = conn.execute(
+                    "INSERT INTO projects (id, title, subject, academic_level, duration, form_data, project_data, "
+                    "raw_response, messages, model, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (project_id, *values, now, now),
+                ).lastrowid
+            else:
+                rowid = row[0]
+                conn.execute(
+                    "UPDATE projects SET title = ?, subject = ?, academic_level = ?, duration = ?, form_data = ?, "
+                    "project_data = ?, raw_response = ?, messages = ?, model = ?, updated_at = ? WHERE rowid = ?",
+                    (*values, now, rowid),
+                )
+            if self.full_text:
+                form_text = " ".join(str(value) for value in form_data.values() if value)
+                body = "\n\n".join(project_data.get(section_name) or "" for section_name in SECTION_NAMES)
+                conn.execute("DELETE FROM projects_fts WHERE rowid = ?", (rowid,))
+                conn.execute(
+                    "INSERT INTO projects_fts (rowid, title, form, body) VALUES (?, ?, ?, ?)",
+                    (rowid, project_data.get("title") or "", form_text, body),
+                )
+
+    @staticmethod
+    def _replace_messages(conn, project_id, messages):
+        conn.execute("DELETE FROM chat_messages WHERE project_id = ?", (project_id,))
+        conn.executemany(
+            "INSERT INTO chat_messages (project_id, seq, role, content) VALUES (?, ?, ?, ?)",
+            [(project_id, seq, message["role"], message["content"]) for seq, message in enumerate(messages)],
+        )
+
+    def save_messages(self, project_id, messages):
+        """
+        Replace the chat history of a stored project. Returns False if the
+        project is not stored.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute("UPDATE projects SET updated_at = ? WHERE id = ?", (time.time(), project_id))
+            if cursor.rowcount:
+                self._replace_messages(conn, project_id, messages)
+        return cursor.rowcount > 0
+
+    def append_messages(self, project_id, messages):
+        """
+        Add messages after the last stored message of a chat, so that
+        appending a turn costs the same however long the chat is and never
+        touches messages other sessions added. Returns the sequence numbers
+        of the new rows (see delete_message). The project need not be
+        stored yet.
+        """
+        with self._connect() as conn:
+            # Take the write lock before reading the last sequence number
+            conn.execute("BEGIN IMMEDIATE")
+            start = conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM chat_messages WHERE project_id = ?", (project_id,),
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO chat_messages (project_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                [(project_id, start + offset, message["role"], message["content"])
+                 for offset, message in enumerate(messages)],
+            )
+            conn.execute("UPDATE projects SET updated_at = ? WHERE id = ?", (time.time(), project_id))
+        return list(range(start, start + len(messages)))
+
+    def delete_message(self, project_id, seq):
+        """Delete the chat message with sequence number seq, leaving the rest of the chat as it is"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chat_messages WHERE project_id = ? AND seq = ?", (project_id, seq))
+
+    def load_messages(self, project_id, start=0, stop=None, with_seq=False):
+        """
+        Return the chat messages at positions start to stop (exclusive) of a
+        project, in order. With with_seq=True, returns (seq, message) pairs.
+        """
+        stop = stop if stop is not None else 2 ** 62
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, role, content FROM chat_messages WHERE project_id = ? ORDER BY seq LIMIT ? OFFSET ?",
+                (project_id, max(0, stop - start), start),
+            ).fetchall()
+        if with_seq:
+            return [(seq, {"role": role, "content": content}) for seq, role, content in rows]
+        return [{"role": role, "content": content} for _, role, content in rows]
+
+    def count_messages(self, project_id):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM chat_messages WHERE project_id = ?", (project_id,)).fetchone()[0]
+
+    def add_revision(self, project_id, parent, snapshot, label, changed, data, created_at=None):
+        """
+        Store the next revision of a project and return its number: data is
+        the whole project if snapshot is True, otherwise the delta from
+        revision parent (0 for the first revision). Raises RevisionConflict
+        if parent is no longer the latest revision, i.e. another session
+        added one in between.
+        """
+        with self._connect() as conn:
+            # Take the write lock before reading the latest number, so no other writer can slip in
+            conn.execute("BEGIN IMMEDIATE")
+            latest = conn.execute(
+                "SELECT COALESCE(MAX(number), 0) FROM project_revisions WHERE project_id = ?", (project_id,),
+            ).fetchone()[0]
+            if latest != parent:
+                raise RevisionConflict(f"project {project_id} has revision {latest}, not {parent}")
+            conn.execute(
+                "INSERT INTO project_revisions (project_id, number, snapshot, label, changed, data, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (project_id, latest + 1, int(snapshot), label, json.dumps(changed, ensure_ascii=False),
+                 json.dumps(data, ensure_ascii=False), created_at or time.time()),
+            )
+        return latest + 1
+
+    def latest_revision(self, project_id):
+        """Number of the latest revision of a project, 0 if it has none"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COALESCE(MAX(number), 0) FROM project_revisions WHERE project_id = ?", (project_id,),
+            ).fetchone()[0]
+
+    def list_revisions(self, project_id):
+        """Return the index of a project's revisions (number, snapshot, label, changed, created_at), oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT number, snapshot, label, changed, created_at FROM project_revisions "
+                "WHERE project_id = ? ORDER BY number",
+                (project_id,),
+            ).fetchall()
+        return [
+            {"number": number, "snapshot": bool(snapshot), "label": label, "changed": json.loads(changed),
+             "created_at": created_at}
+            for number, snapshot, label, changed, created_at in rows
+        ]
+
+    def load_revisions(self, project_id, start, stop):
+        """Return the data of revisions start to stop (exclusive) of a project, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM project_revisions WHERE project_id = ? AND number >= ? AND number < ? ORDER BY number",
+                (project_id, start, stop),
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def get(self, project_id):
+        """
+        Return the stored project as a dict (id, form_data, project_data,
+        raw_response, message_count, model, created_at, updated_at), or None.
+        The chat is read with load_messages().
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, form_data, project_data, raw_response, "
+                "(SELECT COUNT(*) FROM chat_messages WHERE project_id = projects.id), model, created_at, updated_at "
+                "FROM projects WHERE id = ?",
+                (project_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "form_data": json.loads(row[1]),
+            "project_data": json.loads(row[2]),
+            "raw_response": row[3],
+            "message_count": row[4],
+            "model": row[5],
+            "created_at": row[6],
+            "updated_at": row[7],
+        }
+
+    def search(self, query="", subject=None, academic_level=None, duration=None, limit=20):
+        """
+        Return summaries (id, title, subject, academic_level, duration,
+        updated_at) of the projects matching every given filter, best
+        full-text matches first, otherwise most recently updated first.
+        Filters compare case- and whitespace-insensitively.
+        """
+        conditions, params = [], []
+        for column, value in (("subject", subject), ("academic_level", academic_level), ("duration", duration)):
+            if value:
+                conditions.append(f"p.{column} = ?")
+                params.append(_normalize(value))
+
+        fts_query = _fts_query(query) if query else ""
+        if fts_query and self.full_text:
+            sql = ("SELECT p.id, p.title, p.form_data, p.updated_at FROM projects_fts f "
+                   "JOIN projects p ON p.rowid = f.rowid WHERE projects_fts MATCH ?")
+            params.insert(0, fts_query)
+            order = "ORDER BY bm25(projects_fts, 10.0, 5.0, 1.0)"
+        else:
+            sql = "SELECT p.id, p.title, p.form_data, p.updated_at FROM projects p WHERE 1"
+            order = "ORDER BY p.updated_at DESC"
+            for term in (_QUERY_TERM_RE.findall(query) if query else []):
+                conditions.append("(p.title LIKE ? OR p.form_data LIKE ? OR p.project_data LIKE ?)")
+                params.extend([f"%{term}%"] * 3)
+
+        sql += "".join(f" AND {condition}" for condition in conditions)
+        sql += f" {order} LIMIT ?"
+        params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        results = []
+        for project_id, title, form_json, updated_at in rows:
+            form_data = json.loads(form_json)
+            results.append({
+                "id": project_id,
+                "title": title,
+                "subject": form_data.get("subject", ""),
+                "academic_level": form_data.get("academic_level", ""),
+                "duration": form_data.get("duration", ""),
+                "updated_at": updated_at,
+            })
+        return results
+
+    def iter_forms(self):
+        """
+        Yield (project_id, form_data) for every stored project, e.g. to
+        build a similarity index
+        """
+        with self._connect() as conn:
+            for project_id, form_json in conn.execute("SELECT id, form_data FROM projects"):
+                yield project_id, json.loads(form_json)
+
+    def delete(self, project_id):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT rowid FROM projects WHERE id = ?", (project_id,)).fetchone()
+            if row is None:
+                return
+            conn.execute("DELETE FROM projects WHERE rowid = ?", row)
+            conn.execute("DELETE FROM chat_messages WHERE project_id = ?", (project_id,))
+            conn.execute("DELETE FROM project_revisions WHERE project_id = ?", (project_id,))
+            if self.full_text:
+                conn.execute("DELETE FROM projects_fts WHERE rowid = ?", row)
+
+    def stats(self):
+        """
+        Return the number of stored projects and the database size in bytes
+        """
+        with self._connect() as conn:
+            projects = conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {"projects": projects, "bytes": size, "full_text": self.full_text}
@@ -0,0 +1,96 @@
+"""
+Structured-output generation: the model fills a JSON schema with one field
+per template section, so project_data comes straight from the response
+instead of from matching headings that the model may have renamed.
+
+The response is validated against the template; anything that does not
+validate raises StructuredOutputError so that the caller can fall back to
+the markdown path.
+"""
+import json
+import re
+
+from .prompts import build_project_prompt, PROJECT_GENERATOR_PROMPT
+from .sections import DEFAULT_TITLE, SECTION_NAMES
+
+STRUCTURED_INSTRUCTIONS = """
+## Response Format
+Return the project as a JSON object with a "title" field for the project title and one field per template section. Each section field holds the markdown content of that section without its heading.
+"""
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a structured response does not match the project schema."""
+
+
+def section_field(section_name):
+    """JSON field name for a template section, e.g. learning_objectives"""
+    return re.sub(r"[^a-z0-9]+", "_", section_name.lower()).strip("_")
+
+
+SECTION_FIELDS = {section_name: section_field(section_name) for section_name in SECTION_NAMES}
+
+PROJECT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        **{field: {"type": "string"} for field in SECTION_FIELDS.values()},
+    },
+    "required": ["title", *SECTION_FIELDS.values()],
+    "additionalProperties": False,
+}
+
+# response_format argument for the Chat Completions API
+PROJECT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "mini_project", "strict": True, "schema": PROJECT_SCHEMA},
+}
+
+
+def build_structured_project_messages(form_data):
+    """
+    Build the chat messages for generating a project as JSON
+    """
+    return [
+        {"role": "system", "content": PROJECT_GENERATOR_PROMPT + STRUCTURED_INSTRUCTIONS},
+        {"role": "user", "content": build_project_prompt(form_data)}
+    ]
+
+
+def parse_structured_response(response):
+    """
+    Validate a JSON response against PROJECT_SCHEMA and return project_data.
+    Raises StructuredOutputError for invalid JSON, missing or non-string
+    fields, or empty sections.
+    """
+    try:
+        data = json.loads(response or "")
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"response is not valid JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise StructuredOutputError("response is not a JSON object")
+
+    project_data = {"title": str(data.get("title") or "").strip()}
+    empty = []
+    for section_name, field in SECTION_FIELDS.items():
+        content = data.get(field)
+        if not isinstance(content, str) or not content.strip():
+            empty.append(section_name)
+            continue
+        project_data[section_name] = content.strip()
+    if empty:
+        raise StructuredOutputError(f"missing or empty sections: {', '.join(empty)}")
+    if not project_data["title"]:
+        project_data["title"] = DEFAULT_TITLE
+    return project_data
+
+
+def project_data_to_markdown(project_data):
+    """
+    Render project_data in the template's markdown layout, so that structured
+    responses can be cached, exported and edited like markdown ones
+    """
+    parts = [f"# {project_data['title']}"]
+    for section_name in SECTION_NAMES:
+        parts.append(f"### {section_name}\n{project_data.get(section_name, '')}")
+    return "\n\n".join(parts) + "\n"
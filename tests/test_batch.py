@@ -0,0 +1,47 @@
+import json
+
+from projectcraft import batch
+from projectcraft.backends import BackendConfig, FakeBackend
+from projectcraft.batch import read_specs
+from projectcraft.client import set_backend
+
+
+def test_jsonl_values_are_read_as_text_and_bad_lines_skipped(tmp_path, capsys):
+    path = tmp_path / "courses.jsonl"
+    path.write_text(
+        '{"id": 7, "subject": "Statistics", "academic_level": "Graduate", "duration": 2, '
+        '"objectives": "Fit models", "resources": "R", "theme": null}\n'
+        "not json\n"
+        '["a", "list"]\n'
+        '{"subject": " Biology ", "academic_level": "High School", "duration": "1 week", '
+        '"objectives": "Observe", "resources": true}\n',
+        encoding="utf-8",
+    )
+
+    specs = read_specs(str(path))
+
+    assert specs[0] == ("7", {"subject": "Statistics", "academic_level": "Graduate", "duration": "2",
+                              "objectives": "Fit models", "resources": "R", "theme": ""})
+    assert specs[1][1]["subject"] == "Biology"
+    assert specs[1][1]["resources"] == "True"
+    assert len(specs) == 2
+    errors = capsys.readouterr().err
+    assert "courses.jsonl:2: skipped, invalid JSON" in errors
+    assert "courses.jsonl:3: skipped, not a JSON object" in errors
+
+
+def test_fake_backend_needs_no_api_key(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROJECTCRAFT_BACKEND", "fake")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(batch, "load_dotenv", lambda: None)
+    set_backend(FakeBackend(BackendConfig(backend="fake", fake_time_to_first_token=0.0, fake_token_delay=0.0)))
+    specs = tmp_path / "courses.jsonl"
+    specs.write_text('{"subject": "Statistics", "academic_level": "Graduate", "duration": "2 weeks", '
+                     '"objectives": "Fit models", "resources": "R"}\n', encoding="utf-8")
+    try:
+        assert batch.main([str(specs), "--out-dir", str(tmp_path / "out"), "--no-cache"]) == 0
+    finally:
+        set_backend(None)
+
+    with open(tmp_path / "out" / "results.jsonl", encoding="utf-8") as f:
+        assert json.loads(f.readline())["status"] == "ok"
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from projectcraft.backends import BackendConfig, FakeBackend
+from projectcraft.client import set_backend
+from projectcraft.core import ProjectSession
+from projectcraft.jobs import JobManager
+from projectcraft.scheduler import Cancelled, RequestScheduler, SchedulerConfig, cancellable
+from projectcraft.store import ProjectStore
+
+
+def test_response_of_a_call_cancelled_meanwhile_is_dropped():
+    scheduler = RequestScheduler(SchedulerConfig())
+    event = threading.Event()
+
+    def call(timeout):
+        # Cancelled while the (non-streamed) request is with the API
+        event.set()
+        return "answer"
+
+    with cancellable(event), pytest.raises(Cancelled):
+        scheduler.run(call, 100)
+    assert scheduler.stats()["cancelled"] == 1
+    assert scheduler.stats()["completed"] == 0
+
+
+def test_failed_call_cancelled_meanwhile_is_not_retried():
+    scheduler = RequestScheduler(SchedulerConfig())
+    event = threading.Event()
+    calls = []
+
+    def call(timeout):
+        calls.append(timeout)
+        event.set()
+        raise TimeoutError("read timeout")
+
+    with cancellable(event), pytest.raises(Cancelled):
+        scheduler.run(call, 100)
+    assert len(calls) == 1
+
+
+def test_prefetch_job_has_a_heartbeat(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROJECTCRAFT_PREFETCH_HEARTBEAT_SECONDS", "30")
+    set_backend(FakeBackend(BackendConfig(backend="fake", fake_time_to_first_token=0.0, fake_token_delay=0.0)))
+    try:
+        job_manager = JobManager(max_workers=2)
+        session = ProjectSession("key", "model", ProjectStore(str(tmp_path / "projects.sqlite3")),
+                                 job_manager=job_manager)
+        session.form_data = {"subject": "Data Science"}
+        session.project_data = {"title": "Dashboard", "Overview": "Build a dashboard."}
+        session.raw_response = "# Dashboard\n\n### Overview\nBuild a dashboard.\n"
+
+        session.start_prefetch()
+        job = job_manager.get(session._prefetch["job_id"])
+        assert job.heartbeat_timeout == 30.0
+
+        # Showing the same revision again keeps the job alive
+        job.last_seen -= 10
+        stale = job.last_seen
+        session.start_prefetch()
+        assert job_manager.get(session._prefetch["job_id"]) is job
+        assert job.last_seen > stale
+
+        session.cancel_prefetch("prefetch turned off")
+        assert job.cancelled and job.cancel_reason == "prefetch turned off"
+        assert session.prefetched_answer("teamwork") is None
+    finally:
+        set_backend(None)
@@ -0,0 +1,44 @@
+import pytest
+
+from projectcraft.chat_history import ChatHistory, HistoryConfig
+from projectcraft.store import ProjectStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProjectStore(str(tmp_path / "projects.sqlite3"))
+
+
+def contents(messages):
+    return [(message["role"], message["content"]) for message in messages]
+
+
+def test_two_sessions_keep_each_others_messages(store):
+    session_a = ChatHistory.load("p1", store, HistoryConfig())
+    session_b = ChatHistory.load("p1", store, HistoryConfig())
+
+    session_a.append("user", "qA")
+    session_a.append("assistant", "ansA")
+    session_b.append("user", "qB")
+
+    assert contents(store.load_messages("p1")) == [("user", "qA"), ("assistant", "ansA"), ("user", "qB")]
+
+    # B's unanswered question is removed by its own row, not by truncating at B's length
+    assert session_b.pop() == {"role": "user", "content": "qB"}
+    session_a.append("user", "qA2")
+    session_a.pop()
+    assert contents(store.load_messages("p1")) == [("user", "qA"), ("assistant", "ansA")]
+
+
+def test_pop_reloads_the_previous_window(store):
+    history = ChatHistory.load("p1", store, HistoryConfig(history_window=2))
+    for index in range(5):
+        history.append("user", f"m{index}")
+    assert contents(history.recent) == [("user", "m3"), ("user", "m4")]
+
+    history.pop()
+    history.pop()
+    assert contents(history.recent) == [("user", "m1"), ("user", "m2")]
+    assert history.spilled == 1
+    assert contents(history.tail(3)) == [("user", "m0"), ("user", "m1"), ("user", "m2")]
+    assert contents(ChatHistory.load("p1", store, HistoryConfig()).recent) == contents(history.tail(3))
@@ -0,0 +1,51 @@
+import pytest
+
+from projectcraft import client
+from projectcraft.client import (ClientConfig, acquire_openai_client, close_openai_client, get_openai_client,
+                                 release_openai_client)
+
+
+@pytest.fixture(autouse=True)
+def shared_client():
+    close_openai_client()
+    yield
+    close_openai_client()
+
+
+def test_same_key_and_config_share_one_client():
+    config = ClientConfig()
+
+    assert get_openai_client("key", config) is get_openai_client("key", config)
+    assert get_openai_client("key", ClientConfig(max_connections=5)) is not get_openai_client("key", config)
+
+
+def test_replaced_client_stays_open_until_its_requests_end():
+    in_use = acquire_openai_client("old-key", ClientConfig())
+    idle = get_openai_client("other-key", ClientConfig())
+
+    current = get_openai_client("new-key", ClientConfig())
+    assert current is not in_use
+    assert idle.is_closed()
+    assert not in_use.is_closed()
+
+    release_openai_client(in_use)
+    assert in_use.is_closed()
+    assert not current.is_closed()
+    assert client._users == {}
+
+
+def test_current_client_is_not_closed_by_its_last_request():
+    shared = acquire_openai_client("key", ClientConfig())
+    release_openai_client(shared)
+
+    assert not shared.is_closed()
+    assert get_openai_client("key", ClientConfig()) is shared
+
+
+def test_closing_waits_for_requests_in_flight():
+    in_use = acquire_openai_client("key", ClientConfig())
+
+    close_openai_client()
+    assert not in_use.is_closed()
+    release_openai_client(in_use)
+    assert in_use.is_closed()
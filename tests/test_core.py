@@ -0,0 +1,40 @@
+from projectcraft.core import ProjectSession
+from projectcraft.store import ProjectStore
+
+PROJECT = {"title": "Dashboard", "Overview": "Build a dashboard."}
+
+
+def make_session(tmp_path):
+    session = ProjectSession("key", "model", ProjectStore(str(tmp_path / "projects.sqlite3")))
+    session.form_data = {"subject": "Data Science"}
+    session.project_data = dict(PROJECT)
+    return session
+
+
+def test_export_is_reused_until_the_project_changes(tmp_path):
+    session = make_session(tmp_path)
+    export = session.export()
+
+    assert session.export() is export
+    # An equal copy is the same revision
+    session.project_data = dict(PROJECT)
+    assert session.export() is export
+
+    session.project_data = dict(PROJECT, Overview="Build an interactive dashboard.")
+    changed = session.export()
+    assert changed is not export
+    assert "interactive dashboard" in changed["markdown"]
+
+
+def test_export_is_not_reused_for_a_new_object_at_a_freed_address(tmp_path):
+    session = make_session(tmp_path)
+    session.export()
+
+    # Replace the project with a new, different one without keeping the old
+    # one alive; its memory (and id) may be reused by the new dict
+    session.project_data = None
+    project_data = {}
+    project_data.update(PROJECT, Overview="Build a data pipeline.")
+    session.project_data = project_data
+
+    assert "data pipeline" in session.export()["markdown"]
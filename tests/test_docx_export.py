@@ -0,0 +1,46 @@
+from io import BytesIO
+
+from docx import Document
+
+from projectcraft.docx_export import project_to_docx
+
+
+def test_table_of_only_separator_rows_is_skipped():
+    project_data = {
+        "title": "Dashboard",
+        "Evaluation Criteria": "Weights:\n\n|---|---|\n|:--|--:|\n\nSee the rubric.",
+        "Deliverables": "| Item | Due |\n|---|---|\n| Report | Week 2 |",
+    }
+
+    document = Document(BytesIO(project_to_docx(project_data, {"subject": "Data Science"}, "session")))
+
+    assert len(document.tables) == 1
+    assert [cell.text for cell in document.tables[0].rows[1].cells] == ["Report", "Week 2"]
+    assert "See the rubric." in [paragraph.text for paragraph in document.paragraphs]
+
+
+def numbering_of(document, paragraph):
+    """(numId, ilvl, start) of a numbered paragraph"""
+    num_pr = paragraph._p.pPr.numPr
+    num_id, ilvl = num_pr.numId.val, num_pr.ilvl.val
+    num = document.part.numbering_part.element.num_having_numId(num_id)
+    starts = num.xpath(f'./w:lvlOverride[@w:ilvl="{ilvl}"]/w:startOverride/@w:val')
+    return num_id, ilvl, int(starts[0]) if starts else None
+
+
+def test_numbered_lists_in_separate_sections_restart_at_one():
+    project_data = {
+        "title": "Dashboard",
+        "Deliverables": "1. Report\n2. Code",
+        "Submission Guidelines": "1. Zip it\n   - with the data\n2. Upload",
+    }
+
+    document = Document(BytesIO(project_to_docx(project_data, {"subject": "Data Science"}, "session")))
+    items = {paragraph.text: paragraph for paragraph in document.paragraphs if paragraph.style.name == "List Number"}
+
+    report, code = numbering_of(document, items["Report"]), numbering_of(document, items["Code"])
+    zip_it, upload = numbering_of(document, items["Zip it"]), numbering_of(document, items["Upload"])
+    assert report == code
+    assert zip_it == upload
+    assert report[0] != zip_it[0]
+    assert report[2] == zip_it[2] == 1
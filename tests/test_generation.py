@@ -0,0 +1,97 @@
+import pytest
+
+from projectcraft import generation
+from projectcraft.backends import BackendConfig, FakeAPIError, FakeBackend
+from projectcraft.cache import ResponseCache
+from projectcraft.client import set_backend
+from projectcraft.core import CallbackProgress
+from projectcraft.metrics import MetricsRegistry
+from projectcraft.prompts import build_project_messages
+from projectcraft.routing import GENERATION, Router, RoutingConfig
+from projectcraft.sections import SECTION_NAMES
+
+SHORT_FORM = {
+    "subject": "Data Science",
+    "academic_level": "High School",
+    "duration": "1 week",
+    "objectives": "Clean and chart a dataset",
+    "resources": "Python, pandas",
+    "theme": "",
+}
+
+
+class PrimaryDownBackend(FakeBackend):
+    """Fails every request to the primary model with a server error"""
+
+    def __init__(self, primary_model, config):
+        super().__init__(config)
+        self.primary_model = primary_model
+
+    def complete(self, model, messages, *args, **kwargs):
+        if model == self.primary_model:
+            raise FakeAPIError(503, "primary is down")
+        return super().complete(model, messages, *args, **kwargs)
+
+
+def fake_config(**overrides):
+    return BackendConfig(backend="fake", fake_time_to_first_token=0.0, fake_token_delay=0.0, **overrides)
+
+
+def use_router(monkeypatch, **config):
+    router = Router(RoutingConfig(route_primary_retries=0, **config), metrics=MetricsRegistry())
+    monkeypatch.setattr(generation, "get_router", lambda: router)
+    return router
+
+
+@pytest.fixture
+def backend():
+    yield lambda fake_backend: set_backend(fake_backend)
+    set_backend(None)
+
+
+def test_generation_budget_keeps_the_fixed_floor():
+    router = Router(RoutingConfig(), metrics=MetricsRegistry())
+
+    assert router.budget(GENERATION, SHORT_FORM) == 4000
+    assert router.budget(GENERATION, dict(SHORT_FORM, academic_level="Graduate", duration="Full semester")) > 4000
+
+
+def test_short_project_is_not_truncated(monkeypatch, backend):
+    # About 3,100 tokens: more than the sized budget of a one-week high-school project
+    fake_backend = FakeBackend(fake_config(fake_response_words=3000))
+    backend(fake_backend)
+    complete = fake_backend.complete("primary-model", build_project_messages(SHORT_FORM), 10 ** 6).text
+
+    use_router(monkeypatch, route_min_generation_tokens=0, route_fallback_model="")
+    truncated, _ = generation.generate_project_response("key", "primary-model", SHORT_FORM)
+    use_router(monkeypatch, route_fallback_model="")
+    response, project_data = generation.generate_project_response("key", "primary-model", SHORT_FORM)
+
+    assert len(truncated) < len(complete)
+    assert response == complete
+    assert all(project_data[section_name] for section_name in SECTION_NAMES)
+
+
+def test_fallback_response_is_labelled_and_not_cached(monkeypatch, backend, tmp_path):
+    backend(PrimaryDownBackend("primary-model", fake_config()))
+    use_router(monkeypatch, route_fallback_model="fallback-model")
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+
+    result = generation.run_generation_job(CallbackProgress(), "key", "primary-model", SHORT_FORM, stream=False,
+                                           response_cache=cache, cache_key="primary-key")
+
+    assert result["model"] == "fallback-model"
+    assert all(result["project_data"][section_name] for section_name in SECTION_NAMES)
+    assert cache.get("primary-key") is None
+
+
+def test_primary_response_is_cached(monkeypatch, backend, tmp_path):
+    backend(FakeBackend(fake_config()))
+    use_router(monkeypatch, route_fallback_model="fallback-model")
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+
+    result = generation.run_generation_job(CallbackProgress(), "key", "primary-model", SHORT_FORM,
+                                           response_cache=cache, cache_key="primary-key")
+
+    assert result["model"] == "primary-model"
+    assert cache.get("primary-key") == result["raw_response"]
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from projectcraft.jobs import CANCELLED, DONE, FAILED, JobManager
+
+
+def wait_done(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not job.done:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return job
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def blocking(job, release, result="ok"):
+    release.wait(5)
+    return result
+
+
+def test_submit_with_the_key_of_a_running_job_returns_it(release):
+    manager = JobManager(max_workers=2)
+
+    first = manager.submit("project-1", blocking, release)
+    assert manager.submit("project-1", blocking, release) is first
+    other = manager.submit("project-2", blocking, release)
+    assert other is not first
+
+    release.set()
+    assert wait_done(first).status == DONE and first.result == "ok"
+    # A finished job no longer counts as a duplicate
+    assert manager.submit("project-1", blocking, release) is not first
+
+
+def test_cancelled_job_is_not_a_duplicate(release):
+    manager = JobManager(max_workers=1)
+    job = manager.submit("project-1", blocking, release)
+    job.cancel()
+
+    assert manager.submit("project-1", blocking, release) is not job
+    release.set()
+    assert wait_done(job).status == CANCELLED
+    assert job.result is None
+
+
+def test_done_jobs_always_have_a_finish_time():
+    manager = JobManager(max_workers=1)
+
+    def failing(job):
+        raise ValueError("boom")
+
+    job = wait_done(manager.submit("failing", failing))
+    assert job.status == FAILED and job.error == "boom"
+    assert job.finished_at is not None
+    assert job.snapshot()["finished_at"] == job.finished_at
+
+
+def test_finished_jobs_are_purged_after_retention():
+    manager = JobManager(max_workers=1, retention_seconds=0)
+    job = wait_done(manager.submit("quick", lambda job: "ok"))
+    assert manager.get(job.id) is job
+
+    time.sleep(0.01)
+    manager.submit("other", lambda job: "ok")
+    assert manager.get(job.id) is None
+
+
+def test_unfinished_jobs_are_not_purged(release):
+    manager = JobManager(max_workers=1, retention_seconds=0)
+    job = manager.submit("slow", blocking, release)
+
+    manager.submit("other", lambda job: "ok")
+    assert manager.get(job.id) is job
+
+
+def test_abandoned_job_is_cancelled_by_the_reaper(release):
+    manager = JobManager(max_workers=2)
+    watched = manager.submit("watched", blocking, release, heartbeat_timeout=60)
+    unwatched = manager.submit("unwatched", blocking, release)
+
+    assert manager.reap_abandoned(now=time.monotonic() + 30) == []
+    watched.touch()
+    assert manager.reap_abandoned(now=time.monotonic() + 61) == [watched]
+    assert watched.cancelled and watched.cancel_reason == "abandoned"
+    assert not unwatched.cancelled
+
+    release.set()
+    assert wait_done(watched).status == CANCELLED
+    assert wait_done(unwatched).status == DONE
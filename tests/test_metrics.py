@@ -0,0 +1,51 @@
+import pytest
+
+from projectcraft import client
+from projectcraft.backends import BackendConfig, FakeAPIError, FakeBackend, split_tokens
+from projectcraft.client import create_chat_completion, set_backend, stream_chat_completion
+from projectcraft.metrics import MetricsRegistry
+
+MESSAGES = [{"role": "system", "content": "You are a teacher."},
+            {"role": "user", "content": "How should students present their findings?"}]
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(client, "get_metrics", lambda: registry)
+    yield registry
+    set_backend(None)
+
+
+def fake_backend(**overrides):
+    backend = FakeBackend(BackendConfig(backend="fake", fake_time_to_first_token=0.0, fake_token_delay=0.0,
+                                        **overrides))
+    set_backend(backend)
+    return backend
+
+
+def test_tokens_reported_by_the_backend_are_recorded(metrics):
+    fake_backend()
+    prompt_tokens = sum(len(split_tokens(message["content"])) for message in MESSAGES)
+
+    answer = create_chat_completion("key", "model", MESSAGES, kind="chat")
+    streamed = "".join(stream_chat_completion("key", "model", MESSAGES, kind="chat"))
+
+    completed, stream = metrics.recent(0)
+    assert answer == streamed
+    for record in (completed, stream):
+        assert record["prompt_tokens"] == prompt_tokens
+        assert record["completion_tokens"] == len(split_tokens(answer))
+        assert not record["estimated_tokens"]
+
+
+def test_tokens_of_a_failed_stream_are_estimated(metrics):
+    fake_backend(fake_error_after_tokens=5)
+
+    with pytest.raises(FakeAPIError):
+        "".join(stream_chat_completion("key", "model", MESSAGES, kind="chat"))
+
+    record, = metrics.recent(0)
+    assert record["status"] == "FakeAPIError"
+    assert record["completion_tokens"] == 5
+    assert record["estimated_tokens"]
@@ -0,0 +1,42 @@
+import pytest
+
+from projectcraft.revisions import RevisionConfig, RevisionLog
+from projectcraft.store import ProjectStore, RevisionConflict
+
+BASE = {"title": "Dashboard", "Overview": "Build a dashboard.", "Deliverables": "A report."}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProjectStore(str(tmp_path / "projects.sqlite3"))
+
+
+def test_two_sessions_append_to_one_revision_chain(store):
+    config = RevisionConfig(revision_snapshot_interval=10)
+    session_a = RevisionLog("p1", store, config)
+    assert session_a.record(BASE, "# Dashboard\nA", "Generated") == 1
+    session_b = RevisionLog.load("p1", store, config)
+
+    a_edit = dict(BASE, Overview="Build an interactive dashboard.")
+    b_edit = dict(BASE, Deliverables="A report and a demo.")
+    assert session_a.record(a_edit, "# Dashboard\nA edits", "A edits") == 2
+    # B is based on revision 1 but must be stored after A's revision, diffed against it
+    assert session_b.record(b_edit, "# Dashboard\nB edits", "B edits") == 3
+
+    assert [(entry["number"], entry["label"]) for entry in store.list_revisions("p1")] == [
+        (1, "Generated"), (2, "A edits"), (3, "B edits"),
+    ]
+    assert session_b.checkout(2) == (a_edit, "# Dashboard\nA edits")
+    assert session_b.checkout(3) == (b_edit, "# Dashboard\nB edits")
+    assert RevisionLog.load("p1", store, config).checkout(3) == (b_edit, "# Dashboard\nB edits")
+
+    # A sees B's revision before recording again
+    assert session_a.record(b_edit, "# Dashboard\nB edits", "Saved") is None
+    assert session_a.latest == 3
+
+
+def test_add_revision_refuses_a_stale_parent(store):
+    store.add_revision("p1", 0, True, "Generated", [], {"project_data": BASE, "raw_response": ""})
+    with pytest.raises(RevisionConflict):
+        store.add_revision("p1", 0, True, "Generated again", [], {"project_data": BASE, "raw_response": ""})
+    assert store.latest_revision("p1") == 1
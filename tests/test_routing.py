@@ -0,0 +1,72 @@
+from projectcraft.backends import FakeAPIError
+from projectcraft.metrics import MetricsRegistry
+from projectcraft.routing import CHAT, GENERATION, REQUEST_KINDS, SECTION, SUGGESTION, Router, RoutingConfig
+
+SHORT_FORM = {"subject": "Data Science", "academic_level": "High School", "duration": "1 week"}
+RATE_LIMIT = FakeAPIError(429, "rate limited")
+
+
+def make_router(**config):
+    return Router(RoutingConfig(route_fallback_model="fallback-model", **config), metrics=MetricsRegistry())
+
+
+def rate_limited_request(router, recovered):
+    timer = router.metrics.start(CHAT, "primary-model", [])
+    timer.retry(RATE_LIMIT)
+    if recovered:
+        timer.finish()
+    else:
+        timer.fail(RATE_LIMIT)
+
+
+def test_every_kind_gets_at_least_its_minimum_budget():
+    router = make_router()
+
+    assert router.budget(GENERATION, SHORT_FORM) == 4000
+    assert router.budget(SECTION, SHORT_FORM, "Submission Guidelines") == 1500
+    assert router.budget(CHAT, SHORT_FORM) == 4000
+    # 400 words * 1.4 tokens per word * 1.5 headroom + 1000 reasoning tokens
+    assert router.budget(SUGGESTION, SHORT_FORM) == 1840
+    assert make_router(route_answer_words=100).budget(SUGGESTION, SHORT_FORM) == 1500
+
+    sized = make_router(route_min_section_tokens=0)
+    assert sized.budget(SECTION, SHORT_FORM, "Submission Guidelines") < 1500
+
+
+def test_every_kind_uses_the_app_model_by_default():
+    routes = make_router().policy("app-model")
+
+    assert {kind: route.model for kind, route in routes.items()} == {kind: "app-model" for kind in REQUEST_KINDS}
+    assert make_router(route_suggestion_model="small-model").route(SUGGESTION, "app-model").model == "small-model"
+
+
+def test_a_single_rate_limited_request_does_not_degrade_the_model():
+    router = make_router()
+
+    rate_limited_request(router, recovered=False)
+    assert not router.route(CHAT, "primary-model").degraded
+
+    rate_limited_request(router, recovered=False)
+    route = router.route(CHAT, "primary-model")
+    assert route.degraded
+    assert route.model == "fallback-model" and route.fallback_model == ""
+
+
+def test_requests_that_got_through_a_rate_limit_do_not_count():
+    router = make_router(route_rate_limited_failures=1)
+
+    for _ in range(3):
+        rate_limited_request(router, recovered=True)
+    assert not router.is_degraded("primary-model")
+
+    rate_limited_request(router, recovered=False)
+    assert router.is_degraded("primary-model")
+
+
+def test_health_window_forgets_old_failures():
+    router = make_router(route_rate_limited_failures=1)
+    rate_limited_request(router, recovered=False)
+
+    now = router.clock()
+    router.clock = lambda: now + router.config.route_health_window + 1
+    assert not router.is_degraded("primary-model")
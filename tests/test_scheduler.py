@@ -0,0 +1,191 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from projectcraft.backends import FakeAPIError, StreamHandle
+from projectcraft.scheduler import DeadlineExceeded, RequestScheduler, SchedulerConfig, TokenBucket
+
+
+class FakeClock:
+    """Monotonic clock that only moves when the scheduler sleeps"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def api_error(status_code, retry_after=None):
+    error = FakeAPIError(status_code, "API error")
+    if retry_after is not None:
+        error.response = SimpleNamespace(headers={"retry-after": str(retry_after)})
+    return error
+
+
+def failing(*errors, result="answer"):
+    """A call that raises errors one by one, then returns result"""
+    errors = list(errors)
+
+    def call(timeout):
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    return call
+
+
+def scheduler_with_clock(**config):
+    clock = FakeClock()
+    return RequestScheduler(SchedulerConfig(**config), clock=clock, sleep=clock.sleep), clock
+
+
+def test_token_bucket_refills_continuously():
+    bucket = TokenBucket(60, now=0.0)
+
+    assert bucket.wait_time(1, 0.0) == 0.0
+    bucket.consume(60, 0.0)
+    assert bucket.wait_time(1, 0.0) == pytest.approx(1.0)
+    assert bucket.wait_time(1, 0.5) == pytest.approx(0.5)
+    # More than the capacity waits for a full bucket
+    assert bucket.wait_time(500, 1.0) == pytest.approx(59.0)
+    assert TokenBucket(0, now=0.0).wait_time(10 ** 6, 0.0) == 0.0
+
+
+def test_retries_back_off_exponentially_with_jitter():
+    scheduler, clock = scheduler_with_clock(backoff_base=1.0, backoff_max=3.0)
+    retried = []
+
+    result = scheduler.run(failing(api_error(503), api_error(503), api_error(503)), 100, on_retry=retried.append)
+
+    assert result == "answer"
+    assert len(retried) == len(clock.sleeps) == 3
+    for attempt, delay in enumerate(clock.sleeps):
+        assert 0 <= delay <= min(3.0, 2 ** attempt)
+    stats = scheduler.stats()
+    assert stats["retries"] == 3 and stats["completed"] == 1 and stats["failed"] == 0
+
+
+def test_rate_limit_waits_for_retry_after_and_pauses_admission():
+    scheduler, clock = scheduler_with_clock(backoff_base=0.1)
+    paused = []
+
+    def call(timeout):
+        if not clock.sleeps:
+            raise api_error(429, retry_after=7)
+        paused.append(scheduler.stats()["paused_seconds"])
+        return "answer"
+
+    assert scheduler.run(call, 100) == "answer"
+    assert clock.sleeps == [7.0]
+    assert paused == [0.0]
+
+
+def test_errors_that_are_not_retryable_fail_at_once():
+    scheduler, clock = scheduler_with_clock()
+
+    with pytest.raises(ValueError):
+        scheduler.run(failing(ValueError("bad request")), 100)
+    with pytest.raises(FakeAPIError):
+        scheduler.run(failing(api_error(503), api_error(503)), 100, max_retries=1)
+
+    assert len(clock.sleeps) == 1
+    assert scheduler.stats()["failed"] == 2
+
+
+def test_retry_that_would_miss_the_deadline_is_not_attempted():
+    scheduler, clock = scheduler_with_clock()
+
+    with pytest.raises(DeadlineExceeded):
+        scheduler.run(failing(api_error(429, retry_after=10)), 100, deadline=5)
+
+    assert clock.sleeps == []
+    assert scheduler.stats()["deadline_exceeded"] == 1
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met"
+        time.sleep(0.005)
+
+
+def test_queued_requests_are_admitted_in_order():
+    scheduler = RequestScheduler(SchedulerConfig(max_concurrent_requests=1))
+    release = threading.Event()
+    order = []
+
+    def call(name):
+        def run(timeout):
+            if name == "first":
+                release.wait(5)
+            order.append(name)
+        return run
+
+    threads = []
+    for queued, name in enumerate(["first", "second", "third"]):
+        thread = threading.Thread(target=scheduler.run, args=(call(name), 100))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: (scheduler.stats()["active"], scheduler.stats()["queued"]) == (1, queued))
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert order == ["first", "second", "third"]
+    assert scheduler.stats()["completed"] == 3
+
+
+def test_request_that_cannot_get_a_slot_before_its_deadline_fails():
+    scheduler = RequestScheduler(SchedulerConfig(max_concurrent_requests=1))
+
+    with scheduler.slot(100):
+        with pytest.raises(DeadlineExceeded):
+            scheduler.run(failing(), 100, deadline=0.05)
+
+    assert scheduler.stats()["deadline_exceeded"] == 1
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_stream_failing_before_its_first_chunk_is_closed_and_retried():
+    scheduler, clock = scheduler_with_clock()
+    opened = []
+
+    def open_stream(timeout):
+        def chunks():
+            if len(opened) == 1:
+                raise api_error(503)
+            yield from ["Hello", " world"]
+
+        opened.append(StreamHandle(chunks()))
+        return opened[-1]
+
+    assert list(scheduler.stream(open_stream, 100)) == ["Hello", " world"]
+    assert len(opened) == 2 and all(stream.closed for stream in opened)
+    assert scheduler.stats()["retries"] == 1 and scheduler.stats()["completed"] == 1
+
+
+def test_stream_failing_after_its_first_chunk_counts_as_failed():
+    scheduler, clock = scheduler_with_clock()
+
+    def chunks():
+        yield "Hello"
+        raise api_error(503)
+
+    stream = StreamHandle(chunks())
+    received = []
+    with pytest.raises(FakeAPIError):
+        for chunk in scheduler.stream(lambda timeout: stream, 100):
+            received.append(chunk)
+
+    assert received == ["Hello"] and stream.closed
+    stats = scheduler.stats()
+    assert stats["failed"] == 1 and stats["completed"] == 0 and stats["retries"] == 0
+    assert stats["active"] == 0
@@ -0,0 +1,80 @@
+from projectcraft.sections import IncrementalSectionParser, parse_project_response, replace_section
+from projectcraft.structured import project_data_to_markdown
+
+# Sub-headings named like template sections inside Technical Requirements
+NESTED_RESPONSE = """# Sales Dashboard
+
+### Overview
+Build a dashboard.
+
+### Technical Requirements
+Use a notebook.
+
+#### Resources
+Python, pandas
+
+#### Evaluation
+unit tests
+
+### Deliverables
+A report.
+
+### Evaluation Criteria
+Correctness 50%, clarity 50%.
+
+### Additional Resources
+The pandas documentation.
+
+### Submission Guidelines
+Submit a zip file.
+"""
+
+
+def test_nested_section_named_sub_headings_stay_in_their_section():
+    project_data = parse_project_response(NESTED_RESPONSE)
+
+    assert project_data["title"] == "Sales Dashboard"
+    assert project_data["Technical Requirements"] == (
+        "Use a notebook.\n\n#### Resources\nPython, pandas\n\n#### Evaluation\nunit tests"
+    )
+    assert project_data["Evaluation Criteria"] == "Correctness 50%, clarity 50%."
+    assert project_data["Additional Resources"] == "The pandas documentation."
+    assert project_data["Submission Guidelines"] == "Submit a zip file."
+
+
+def test_section_level_follows_the_first_section():
+    response = "# Title\n\n## Overview\nIntro\n\n### Resources\nLinks\n\n## Deliverables\nCode\n"
+    project_data = parse_project_response(response)
+
+    assert project_data["Overview"] == "Intro\n\n### Resources\nLinks"
+    assert project_data["Additional Resources"] == ""
+    assert project_data["Deliverables"] == "Code"
+
+
+def test_streamed_parse_matches_full_parse():
+    parser = IncrementalSectionParser()
+    reported = {}
+    for start in range(0, len(NESTED_RESPONSE), 7):
+        reported.update(parser.feed(NESTED_RESPONSE[start:start + 7]))
+    project_data, changed = parser.finish()
+
+    assert project_data == parse_project_response(NESTED_RESPONSE)
+    assert reported["Technical Requirements"] == project_data["Technical Requirements"]
+    # Only the last section, and those missing from the response, are settled by finish()
+    assert [name for name, _ in changed] == [
+        "Learning Objectives", "Project Description", "Submission Guidelines",
+    ]
+
+
+def test_replace_section_keeps_nested_sub_headings_out_of_other_sections():
+    text = replace_section(NESTED_RESPONSE, "Technical Requirements", "Use a script.\n\n#### Resources\nNumPy")
+    project_data = parse_project_response(text)
+
+    assert project_data["Technical Requirements"] == "Use a script.\n\n#### Resources\nNumPy"
+    assert project_data["Additional Resources"] == "The pandas documentation."
+
+
+def test_structured_round_trip_keeps_nested_sub_headings():
+    project_data = parse_project_response(NESTED_RESPONSE)
+
+    assert parse_project_response(project_data_to_markdown(project_data)) == project_data